@@ -5,17 +5,25 @@ import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 import time
 import os
-import csv
 import shutil
 import threading
-import json
+import queue
 from datetime import datetime
 #from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, CancelledError
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.figure import Figure
 import numpy as np
 import matplotlib.pyplot as plt
-from moviepy import VideoFileClip
+from motor_analisis import (EXTENSIONES_VIDEO, WORKERS_POR_DEFECTO, MODOS_WORKERS,
+                            sondear_video, sondear_video_cronometrado, TimeoutAdaptativo,
+                            buscar_duplicados_contenido,
+                            ResultadosColumnares, calcular_peso_medio, calcular_duracion_media,
+                            calcular_rating_optimizacion, SesionAnalisis, IndiceCarpeta,
+                            IndiceBusqueda, VigilanteCarpeta, DatosAnalizador, MotorAnalisis,
+                            PlanMovimientos, ejecutar_plan_movimientos, texto_resumen,
+                            MetricasAnalisis,
+                            texto_metricas)
 
 
 def _silenciar_tkerrar_mainloop():
@@ -56,6 +64,13 @@ COLOR_BUTTON_HIGHLIGHT = "#ff8c00"
 
 lista_de_errores = list()  # Para almacenar errores únicos
 
+
+# --- Volcado del log al Text central ---
+INTERVALO_LOG_MS = 100  # Cadencia con la que se vuelcan mensajes y progreso a la interfaz
+MAX_LINEAS_LOG = 5000  # Líneas retenidas en el Text; las más antiguas se descartan
+
+
+
 def mostrar_grafico_visual(resultados, carpeta):
     """Muestra una gráfica de barras: eje X=nombre archivo, 
     eje Y=relación peso/duración, etiqueta=tiempo y línea 80MB/min.
@@ -64,13 +79,14 @@ def mostrar_grafico_visual(resultados, carpeta):
     if not resultados:
         messagebox.askokcancel("Sin datos", "No hay vídeos válidos para graficar.")
         return
-    nombres = [r[0] for r in resultados]
-    duraciones = [r[1] for r in resultados]
-    relaciones = [(r[2] / r[1]) if r[1] > 0 else 0 for r in resultados]
+    columnas = ResultadosColumnares.desde_tuplas(resultados)
+    nombres = columnas.nombres.tolist()
+    duraciones = columnas.duraciones
+    relaciones = columnas.ratios
 
     # Identificar índices del video más largo y más corto
-    idx_max = duraciones.index(max(duraciones))
-    idx_min = duraciones.index(min(duraciones))
+    idx_max = int(np.argmax(duraciones))
+    idx_min = int(np.argmin(duraciones))
 
     # Colores: por defecto azul, el más largo rojo, el más corto verde
     colores = ["#7289da"] * len(nombres)
@@ -99,230 +115,72 @@ def mostrar_grafico_visual(resultados, carpeta):
     plt.tight_layout()
     plt.show()
 
-def calcular_peso_medio(resultados):
-    """ Calcula el peso medio por minuto de los vídeos analizados """
-    if not resultados:
-        return 0
-    total_peso = sum(r[2] for r in resultados)
-    total_duracion = sum(r[1] for r in resultados)
-    if total_duracion == 0:
-        return 0
-    return total_peso / total_duracion
-
-def calcular_duracion_media(resultados):
-    """ Calcula la duración media de los vídeos analizados """
-    if not resultados:
-        return 0
-    total_duracion = sum(r[1] for r in resultados)
-    return total_duracion / len(resultados)
-
-def calcular_rating_optimizacion(resultados):
-    """
-    Calcula el rating de optimización (1-5 estrellas) basado
-    en el porcentaje de archivos bien optimizados.
-    
-    Criterios:
-    - Archivos < 10 MB/min: Descartados (baja calidad)
-    - Archivos 10-100 MB/min: Bien optimizados
-    - Archivos > 100 MB/min: Mal optimizados
-    
-    Rating:
-    - 5 estrellas: % bien optimizados >= 90%
-    - 4 estrellas: % bien optimizados >= 70%
-    - 3 estrellas: % bien optimizados >= 50%
-    - 2 estrellas: % bien optimizados >= 20%
-    - 1 estrella: % bien optimizados < 20%
-    """
-    if not resultados:
-        return 0, 0, 0, 0, "Sin datos"
-
-    bien_optimizados = 0
-    mal_optimizados = 0
-
-    for _nombre, duracion, peso, *_ in resultados:
-        if duracion <= 0:
-            continue
-        ratio = peso / duracion
-
-        # Descartar archivos < 10 MB/min (baja calidad)
-        if ratio < 10:
-            continue
-        # Contar bien vs mal optimizados
-        elif ratio <= 100:
-            bien_optimizados += 1
-        else:
-            mal_optimizados += 1
-
-    total_contable = bien_optimizados + mal_optimizados
-
-    if total_contable == 0:
-        return 0, 0, 0, 0, "Sin archivos contables"
-
-    pct_bien = (bien_optimizados / total_contable) * 100
-    _pct_mal = (mal_optimizados / total_contable) * 100
-
-    # Asignar estrellas
-    if pct_bien >= 90:
-        estrellas = 5
-        categoria = "Excelente"
-    elif pct_bien >= 70:
-        estrellas = 4
-        categoria = "Muy bueno"
-    elif pct_bien >= 50:
-        estrellas = 3
-        categoria = "Aceptable"
-    elif pct_bien >= 20:
-        estrellas = 2
-        categoria = "Bajo"
-    else:
-        estrellas = 1
-        categoria = "Crítico"
-
-    return estrellas, pct_bien, bien_optimizados, mal_optimizados, categoria
-
-def mostrar_grafico(resultados, carpeta):
-    """ Muestra un gráfico de dispersión mejorado de duración vs tamaño
-    de los vídeos con subplot de distribución """
-    if not resultados:
-        messagebox.askokcancel("Sin datos", "No hay vídeos válidos para graficar.")
-        return
-    duraciones = [r[1] for r in resultados]
-    pesos = [r[2] for r in resultados]
-
-    # Elegir estilo disponible
-    preferred_styles = ['seaborn-v0_8-darkgrid', 'seaborn-darkgrid', 'seaborn', 'ggplot', 'default']
-    for s in preferred_styles:
-        if s in plt.style.available:
-            try:
-                plt.style.use(s)
-            except (OSError, ValueError, ImportError):
-                continue
-            break
-
-    # Crear figura con 2 subplots
-    fig = plt.figure(figsize=(16, 8))
-    fig.patch.set_facecolor('#f5f5f5')
-
-    # Subplot principal (scatter)
-    ax1 = plt.subplot(1, 2, 1)
-    ax1.set_facecolor('#ffffff')
-
-    # Calcular ratios para colorear puntos según categoría
-    ratios = [(peso / dur if dur > 0 else 0) for dur, peso in zip(duraciones, pesos)]
-
-    # Crear categorías: verde=ideal, azul=normal, naranja=alto, rojo=muy alto
-    colores = []
-    tamanios = []
-    for dur, peso, ratio in zip(duraciones, pesos, ratios):
-        if dur > 20 and ratio < 50:
-            colores.append('#2ecc71')  # Verde: candidato a review
-            tamanios.append(120)
-        elif ratio > 100:
-            colores.append('#e74c3c')  # Rojo: necesita optimizar
-            tamanios.append(140)
-        elif ratio > 50:
-            colores.append('#f39c12')  # Naranja: moderado
-            tamanios.append(110)
-        else:
-            colores.append('#3498db')  # Azul: normal
-            tamanios.append(100)
-
-    # Scatter plot mejorado
-    ax1.scatter(duraciones, pesos, c=colores, s=tamanios,
-                        edgecolor='#2c3e50', alpha=0.7, linewidth=1.5)
-
-    # Anotaciones inteligentes: solo para valores destacados
-    for i, r in enumerate(resultados):
-        nombre, dur, peso = r[0], r[1], r[2]
-        ratio = ratios[i]
-        # Anotar solo si supera 200 MB/min y duración > 5 min
-        if ratio > 200 and dur > 5:
-            ax1.annotate(nombre, (dur, peso), fontsize=8,
-                       xytext=(5, 5), textcoords='offset points',
-                       bbox=dict(boxstyle='round,pad=0.3', facecolor=colores[i], alpha=0.6),
-                       fontweight='bold')
-
-    # Línea de tendencia (sin extremos)
-    if len(duraciones) > 2:
-        ratios_con_idx = [(ratio, idx) for idx, ratio in enumerate(ratios)]
-        ratios_ordenados = sorted(ratios_con_idx, key=lambda x: x[0])
-
-        # Descartar extremos solo si hay suficientes datos
-        if len(ratios) > 20:
-            indices_a_descartar = {ratios_ordenados[0][1], ratios_ordenados[1][1],
-                                   ratios_ordenados[-1][1], ratios_ordenados[-2][1]}
-        else:
-            indices_a_descartar = set()
-
-        duraciones_filtradas = [dur for i,
-                                dur in enumerate(duraciones) if i not in indices_a_descartar]
-        pesos_filtrados = [peso for i,
-                           peso in enumerate(pesos) if i not in indices_a_descartar]
-
-        if len(duraciones_filtradas) > 1:
-            z = np.polyfit(duraciones_filtradas, pesos_filtrados, 1)
-            p = np.poly1d(z)
-            x_linea = np.linspace(min(duraciones_filtradas), max(duraciones_filtradas), 100)
-            ax1.plot(x_linea, p(x_linea), color='#95a5a6', linestyle='--',
-                   linewidth=2.5, label='Tendencia', alpha=0.8)
-
-    # Líneas de referencia mejoradas
-    if duraciones:
-        x_vals = [min(duraciones), max(duraciones)]
-
-        # Línea de 50 MB/min (ideal)
-        y_vals_50 = [x * 50 for x in x_vals]
-        ax1.plot(x_vals, y_vals_50, color='#2ecc71', linestyle='-.',
-               linewidth=2, label='50 MB/min (Ideal)', alpha=0.7)
-
-        # Línea de 80 MB/min (bueno)
-        y_vals_80 = [x * 80 for x in x_vals]
-        ax1.plot(x_vals, y_vals_80, color='#3498db', linestyle='--',
-               linewidth=2, label='80 MB/min (Bueno)', alpha=0.7)
-
-        # Línea de 100 MB/min (umbral)
-        y_vals_100 = [x * 100 for x in x_vals]
-        ax1.plot(x_vals, y_vals_100, color='#f39c12', linestyle=':',
-               linewidth=2, label='100 MB/min (Alto)', alpha=0.7)
-
-        # Línea de 150 MB/min (crítico)
-        y_vals_150 = [x * 150 for x in x_vals]
-        ax1.plot(x_vals, y_vals_150, color='#e74c3c', linestyle='-',
-               linewidth=2.5, label='150 MB/min (Crítico)', alpha=0.8)
-
-    # Etiquetas y título mejorados
-    ax1.set_xlabel('Duración (minutos)', fontsize=12, fontweight='bold', color='#2c3e50')
-    ax1.set_ylabel('Tamaño (MB)', fontsize=12, fontweight='bold', color='#2c3e50')
-
-    title_text = os.path.basename(carpeta) if carpeta else "Análisis: Duración vs Tamaño"
-    ax1.set_title(title_text, fontsize=14, fontweight='bold',
-                color='#2c3e50', pad=20)
-
-    # Grid mejorado
-    ax1.grid(True, alpha=0.3, linestyle='--', linewidth=0.7, color='#bdc3c7')
-
-    # Leyenda mejorada
-    legend = ax1.legend(loc='upper left', fontsize=10, framealpha=0.95,
-                      edgecolor='#2c3e50', fancybox=True, shadow=True)
-    legend.get_frame().set_facecolor('#ecf0f1')
-
-    # Ajustar límites con margen
-    if duraciones and pesos:
-        margin_x = (max(duraciones) - min(duraciones)) * 0.1
-        margin_y = (max(pesos) - min(pesos)) * 0.1
-        ax1.set_xlim(max(0, min(duraciones) - margin_x), max(duraciones) + margin_x)
-        ax1.set_ylim(max(0, min(pesos) - margin_y), max(pesos) + margin_y)
-
-    # Mejorar apariencia general
-    ax1.spines['top'].set_visible(False)
-    ax1.spines['right'].set_visible(False)
-    ax1.spines['left'].set_color('#2c3e50')
-    ax1.spines['bottom'].set_color('#2c3e50')
-    ax1.tick_params(colors='#2c3e50', labelsize=9)
 
-    # ============ SUBPLOT 2: Distribución de rangos de ratio ============
-    ax2 = plt.subplot(1, 2, 2)
+# --- Gráficas ---
+MAX_PUNTOS_DISPERSION = 50000  # Por encima se submuestrea y rasteriza la nube de puntos
+MAX_ANOTACIONES = 25  # Nombres anotados como mucho en la dispersión (los de mayor ratio)
+ESTILOS_GRAFICOS = ['seaborn-v0_8-darkgrid', 'seaborn-darkgrid', 'seaborn', 'ggplot', 'default']
+
+def elegir_estilo(preferidos=ESTILOS_GRAFICOS):
+    """Devuelve el primer estilo de matplotlib disponible de la lista"""
+    for estilo in preferidos:
+        if estilo in plt.style.available:
+            return estilo
+    return 'default'
+
+def indices_muestra(n, maximo=MAX_PUNTOS_DISPERSION):
+    """Índices a dibujar: todos si caben, si no una muestra fija (reproducible) de `maximo`"""
+    if n <= maximo:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(0).choice(n, size=maximo, replace=False))
+
+def _datos_dispersion(columnas):
+    """Colores, tamaños y muestra de puntos de la dispersión duración/tamaño"""
+    duraciones, ratios = columnas.duraciones, columnas.ratios
+    # Verde=candidato a review, rojo=necesita optimizar, naranja=moderado, azul=normal
+    condiciones = [(duraciones > 20) & (ratios < 50), ratios > 100, ratios > 50]
+    colores = np.select(condiciones, ['#2ecc71', '#e74c3c', '#f39c12'], '#3498db')
+    tamanios = np.select(condiciones, [120, 140, 110], 100)
+    return colores, tamanios, indices_muestra(len(columnas))
+
+def _tendencia_dispersion(columnas):
+    """Recta de tendencia (x, y) descartando los dos ratios extremos por cada lado"""
+    duraciones, pesos, ratios = columnas.duraciones, columnas.pesos, columnas.ratios
+    if len(duraciones) <= 2:
+        return None
+    conservar = np.ones(len(ratios), dtype=bool)
+    if len(ratios) > 20:
+        orden = np.argsort(ratios, kind='stable')
+        conservar[orden[[0, 1, -1, -2]]] = False
+    duraciones_filtradas = duraciones[conservar]
+    if len(duraciones_filtradas) <= 1:
+        return None
+    z = np.polyfit(duraciones_filtradas, pesos[conservar], 1)
+    x_linea = np.linspace(duraciones_filtradas.min(), duraciones_filtradas.max(), 100)
+    return x_linea, np.poly1d(z)(x_linea)
+
+def _anotar_dispersion(ax, columnas, colores):
+    """Anota los vídeos > 200 MB/min y > 5 min (como mucho MAX_ANOTACIONES)"""
+    destacados = np.flatnonzero((columnas.ratios > 200) & (columnas.duraciones > 5))
+    if len(destacados) > MAX_ANOTACIONES:
+        destacados = destacados[np.argsort(columnas.ratios[destacados])[-MAX_ANOTACIONES:]]
+    return [ax.annotate(columnas.nombres[i], (columnas.duraciones[i], columnas.pesos[i]),
+                        fontsize=8, xytext=(5, 5), textcoords='offset points',
+                        bbox=dict(boxstyle='round,pad=0.3', facecolor=colores[i], alpha=0.6),
+                        fontweight='bold')
+            for i in destacados]
+
+def _limites_dispersion(ax, columnas):
+    duraciones, pesos = columnas.duraciones, columnas.pesos
+    margin_x = (duraciones.max() - duraciones.min()) * 0.1
+    margin_y = (pesos.max() - pesos.min()) * 0.1
+    ax.set_xlim(max(0, duraciones.min() - margin_x), duraciones.max() + margin_x)
+    ax.set_ylim(max(0, pesos.min() - margin_y), pesos.max() + margin_y)
+
+def _dibujar_rangos_ratio(ax2, columnas):
+    """Barras horizontales con el número de archivos por rango de ratio"""
     ax2.set_facecolor('#ffffff')
+    ratios = columnas.ratios
 
     # Definir rangos de ratio y contar archivos en cada rango
     rangos = [
@@ -338,8 +196,8 @@ def mostrar_grafico(resultados, carpeta):
     etiquetas_rangos = []
     colores_rangos = []
 
-    for min_ratio, max_ratio, etiqueta, color in rangos:
-        cantidad = sum(1 for r in ratios if min_ratio <= r < max_ratio)
+    cantidades = columnas.contar_en_rangos([r[0] for r in rangos] + [rangos[-1][1]])
+    for (_min_ratio, _max_ratio, etiqueta, color), cantidad in zip(rangos, cantidades):
         if cantidad > 0:  # Solo mostrar rangos con datos
             datos_rangos.append(cantidad)
             etiquetas_rangos.append(f'{etiqueta}\n({cantidad})')
@@ -352,7 +210,7 @@ def mostrar_grafico(resultados, carpeta):
                           linewidth=1.5)
 
         # Agregar valores en las barras
-        for i, (barra, valor) in enumerate(zip(barras, datos_rangos)):
+        for barra, valor in zip(barras, datos_rangos):
             porcentaje = (valor / len(ratios)) * 100
             ax2.text(barra.get_width() + 0.5, barra.get_y() + barra.get_height()/2,
                     f'{valor} ({porcentaje:.1f}%)',
@@ -377,205 +235,130 @@ def mostrar_grafico(resultados, carpeta):
         info_text = (f'Total archivos: {len(ratios)}\n'
                     f'Ratio promedio: {np.mean(ratios):.2f} MB/min\n'
                     f'Ratio mediana: {np.median(ratios):.2f} MB/min\n'
-                    f'Rango: {min(ratios):.2f} - {max(ratios):.2f}')
+                    f'Rango: {ratios.min():.2f} - {ratios.max():.2f}')
         ax2.text(0.98, 0.02, info_text, transform=ax2.transAxes,
                 fontsize=9, verticalalignment='bottom', horizontalalignment='right',
                 bbox=dict(boxstyle='round', facecolor='#ecf0f1', alpha=0.95,
                          edgecolor='#2c3e50', pad=0.6),
                 family='monospace', fontweight='bold', color='#2c3e50')
 
-    plt.tight_layout()
-    plt.show()
+def construir_grafico_dispersion(fig, columnas, carpeta):
+    """Dibuja en `fig` la dispersión duración vs tamaño y la distribución por rangos.
+    Usa solo la API orientada a objetos, así que puede ejecutarse fuera del hilo de Tk.
+    Devuelve los artistas que actualizar_grafico_dispersion reutiliza."""
+    duraciones = columnas.duraciones
+    fig.patch.set_facecolor('#f5f5f5')
 
-class GestorHistorialAnalisis:
-    """Gestiona el historial de análisis realizados con estadísticas por formato"""
-    def __init__(self, archivo_historial="analisis_historial.json", callback_actualizar=None):
-        self.archivo_historial = archivo_historial
-        self.historial = []
-        self.callback_actualizar = callback_actualizar
-        self.cargar_historial()
-
-    def cargar_historial(self):
-        """Carga el historial desde el archivo JSON"""
-        if os.path.exists(self.archivo_historial):
-            try:
-                with open(self.archivo_historial, 'r', encoding='utf-8') as f:
-                    self.historial = json.load(f)
-
-                necesita_guardar = False
-
-                # Migrar registros antiguos que no tengan 'veces'
-                for entrada in self.historial:
-                    if 'veces' not in entrada:
-                        entrada['veces'] = 1
-                        necesita_guardar = True
-
-                    # Reparar total_archivos que esté en 0
-                    if entrada.get('total_archivos', 0) == 0 and entrada.get(
-                        'estadisticas_por_formato'):
-                        total_calculado = sum(
-                            stats.get('cantidad', 0)
-                            for stats in entrada['estadisticas_por_formato'].values()
-                        )
-                        if total_calculado > 0:
-                            entrada['total_archivos'] = total_calculado
-                            necesita_guardar = True
-
-                # Si hay cambios, guardar el historial actualizado
-                if necesita_guardar:
-                    self.guardar_historial()
-
-            except (json.JSONDecodeError, IOError):
-                self.historial = []
-
-    def guardar_historial(self):
-        """Guarda el historial en el archivo JSON"""
-        try:
-            with open(self.archivo_historial, 'w', encoding='utf-8') as f:
-                json.dump(self.historial, f, ensure_ascii=False, indent=2)
-        except IOError as e:
-            print(f"Error guardando historial: {e}")
-
-    def registrar_analisis(self, carpeta, counts_by_ext, avg_by_ext, total_archivos, *,
-                           rating=None):
-        """Registra un análisis con estadísticas por formato y opcionalmente rating."""
-        nuevo_analisis = {
-            'timestamp': datetime.now().isoformat(),
-            'carpeta': carpeta,
-            'total_archivos': total_archivos,
-            'estadisticas_por_formato': {},
-            'veces': 1  # Contador de repeticiones
-        }
+    # Subplot principal (scatter)
+    ax1 = fig.add_subplot(1, 2, 1)
+    ax1.set_facecolor('#ffffff')
 
-        # Agregar estadísticas por cada formato encontrado
-        for ext in sorted(counts_by_ext.keys()):
-            nuevo_analisis['estadisticas_por_formato'][ext] = {
-                'cantidad': counts_by_ext[ext],
-                'ratio_promedio_mb_min': round(avg_by_ext.get(ext, 0.0), 2)
-            }
-
-        if rating is not None:
-            nuevo_analisis['rating'] = {
-                'estrellas': rating.get('estrellas'),
-                'pct_bien': rating.get('pct_bien'),
-                'bien_optimizados': rating.get('bien_optimizados'),
-                'mal_optimizados': rating.get('mal_optimizados'),
-                'categoria': rating.get('categoria')
-            }
-
-        # Buscar el último análisis de la MISMA carpeta (no solo el último del historial)
-        ultimo_misma_carpeta = None
-        for entrada in reversed(self.historial):
-            if entrada['carpeta'] == carpeta:
-                ultimo_misma_carpeta = entrada
-                break
+    colores, tamanios, muestra = _datos_dispersion(columnas)
+    # Scatter plot mejorado (rasterizado si hay demasiados puntos)
+    puntos = ax1.scatter(duraciones[muestra], columnas.pesos[muestra], c=colores[muestra],
+                         s=tamanios[muestra], edgecolor='#2c3e50', alpha=0.7, linewidth=1.5,
+                         rasterized=len(columnas) > MAX_PUNTOS_DISPERSION)
 
-        # Comparar con el último análisis de la misma carpeta
-        if ultimo_misma_carpeta is not None:
-            # Verificar si tiene los mismos datos
-            datos_iguales = (ultimo_misma_carpeta['total_archivos'] == total_archivos and
-                ultimo_misma_carpeta['estadisticas_por_formato'] == nuevo_analisis[
-                    'estadisticas_por_formato'])
-            if rating is not None:
-                datos_iguales = datos_iguales and (
-                    ultimo_misma_carpeta.get('rating') == nuevo_analisis.get('rating'))
-            if datos_iguales:
-                # Es idéntico: incrementar contador en lugar de crear nueva entrada
-                ultimo_misma_carpeta['veces'] = ultimo_misma_carpeta.get('veces', 1) + 1
-                ultimo_misma_carpeta['timestamp'] = datetime.now().isoformat()
-                self.guardar_historial()
-                # Ejecutar callback si existe para actualizar UI
-                if self.callback_actualizar:
-                    self.callback_actualizar()
-                return
+    # Anotaciones inteligentes: solo para valores destacados
+    anotaciones = _anotar_dispersion(ax1, columnas, colores)
 
-        # Es diferente o es primera vez de esta carpeta: agregar como nueva entrada
-        self.historial.append(nuevo_analisis)
-        self.guardar_historial()
-        # Ejecutar callback si existe para actualizar UI
-        if self.callback_actualizar:
-            self.callback_actualizar()
-
-    def deshacer_ultimo(self):
-        """Deshace el último análisis registrado"""
-        if not self.historial:
-            return False, "No hay análisis para deshacer"
-
-        ultimo = self.historial[-1]
-        self.historial.pop()
-        self.guardar_historial()
-        return True, f"Análisis de {ultimo['carpeta']} eliminado del historial"
-
-    def deshacer_multiples(self, cantidad):
-        """Deshace múltiples análisis"""
-        if cantidad > len(self.historial):
-            cantidad = len(self.historial)
-
-        deshechados = 0
-        for _ in range(cantidad):
-            exito, _ = self.deshacer_ultimo()
-            if exito:
-                deshechados += 1
+    # Línea de tendencia (sin extremos)
+    tendencia = _tendencia_dispersion(columnas)
+    linea_tendencia = None
+    if tendencia is not None:
+        linea_tendencia, = ax1.plot(*tendencia, color='#95a5a6', linestyle='--',
+                                    linewidth=2.5, label='Tendencia', alpha=0.8)
+
+    # Líneas de referencia: 50 (ideal), 80 (bueno), 100 (umbral) y 150 (crítico) MB/min
+    x_vals = np.array([duraciones.min(), duraciones.max()])
+    referencias = {}
+    for ratio, color, estilo, ancho, etiqueta, alpha in (
+            (50, '#2ecc71', '-.', 2, '50 MB/min (Ideal)', 0.7),
+            (80, '#3498db', '--', 2, '80 MB/min (Bueno)', 0.7),
+            (100, '#f39c12', ':', 2, '100 MB/min (Alto)', 0.7),
+            (150, '#e74c3c', '-', 2.5, '150 MB/min (Crítico)', 0.8)):
+        referencias[ratio], = ax1.plot(x_vals, x_vals * ratio, color=color, linestyle=estilo,
+                                       linewidth=ancho, label=etiqueta, alpha=alpha)
 
-        return deshechados, 0
+    # Etiquetas y título mejorados
+    ax1.set_xlabel('Duración (minutos)', fontsize=12, fontweight='bold', color='#2c3e50')
+    ax1.set_ylabel('Tamaño (MB)', fontsize=12, fontweight='bold', color='#2c3e50')
 
-    def exportar_csv(self, archivo_salida="analisis_historial.csv"):
-        """Exporta el historial a CSV"""
-        if not self.historial:
-            return False, "No hay análisis para exportar"
+    title_text = os.path.basename(carpeta) if carpeta else "Análisis: Duración vs Tamaño"
+    ax1.set_title(title_text, fontsize=14, fontweight='bold',
+                color='#2c3e50', pad=20)
 
-        try:
-            with open(archivo_salida, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Timestamp', 'Carpeta', 'Veces', 'Total Archivos', 'Formato',
-                                 'Cantidad', 'Ratio Promedio (MB/min)'])
-
-                for analisis in self.historial:
-                    veces = analisis.get('veces', 1)
-                    for ext, stats in analisis['estadisticas_por_formato'].items():
-                        writer.writerow([
-                            analisis['timestamp'],
-                            analisis['carpeta'],
-                            veces,
-                            analisis['total_archivos'],
-                            ext,
-                            stats['cantidad'],
-                            stats['ratio_promedio_mb_min']
-                        ])
-            return True, f"Historial exportado a {archivo_salida}"
-        except IOError as e:
-            return False, f"Error exportando CSV: {e}"
-
-    def exportar_json(self, archivo_salida="analisis_historial_export.json"):
-        """Exporta el historial a JSON"""
-        if not self.historial:
-            return False, "No hay análisis para exportar"
+    # Grid mejorado
+    ax1.grid(True, alpha=0.3, linestyle='--', linewidth=0.7, color='#bdc3c7')
 
-        try:
-            with open(archivo_salida, 'w', encoding='utf-8') as f:
-                json.dump(self.historial, f, ensure_ascii=False, indent=2)
-            return True, f"Historial exportado a {archivo_salida}"
-        except IOError as e:
-            return False, f"Error exportando JSON: {e}"
-
-    def obtener_resumen(self):
-        """Obtiene un resumen del historial"""
-        if not self.historial:
-            return "No hay análisis registrados"
-
-        total = len(self.historial)
-        total_repeticiones = sum(analisis.get('veces', 1) - 1 for analisis in self.historial)
-        resumen = f"Total análisis únicos: {total}"
-        if total_repeticiones > 0:
-            total_ejecuciones = total + total_repeticiones
-            resumen += (f" | Total ejecuciones (incluyendo repetidas): {total_ejecuciones}"
-                        f" | Análisis duplicados: {total_repeticiones}")
-        return resumen
+    # Leyenda mejorada
+    legend = ax1.legend(loc='upper left', fontsize=10, framealpha=0.95,
+                      edgecolor='#2c3e50', fancybox=True, shadow=True)
+    legend.get_frame().set_facecolor('#ecf0f1')
+
+    # Ajustar límites con margen
+    _limites_dispersion(ax1, columnas)
+
+    # Mejorar apariencia general
+    ax1.spines['top'].set_visible(False)
+    ax1.spines['right'].set_visible(False)
+    ax1.spines['left'].set_color('#2c3e50')
+    ax1.spines['bottom'].set_color('#2c3e50')
+    ax1.tick_params(colors='#2c3e50', labelsize=9)
+
+    # ============ SUBPLOT 2: Distribución de rangos de ratio ============
+    ax2 = fig.add_subplot(1, 2, 2)
+    _dibujar_rangos_ratio(ax2, columnas)
+
+    fig.tight_layout()
+    return {'ax1': ax1, 'ax2': ax2, 'puntos': puntos, 'anotaciones': anotaciones,
+            'tendencia': linea_tendencia, 'referencias': referencias}
+
+def actualizar_grafico_dispersion(fig, artistas, columnas, carpeta):
+    """Actualiza una figura de construir_grafico_dispersion con otros resultados
+    cambiando solo los datos de sus artistas (set_offsets / set_data)"""
+    if artistas['tendencia'] is None and len(columnas) > 2:
+        # La figura original no tenía tendencia: más sencillo volver a dibujarla
+        fig.clear()
+        return construir_grafico_dispersion(fig, columnas, carpeta)
+    ax1 = artistas['ax1']
+    colores, tamanios, muestra = _datos_dispersion(columnas)
+    puntos = artistas['puntos']
+    puntos.set_offsets(np.column_stack((columnas.duraciones[muestra],
+                                        columnas.pesos[muestra])))
+    puntos.set_facecolor(colores[muestra])
+    puntos.set_sizes(tamanios[muestra])
+    puntos.set_rasterized(len(columnas) > MAX_PUNTOS_DISPERSION)
+
+    for anotacion in artistas['anotaciones']:
+        anotacion.remove()
+    artistas['anotaciones'] = _anotar_dispersion(ax1, columnas, colores)
+
+    tendencia = _tendencia_dispersion(columnas)
+    if artistas['tendencia'] is not None:
+        artistas['tendencia'].set_data(*(tendencia if tendencia is not None else ([], [])))
+    x_vals = np.array([columnas.duraciones.min(), columnas.duraciones.max()])
+    for ratio, linea in artistas['referencias'].items():
+        linea.set_data(x_vals, x_vals * ratio)
+    ax1.title.set_text(os.path.basename(carpeta) if carpeta else "Análisis: Duración vs Tamaño")
+    _limites_dispersion(ax1, columnas)
+
+    # Las barras por rango cambian de número: se redibuja solo ese subplot
+    artistas['ax2'].clear()
+    _dibujar_rangos_ratio(artistas['ax2'], columnas)
+    return artistas
+
+def mostrar_grafico(resultados, carpeta):
+    """ Muestra un gráfico de dispersión mejorado de duración vs tamaño
+    de los vídeos con subplot de distribución """
+    if not len(resultados):
+        messagebox.askokcancel("Sin datos", "No hay vídeos válidos para graficar.")
+        return
+    with plt.style.context(elegir_estilo()):
+        fig = plt.figure(figsize=(16, 8))
+        construir_grafico_dispersion(fig, ResultadosColumnares.desde_tuplas(resultados), carpeta)
+    plt.show()
 
-    def limpiar_historial(self):
-        """Limpia todo el historial"""
-        self.historial = []
-        self.guardar_historial()
 
 class ToolTip:
     """Tooltip para widgets de Tkinter"""
@@ -610,104 +393,6 @@ class ToolTip:
             tw.destroy()
 
 
-class GestorAnalisisHistorico:
-    """Gestiona análisis históricos por carpeta con comentarios y comparativas"""
-    def __init__(self, archivo_datos="analisis_carpetas.json"):
-        self.archivo_datos = archivo_datos
-        self.datos = {}
-        self.cargar_datos()
-
-    def cargar_datos(self):
-        """Carga los datos históricos de carpetas"""
-        if os.path.exists(self.archivo_datos):
-            try:
-                with open(self.archivo_datos, 'r', encoding='utf-8') as f:
-                    self.datos = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                self.datos = {}
-        else:
-            self.datos = {}
-
-    def guardar_datos(self):
-        """Guarda los datos históricos"""
-        try:
-            with open(self.archivo_datos, 'w', encoding='utf-8') as f:
-                json.dump(self.datos, f, ensure_ascii=False, indent=2)
-        except IOError as e:
-            print(f"Error guardando datos: {e}")
-
-    def registrar_analisis(self, carpeta, resultados):
-        """Registra un análisis de una carpeta"""
-        clave = os.path.abspath(carpeta)
-
-        # Calcular estadísticas
-        peso_total = sum(r[2] for r in resultados)
-        duracion_total = sum(r[1] for r in resultados)
-        altos = [r[3] for r in resultados]
-
-        analisis_actual = {
-            'timestamp': datetime.now().isoformat(),
-            'total_archivos': len(resultados),
-            'peso_total_mb': round(peso_total, 2),
-            'duracion_total_min': round(duracion_total, 2),
-            'peso_promedio_mb': round(peso_total / len(resultados), 2) if resultados else 0,
-            'duracion_promedio_min': round(duracion_total / len(resultados),
-                                           2) if resultados else 0,
-            'alto_promedio': round(sum(altos) / len(altos), 0) if altos else 0,
-            'altos_unicos': sorted(list(set(altos))),
-        }
-
-        if clave not in self.datos:
-            self.datos[clave] = {
-                'carpeta': carpeta,
-                'comentarios': [],
-                'analisis': []
-            }
-
-        self.datos[clave]['analisis'].append(analisis_actual)
-        self.guardar_datos()
-
-    def obtener_analisis_anterior(self, carpeta):
-        """Obtiene el análisis anterior de una carpeta"""
-        clave = os.path.abspath(carpeta)
-        if clave in self.datos and len(self.datos[clave]['analisis']) > 0:
-            return self.datos[clave]['analisis'][-1]
-        return None
-
-    def obtener_todos_analisis(self, carpeta):
-        """Obtiene todos los análisis de una carpeta"""
-        clave = os.path.abspath(carpeta)
-        if clave in self.datos:
-            return self.datos[clave]['analisis']
-        return []
-
-    def carpeta_analizada_antes(self, carpeta):
-        """Verifica si una carpeta ha sido analizada antes"""
-        clave = os.path.abspath(carpeta)
-        return clave in self.datos and len(self.datos[clave]['analisis']) > 0
-
-    def anadir_comentario(self, carpeta, comentario):
-        """Añade un comentario a una carpeta"""
-        clave = os.path.abspath(carpeta)
-        if clave not in self.datos:
-            self.datos[clave] = {
-                'carpeta': carpeta,
-                'comentarios': [],
-                'analisis': []
-            }
-
-        self.datos[clave]['comentarios'].append({
-            'timestamp': datetime.now().isoformat(),
-            'texto': comentario
-        })
-        self.guardar_datos()
-
-    def obtener_comentarios(self, carpeta):
-        """Obtiene los comentarios de una carpeta"""
-        clave = os.path.abspath(carpeta)
-        if clave in self.datos:
-            return self.datos[clave]['comentarios']
-        return []
 
 
 class AnalizadorVideosApp:
@@ -718,17 +403,32 @@ class AnalizadorVideosApp:
         self.resultados = []
         self.preview_counts = {}
         self.videos_problema = []
-        self._analysis_executor = None
-        self._analisis_future = None
+        self._motor = None  # MotorAnalisis del análisis en curso
+        self._metricas = None  # MetricasAnalisis del último análisis (en curso o terminado)
         self.carpeta = None  # Inicializar el atributo carpeta
         self._parar_analisis = False  # Control de parada
         self._previsualizacion_hecha = False  # Control para saber si ya se hizo previsualización
-        self.gestor_historial = GestorHistorialAnalisis(
-            callback_actualizar=self._habilitar_botones_historial)
-        self.gestor_analisis_historico = GestorAnalisisHistorico()
+        self._indice = None  # IndiceCarpeta de self.carpeta, se construye bajo demanda
+        self._version_resultados = 0  # Cambia cada vez que se sustituye self.resultados
+        self._graficos = {}  # nombre -> figura cacheada (ver _mostrar_grafico_cacheado)
+        self._vigilante = None  # VigilanteCarpeta activo mientras dura el modo vigilancia
+        self._cola_log = queue.SimpleQueue()  # ('log'|'set', texto) pendientes de volcar
+        self._progreso_pendiente = None  # Último (valor, porcentaje) publicado por el hilo
+        # Historiales, caché de sondeos, puntos de control y lotes de movimientos;
+        # son los mismos archivos que usa la línea de órdenes de motor_analisis.py
+        self.datos = DatosAnalizador(callback_historial=self._habilitar_botones_historial)
+        self.gestor_historial = self.datos.gestor_historial
+        self.gestor_analisis_historico = self.datos.gestor_analisis_historico
+        self.cache_sondeos = self.datos.cache_sondeos
+        self.dir_sesiones = self.datos.dir_sesiones
+        self.gestor_movimientos = self.datos.gestor_movimientos
+        self._reanudar_sesion = False
+        # Índice de búsqueda sobre todas las carpetas analizadas, se construye bajo demanda
+        self.indice_busqueda = IndiceBusqueda(self.cache_sondeos, self.gestor_analisis_historico)
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.root.configure(bg=COLOR_BG)
+        self.root.after(INTERVALO_LOG_MS, self._ciclo_volcado_log)
 
         # Frame principal para selección de carpeta y análisis
         self.frame_principal = ttk.Frame(master, padding=5)
@@ -790,6 +490,8 @@ class AnalizadorVideosApp:
 
         # Empezar con las pestañas de formato desactivadas hasta saber qué archivos hay
         self._actualizar_tabs_formatos({})
+        # Modo de "Buscar Repetidos": mismo directorio (por defecto) o todo el árbol
+        self.repetidos_entre_carpetas_var = tk.BooleanVar(value=False)
         # --- CONTENIDO PESTAÑA AVI ---
         avi_buttons_frame = tk.Frame(self.frame_avi, bg=COLOR_FRAME)
         avi_buttons_frame.pack(fill="x", pady=10)
@@ -822,6 +524,12 @@ class AnalizadorVideosApp:
                                          bg=COLOR_BUTTON, fg=COLOR_TEXT,
                                          activebackground=COLOR_PROGRESS)
         self.boton_repetidos.pack(side="left", padx=5)
+        check_entre = tk.Checkbutton(avi_buttons_frame, text="Entre carpetas",
+                                     variable=self.repetidos_entre_carpetas_var,
+                                     bg=COLOR_FRAME, fg=COLOR_TEXT, selectcolor=COLOR_BG,
+                                     activebackground=COLOR_FRAME)
+        check_entre.pack(side="left", padx=5)
+        ToolTip(check_entre, "Buscar el mismo nombre base en cualquier subcarpeta")
 
         # Área de texto específica para la pestaña AVI (resultados de esa pestaña)
         texto_avi_container = ttk.Frame(self.frame_avi)
@@ -863,6 +571,12 @@ class AnalizadorVideosApp:
                             bg=COLOR_BUTTON, fg=COLOR_TEXT,
                             activebackground=COLOR_PROGRESS)
         self.boton_repetidos_mov.pack(side="left", padx=5)
+        check_entre = tk.Checkbutton(mov_buttons_frame, text="Entre carpetas",
+                                     variable=self.repetidos_entre_carpetas_var,
+                                     bg=COLOR_FRAME, fg=COLOR_TEXT, selectcolor=COLOR_BG,
+                                     activebackground=COLOR_FRAME)
+        check_entre.pack(side="left", padx=5)
+        ToolTip(check_entre, "Buscar el mismo nombre base en cualquier subcarpeta")
 
         self.label_conteo_mov = tk.Label(self.frame_mov, text="", bg=COLOR_FRAME,
                          fg=COLOR_LABEL, anchor="w")
@@ -909,6 +623,12 @@ class AnalizadorVideosApp:
                             bg=COLOR_BUTTON, fg=COLOR_TEXT,
                             activebackground=COLOR_PROGRESS)
         self.boton_repetidos_mkv.pack(side="left", padx=5)
+        check_entre = tk.Checkbutton(mkv_buttons_frame, text="Entre carpetas",
+                                     variable=self.repetidos_entre_carpetas_var,
+                                     bg=COLOR_FRAME, fg=COLOR_TEXT, selectcolor=COLOR_BG,
+                                     activebackground=COLOR_FRAME)
+        check_entre.pack(side="left", padx=5)
+        ToolTip(check_entre, "Buscar el mismo nombre base en cualquier subcarpeta")
 
         self.label_conteo_mkv = tk.Label(self.frame_mkv, text="", bg=COLOR_FRAME,
                          fg=COLOR_LABEL, anchor="w")
@@ -976,6 +696,14 @@ class AnalizadorVideosApp:
                                           activebackground=COLOR_PROGRESS, relief="ridge")
         self.boton_ratio_alto.pack(pady=5)
 
+        self.boton_metricas = tk.Button(col_otros, text="⏱️ Tiempos del análisis",
+                                        width=25, command=self.mostrar_metricas,
+                                        bg=COLOR_BUTTON, fg=COLOR_TEXT, state="disabled",
+                                        activebackground=COLOR_PROGRESS, relief="ridge")
+        self.boton_metricas.pack(pady=5)
+        ToolTip(self.boton_metricas,
+                "Tiempo por etapa y latencias de sondeo del último análisis")
+
         self.boton_visual = tk.Button(col_otros, text="📊 Visual (Barras)", width=25,
                                     command=lambda: mostrar_grafico_visual(self.resultados,
                                                                            self.carpeta),
@@ -1016,9 +744,52 @@ class AnalizadorVideosApp:
         ToolTip(self.boton_ver_vacias_general,
                 "Lista carpetas vacías dentro de la carpeta seleccionada")
 
+        # Botón para buscar copias idénticas por contenido (no solo por nombre)
+        self.boton_duplicados = tk.Button(self.frame3, text="🧬 Duplicados", width=12,
+                                          command=self.buscar_duplicados_contenido,
+                                          bg=COLOR_BUTTON, fg=COLOR_BUTTON_TEXT,
+                                          activebackground=COLOR_PROGRESS, state="disabled")
+        self.boton_duplicados.pack(side="left", padx=5)
+        ToolTip(self.boton_duplicados,
+                "Mueve a 'repeat' los vídeos byte a byte idénticos a otro del árbol")
+
+        # Modo vigilancia: re-analiza solo los vídeos que se añaden o cambian
+        self.boton_vigilar = tk.Button(self.frame3, text="👁️ Vigilar", width=12,
+                                       command=self.alternar_vigilancia,
+                                       bg=COLOR_BUTTON, fg=COLOR_BUTTON_TEXT,
+                                       activebackground=COLOR_PROGRESS, state="disabled")
+        self.boton_vigilar.pack(side="left", padx=5)
+        ToolTip(self.boton_vigilar,
+                "Vigila la carpeta y sondea solo los vídeos nuevos o modificados")
+
         self.boton_parar.pack(side="left", padx=10)
         self.boton_parar["state"] = "disabled"
 
+        # Configuración del pool de sondeo: número de workers y tipo (hilos o procesos)
+        tk.Label(self.frame3, text="Workers:", bg=COLOR_FRAME,
+                 fg=COLOR_LABEL).pack(side="left", padx=(5, 0))
+        self.workers_var = tk.StringVar(value=str(WORKERS_POR_DEFECTO))
+        self.spin_workers = tk.Spinbox(self.frame3, from_=1, to=max(32, WORKERS_POR_DEFECTO * 4),
+                                       width=4, textvariable=self.workers_var,
+                                       bg=COLOR_ENTRY, fg=COLOR_TEXT,
+                                       buttonbackground=COLOR_BUTTON)
+        self.spin_workers.pack(side="left", padx=2)
+        ToolTip(self.spin_workers, "Número de vídeos que se sondean a la vez")
+        self.modo_workers_var = tk.StringVar(value=MODOS_WORKERS[0])
+        self.combo_modo_workers = ttk.Combobox(self.frame3, textvariable=self.modo_workers_var,
+                                               values=MODOS_WORKERS, state="readonly", width=9)
+        self.combo_modo_workers.pack(side="left", padx=2)
+        ToolTip(self.combo_modo_workers,
+                "hilos: menor coste de arranque | procesos: aísla lectores bloqueados")
+        self.reintentar_cuarentena_var = tk.BooleanVar(value=False)
+        check_cuarentena = tk.Checkbutton(self.frame3, text="Reintentar cuarentena",
+                                          variable=self.reintentar_cuarentena_var,
+                                          bg=COLOR_FRAME, fg=COLOR_TEXT, selectcolor=COLOR_BG,
+                                          activebackground=COLOR_FRAME)
+        check_cuarentena.pack(side="left", padx=5)
+        ToolTip(check_cuarentena, "Volver a sondear los vídeos que dieron timeout o error"
+                                  " en análisis anteriores y no han cambiado desde entonces")
+
         # Barra de progreso y porcentaje
         self.progress = None
         self.label_porcentaje = tk.Label(self.frame3, text="", bg=COLOR_FRAME, fg=COLOR_LABEL)
@@ -1054,6 +825,7 @@ class AnalizadorVideosApp:
                             command=self.abrir_busqueda_avanzada, state="disabled",
                             bg=COLOR_BUTTON, fg=COLOR_BUTTON_TEXT)
         self.boton_busqueda_avanzada.pack(side="right", padx=5)
+        self._actualizar_boton_busqueda()
 
         # Botón para ver análisis anterior y comentarios
         self.boton_analisis_anterior = tk.Button(extras_frame, text="📊 Análisis anterior",
@@ -1088,6 +860,16 @@ class AnalizadorVideosApp:
         self.boton_deshacer.pack(side="left", padx=5)
         ToolTip(self.boton_deshacer, "Elimina el último análisis registrado del historial")
 
+        # Botón para deshacer el último lote de movimientos de archivos
+        self.boton_deshacer_lote = tk.Button(historial_frame, text="↩️ Deshacer movimientos",
+                                             command=self.deshacer_ultimo_lote,
+                                             bg=COLOR_BUTTON, fg=COLOR_BUTTON_TEXT,
+                                             state="disabled")
+        self.boton_deshacer_lote.pack(side="left", padx=5)
+        ToolTip(self.boton_deshacer_lote,
+                "Devuelve a su sitio todos los archivos del último lote movido")
+        self._habilitar_boton_deshacer_lote()
+
         # Botón para exportar historial a CSV
         self.boton_exportar_csv = tk.Button(historial_frame, text="📊 CSV",
                                             command=self.exportar_historial_csv,
@@ -1139,8 +921,16 @@ class AnalizadorVideosApp:
         self._habilitar_botones_historial()
 
     def mostrar_grafico(self):
-        """ Llama a la función global mostrar_grafico con los resultados actuales """
-        mostrar_grafico(self.resultados, self.carpeta)
+        """ Muestra la dispersión duración vs tamaño de los resultados actuales """
+        if not len(self.resultados):
+            messagebox.askokcancel("Sin datos", "No hay vídeos válidos para graficar.")
+            return
+        carpeta = self.carpeta
+        self._mostrar_grafico_cacheado(
+            'dispersion', "Duración vs tamaño", (16, 8),
+            lambda fig, columnas: construir_grafico_dispersion(fig, columnas, carpeta),
+            lambda fig, artistas, columnas: actualizar_grafico_dispersion(
+                fig, artistas, columnas, carpeta))
 
     def mostrar_pie_previsualizar(self):
         """Muestra un gráfico de sectores basado en los recuentos de la previsualización"""
@@ -1167,11 +957,7 @@ class AnalizadorVideosApp:
         if not self.carpeta:
             messagebox.askokcancel("Advertencia", "Primero selecciona una carpeta.")
             return
-        vacias = []
-        for rooti, dirs, files in os.walk(self.carpeta):
-            # Si no hay archivos y no hay subcarpetas con archivos
-            if not files and not any(os.listdir(os.path.join(rooti, d)) for d in dirs) and not dirs:
-                vacias.append(rooti)
+        vacias = self._obtener_indice().carpetas_vacias()
         if vacias:
             texto = "Carpetas vacías:\n" + "\n".join(vacias) + "\n"
         else:
@@ -1187,9 +973,12 @@ class AnalizadorVideosApp:
     def seleccionar_carpeta(self):
         """ Abre un diálogo para seleccionar una carpeta """
         carpeta = filedialog.askdirectory()
+        if carpeta != self.carpeta:
+            self._detener_vigilancia()
         if carpeta:
             self.carpeta = carpeta
             self.carpeta_var.set(carpeta)
+            self._indice = None  # Re-indexar aunque se vuelva a elegir la misma carpeta
             self._previsualizacion_hecha = False  # Reset al seleccionar nueva carpeta
             self.boton_analizar.config(text="  🔍 Pre-analizar  ")  # Restaurar texto inicial
             self.boton["state"] = "normal"
@@ -1201,7 +990,7 @@ class AnalizadorVideosApp:
             self.boton_avi["state"] = "normal"
             self.boton_mostrar_problemas["state"] = "disabled"
             self.boton_mover_problemas["state"] = "disabled"
-            self.boton_busqueda_avanzada["state"] = "disabled"
+            self._actualizar_boton_busqueda()
             # enable MOV-specific buttons when a folder is selected
             try:
                 self.boton_mov["state"] = "normal"
@@ -1213,9 +1002,11 @@ class AnalizadorVideosApp:
             except AttributeError:
                 pass
 
-            # Habilitar el botón global "Ver Vacías"
+            # Habilitar el botón global "Ver Vacías", la búsqueda de duplicados y la vigilancia
             try:
                 self.boton_ver_vacias_general["state"] = "normal"
+                self.boton_duplicados["state"] = "normal"
+                self.boton_vigilar["state"] = "normal"
             except AttributeError:
                 pass
 
@@ -1224,11 +1015,14 @@ class AnalizadorVideosApp:
 
             self.boton.configure(bg=COLOR_BUTTON)
             self._actualizar_tabs_formatos({})
+            self._ofrecer_reanudar_sesion()
         else:
             self.boton_analizar["state"] = "disabled"
             self.boton_avi["state"] = "disabled"
             try:
                 self.boton_ver_vacias_general["state"] = "disabled"
+                self.boton_duplicados["state"] = "disabled"
+                self.boton_vigilar["state"] = "disabled"
             except AttributeError:
                 pass
             self.boton_pie_previsualizar["state"] = "disabled"
@@ -1236,7 +1030,7 @@ class AnalizadorVideosApp:
             self._actualizar_tabs_formatos({})
             self.boton_mostrar_problemas["state"] = "disabled"
             self.boton_mover_problemas["state"] = "disabled"
-            self.boton_busqueda_avanzada["state"] = "disabled"
+            self._actualizar_boton_busqueda()
             self.boton_analisis_anterior["state"] = "disabled"
 
     def analizar_o_previsualizar(self):
@@ -1262,11 +1056,7 @@ class AnalizadorVideosApp:
         # Llevar el foco a la pestaña Resultados antes de mostrar el resumen
         self.notebook.select(self.frame_resultados)
         self.texto_archivos.focus_set()
-        counts = {}
-        for _, _, files in os.walk(self.carpeta):
-            for nombre in files:
-                ext = os.path.splitext(nombre)[1].lower() or 'sin_ext'
-                counts[ext] = counts.get(ext, 0) + 1
+        counts = self._obtener_indice().contar_extensiones()
         if not counts:
             messagebox.askokcancel("Resultado", "No se encontraron archivos en la carpeta.")
             return
@@ -1285,37 +1075,13 @@ class AnalizadorVideosApp:
             messagebox.askokcancel("Aviso", "Primero selecciona una carpeta.")
             return
 
+        # El análisis completo sustituye a la vigilancia
+        self._detener_vigilancia()
+
         # Mostrar aviso si la carpeta fue analizada antes
         self._mostrar_aviso_analisis_previo()
 
-        # Buscar y mover archivos de la carpeta xcut a la raíz
-        xcut_dir = os.path.join(self.carpeta, "xcut")
-        if os.path.exists(xcut_dir) and os.path.isdir(xcut_dir):
-            archivos_movidos = 0
-            try:
-                # Listar todos los archivos en la carpeta xcut
-                for archivo in os.listdir(xcut_dir):
-                    ruta_archivo = os.path.join(xcut_dir, archivo)
-                    # Solo mover si es un archivo (no una carpeta)
-                    if os.path.isfile(ruta_archivo):
-                        destino = os.path.join(self.carpeta, archivo)
-                        try:
-                            shutil.move(ruta_archivo, destino)
-                            archivos_movidos += 1
-                        except (OSError, shutil.Error) as e:
-                            print(f"No se pudo mover {archivo} desde xcut: {e}")
-
-                # Intentar eliminar la carpeta xcut si está vacía
-                try:
-                    if os.path.exists(xcut_dir) and not os.listdir(xcut_dir):
-                        os.rmdir(xcut_dir)
-                except (OSError, shutil.Error) as e:
-                    print(f"No se pudo eliminar la carpeta xcut: {e}")
-
-                if archivos_movidos > 0:
-                    print(f"Se movieron {archivos_movidos} archivos desde xcut a la raíz")
-            except (OSError, shutil.Error) as e:
-                print(f"Error procesando la carpeta xcut: {e}")
+        # La carpeta xcut se devuelve a la raíz al empezar el análisis (MotorAnalisis)
 
         # Proceder con análisis normal usando threading
         self._parar_analisis = False  # Reset al iniciar
@@ -1347,8 +1113,38 @@ class AnalizadorVideosApp:
             self.boton_print_errores.config(state="normal")
         self.root.after(0, habilitar_otros_botones)
 
-        threading.Thread(target=self._analizar_videos_thread, args=(self.carpeta,),
-                         daemon=True).start()
+        workers, modo = self._leer_config_workers()
+        reanudar, self._reanudar_sesion = self._reanudar_sesion, False
+        threading.Thread(target=self._analizar_videos_thread,
+                         args=(self.carpeta, workers, modo, reanudar,
+                               self.reintentar_cuarentena_var.get()), daemon=True).start()
+
+    def _ofrecer_reanudar_sesion(self):
+        """Si la carpeta tiene un análisis sin terminar, pregunta si reanudarlo"""
+        sesion = SesionAnalisis(self.dir_sesiones, self.carpeta)
+        pendiente = sesion.resumen()
+        if pendiente is None:
+            return
+        inicio, procesados = pendiente
+        if messagebox.askyesno(
+                "Análisis sin terminar",
+                f"Hay un análisis de esta carpeta sin terminar (iniciado {inicio}, "
+                f"{procesados} archivos ya procesados).\n\n¿Reanudarlo ahora?"):
+            self._reanudar_sesion = True
+            self.analizar_carpeta_interno()
+        else:
+            sesion.descartar()
+
+    def _leer_config_workers(self):
+        """Devuelve (número de workers, modo) configurados en la pestaña Resultados"""
+        try:
+            workers = max(1, int(self.workers_var.get()))
+        except (tk.TclError, ValueError):
+            workers = WORKERS_POR_DEFECTO
+        modo = self.modo_workers_var.get()
+        if modo not in MODOS_WORKERS:
+            modo = MODOS_WORKERS[0]
+        return workers, modo
 
     def _actualizar_tabs_formatos(self, counts):
         """Activa o desactiva las pestañas AVI/MOV/MKV según los recuentos"""
@@ -1361,6 +1157,65 @@ class AnalizadorVideosApp:
             has_files = counts.get(ext, 0) > 0
             self.notebook.tab(frame, state="normal" if has_files else "disabled")
 
+    def _ejecutar_plan_movimientos(self, plan, descripcion):
+        """Ejecuta un PlanMovimientos, lo registra como un lote deshacible y
+        mantiene al día el índice y la caché de sondeos"""
+        resultado = ejecutar_plan_movimientos(self.datos, plan, descripcion,
+                                              self._movimientos_realizados)
+        self.root.after(0, self._habilitar_boton_deshacer_lote)
+        return resultado
+
+    def _movimientos_realizados(self, movimientos):
+        for origen, destino in movimientos:
+            self._registrar_movimiento_indice(origen, destino)
+
+    def _habilitar_boton_deshacer_lote(self):
+        try:
+            estado = "normal" if self.gestor_movimientos.ultimo_lote() else "disabled"
+            self.boton_deshacer_lote["state"] = estado
+        except (tk.TclError, AttributeError):
+            pass
+
+    def deshacer_ultimo_lote(self):
+        """Devuelve a su sitio todos los archivos del último lote de movimientos"""
+        lote = self.gestor_movimientos.ultimo_lote()
+        if lote is None:
+            messagebox.showinfo("Deshacer movimientos", "No hay movimientos que deshacer.")
+            return
+        if not messagebox.askyesno(
+                "Deshacer movimientos",
+                f"{lote['descripcion']}\n{len(lote['movimientos'])} archivos movidos el "
+                f"{lote['timestamp'][:19].replace('T', ' ')}.\n\n¿Devolverlos a su sitio?"):
+            return
+        self.boton_deshacer_lote["state"] = "disabled"
+
+        def _deshacer():
+            hechos, fallidos = self.gestor_movimientos.deshacer_ultimo_lote()
+            movimientos = [(origen, destino) for origen, destino, _etiqueta in hechos]
+            for origen, destino in movimientos:
+                self._registrar_movimiento_indice(origen, destino)
+            mensaje = f"Devueltos {len(hechos)} archivos a su ubicación original."
+            if fallidos:
+                mensaje += f" {len(fallidos)} no se pudieron devolver (quedan pendientes)."
+                for origen, _destino, _etiqueta, e in fallidos:
+                    print(f"No se pudo devolver {origen}: {e}")
+            self._log_to_text(mensaje + "\n")
+            self.root.after(0, lambda: messagebox.showinfo("Deshacer movimientos", mensaje))
+            self.root.after(0, self._habilitar_boton_deshacer_lote)
+        threading.Thread(target=_deshacer, daemon=True).start()
+
+    def _obtener_indice(self):
+        """Devuelve el índice de la carpeta seleccionada, construyéndolo si hace falta"""
+        if self._indice is None or self._indice.raiz != self.carpeta:
+            self._indice = IndiceCarpeta(self.carpeta)
+        return self._indice
+
+    def _registrar_movimiento_indice(self, origen, destino):
+        """Mantiene el índice al día tras mover un archivo (si el índice existe)"""
+        indice = self._indice
+        if indice is not None:
+            indice.registrar_movimiento(origen, destino)
+
     def contar_avis_en_subcarpetas(self):
         """Cuenta todos los archivos .avi en la carpeta seleccionada y sus subcarpetas"""
         if not self.carpeta:
@@ -1368,19 +1223,10 @@ class AnalizadorVideosApp:
             self.label_resultado.config(text=mensaje)
             self.label_conteo_avi.config(text=mensaje)
             return
-        total_avis = 0
-        total_roots = 0
-        root_list = []
-        carpetas_con_avis = []
-        for root_dir, _, files in os.walk(self.carpeta):
-            avis_en_esta_carpeta = sum(1 for f in files if f.lower().endswith('.avi'))
-            total_avis += avis_en_esta_carpeta
-            if avis_en_esta_carpeta > 0:
-                total_roots += 1
-                carpetas_con_avis.append(root_dir)
-            root_list.append(root_dir)
+        indice = self._obtener_indice()
+        carpetas_con_avis, total_avis = indice.carpetas_con_extension('.avi')
         mensaje = (f"Total - {total_avis} - archivos .avi  en "
-               f"{total_roots} carpetas de ({len(root_list)})")
+               f"{len(carpetas_con_avis)} carpetas de ({indice.num_carpetas()})")
         self.label_resultado.config(text=mensaje)
         self.label_conteo_avi.config(text=mensaje)
         # Mostrar en el cuadro de texto
@@ -1447,6 +1293,7 @@ class AnalizadorVideosApp:
             destino = os.path.join(avi_dir, archivo)
             try:
                 shutil.move(origen, destino)
+                self._registrar_movimiento_indice(origen, destino)
                 movidos += 1
                 try:
                     self.texto_avi.config(state="normal")
@@ -1482,19 +1329,10 @@ class AnalizadorVideosApp:
             self.label_resultado.config(text=mensaje)
             self.label_conteo_mov.config(text=mensaje)
             return
-        total_movs = 0
-        total_roots = 0
-        root_list = []
-        carpetas_con_movs = []
-        for root_dir, _, files in os.walk(self.carpeta):
-            movs_en_esta_carpeta = sum(1 for f in files if f.lower().endswith('.mov'))
-            total_movs += movs_en_esta_carpeta
-            if movs_en_esta_carpeta > 0:
-                total_roots += 1
-                carpetas_con_movs.append(root_dir)
-            root_list.append(root_dir)
+        indice = self._obtener_indice()
+        carpetas_con_movs, total_movs = indice.carpetas_con_extension('.mov')
         mensaje = (f"Total - {total_movs} - archivos .mov  en "
-               f"{total_roots} carpetas de ({len(root_list)})")
+               f"{len(carpetas_con_movs)} carpetas de ({indice.num_carpetas()})")
         self.label_resultado.config(text=mensaje)
         self.label_conteo_mov.config(text=mensaje)
         try:
@@ -1556,6 +1394,7 @@ class AnalizadorVideosApp:
             destino = os.path.join(mov_dir, archivo)
             try:
                 shutil.move(origen, destino)
+                self._registrar_movimiento_indice(origen, destino)
                 movidos += 1
                 try:
                     self.texto_mov.config(state="normal")
@@ -1581,75 +1420,6 @@ class AnalizadorVideosApp:
         except tk.TclError:
             pass
 
-    def buscar_movs_repetidos(self):
-        """Busca archivos .mov que tengan el mismo nombre base pero con diferente extensión
-        y los mueve a una carpeta 'repeat'."""
-        if not self.carpeta:
-            messagebox.askokcancel("Advertencia", "Primero selecciona una carpeta.")
-            return
-
-        extensiones_video = ('.mp4', '.avi', '.mkv', '.wmv', '.flv', '.webm')
-        archivos_repetidos = []
-
-        for root_dir, _, files in os.walk(self.carpeta):
-            archivos_mov = [f for f in files if f.lower().endswith('.mov')]
-
-            for archivo_mov in archivos_mov:
-                nombre_base = os.path.splitext(archivo_mov)[0]
-                for archivo in files:
-                    if archivo != archivo_mov and os.path.splitext(archivo)[0] == nombre_base:
-                        if archivo.lower().endswith(extensiones_video):
-                            archivos_repetidos.append((os.path.join(root_dir, archivo_mov),
-                                                       root_dir))
-                            break
-
-        if not archivos_repetidos:
-            print("No se encontraron archivos .mov repetidos.")
-            try:
-                self.texto_mov.config(state="normal")
-                self.texto_mov.insert(tk.END, "No se encontraron archivos .mov repetidos.\n")
-                self.texto_mov.config(state="disabled")
-            except tk.TclError:
-                pass
-            return
-
-        movidos = 0
-        for ruta_mov, carpeta_origen in archivos_repetidos:
-            repeat_dir = os.path.join(carpeta_origen, "repeat")
-            if not os.path.exists(repeat_dir):
-                os.makedirs(repeat_dir)
-
-            nombre_archivo = os.path.basename(ruta_mov)
-            destino = os.path.join(repeat_dir, nombre_archivo)
-
-            try:
-                shutil.move(ruta_mov, destino)
-                movidos += 1
-                print(f"Movido: {nombre_archivo} -> repeat/")
-                try:
-                    self.texto_mov.config(state="normal")
-                    self.texto_mov.insert(tk.END, f"Movido: {nombre_archivo} -> {repeat_dir}\n")
-                    self.texto_mov.config(state="disabled")
-                except tk.TclError:
-                    pass
-            except (OSError, shutil.Error) as e:
-                print(f"No se pudo mover {nombre_archivo}: {e}")
-                try:
-                    self.texto_mov.config(state="normal")
-                    self.texto_mov.insert(tk.END, f"No se pudo mover {nombre_archivo}: {e}\n")
-                    self.texto_mov.config(state="disabled")
-                except tk.TclError:
-                    pass
-
-        try:
-            self.texto_mov.config(state="normal")
-            self.texto_mov.insert(tk.END,
-                                  f"Se movieron {movidos} archivos .mov repetidos"
-                                  " a carpetas 'repeat'.\n")
-            self.texto_mov.config(state="disabled")
-        except tk.TclError:
-            pass
-
     def contar_mkvs_en_subcarpetas(self):
         """Cuenta todos los archivos .mkv en la carpeta seleccionada y sus subcarpetas"""
         if not self.carpeta:
@@ -1657,19 +1427,10 @@ class AnalizadorVideosApp:
             self.label_resultado.config(text=mensaje)
             self.label_conteo_mkv.config(text=mensaje)
             return
-        total = 0
-        total_roots = 0
-        root_list = []
-        carpetas = []
-        for root_dir, _, files in os.walk(self.carpeta):
-            mkvs = sum(1 for f in files if f.lower().endswith('.mkv'))
-            total += mkvs
-            if mkvs > 0:
-                total_roots += 1
-                carpetas.append(root_dir)
-            root_list.append(root_dir)
+        indice = self._obtener_indice()
+        carpetas, total = indice.carpetas_con_extension('.mkv')
         mensaje = (f"Total - {total} - archivos .mkv"
-               f"  en {total_roots} carpetas de ({len(root_list)})")
+               f"  en {len(carpetas)} carpetas de ({indice.num_carpetas()})")
         self.label_resultado.config(text=mensaje)
         self.label_conteo_mkv.config(text=mensaje)
         try:
@@ -1725,6 +1486,7 @@ class AnalizadorVideosApp:
             destino = os.path.join(mkv_dir, archivo)
             try:
                 shutil.move(origen, destino)
+                self._registrar_movimiento_indice(origen, destino)
                 movidos += 1
                 try:
                     self.texto_mkv.config(state="normal")
@@ -1747,84 +1509,18 @@ class AnalizadorVideosApp:
         except tk.TclError:
             pass
 
-    def buscar_mkvs_repetidos(self):
-        """Busca archivos .mkv que tengan el mismo nombre base
-        pero con diferente extensión y los mueve a 'repeat'."""
-        if not self.carpeta:
-            messagebox.askokcancel("Advertencia", "Primero selecciona una carpeta.")
-            return
-        extensiones_video = ('.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm')
-        repetidos = []
-        for root_dir, _, files in os.walk(self.carpeta):
-            mkvs = [f for f in files if f.lower().endswith('.mkv')]
-            for archivo_mkv in mkvs:
-                base = os.path.splitext(archivo_mkv)[0]
-                for archivo in files:
-                    if archivo != archivo_mkv and os.path.splitext(archivo)[0] == base:
-                        if archivo.lower().endswith(extensiones_video):
-                            repetidos.append((os.path.join(root_dir, archivo_mkv), root_dir))
-                            break
-        if not repetidos:
-            try:
-                self.texto_mkv.config(state="normal")
-                self.texto_mkv.insert(tk.END, "No se encontraron archivos .mkv repetidos.\n")
-                self.texto_mkv.config(state="disabled")
-            except tk.TclError:
-                pass
-            return
-        movidos = 0
-        for ruta, carpeta_origen in repetidos:
-            repeat_dir = os.path.join(carpeta_origen, "repeat")
-            if not os.path.exists(repeat_dir):
-                os.makedirs(repeat_dir)
-            nombre = os.path.basename(ruta)
-            destino = os.path.join(repeat_dir, nombre)
-            try:
-                shutil.move(ruta, destino)
-                movidos += 1
-                try:
-                    self.texto_mkv.config(state="normal")
-                    self.texto_mkv.insert(tk.END, f"Movido: {nombre} -> {repeat_dir}\n")
-                    self.texto_mkv.config(state="disabled")
-                except tk.TclError:
-                    pass
-            except (OSError, shutil.Error) as e:
-                try:
-                    self.texto_mkv.config(state="normal")
-                    self.texto_mkv.insert(tk.END, f"No se pudo mover {nombre}: {e}\n")
-                    self.texto_mkv.config(state="disabled")
-                except tk.TclError:
-                    pass
-        try:
-            self.texto_mkv.config(state="normal")
-            self.texto_mkv.insert(tk.END, f"Se movieron {movidos} archivos .mkv"
-                                  " repetidos a carpetas 'repeat'.\n")
-            self.texto_mkv.config(state="disabled")
-        except tk.TclError:
-            pass
-
-
     def mostrar_histograma_duraciones(self):
         """Muestra un histograma mejorado de la distribución de duraciones de vídeos."""
-        if not self.resultados:
+        if not len(self.resultados):
             messagebox.askokcancel("Sin datos", "No hay vídeos válidos para graficar.")
             return
+        self._mostrar_grafico_cacheado('duraciones', "Distribución de duraciones", (12, 7),
+                                       self._construir_histograma_duraciones)
 
-        duraciones = [r[1] for r in self.resultados]
-
-        # Elegir estilo disponible
-        preferred_styles = ['seaborn-v0_8-darkgrid', 'seaborn-darkgrid',
-                            'seaborn', 'ggplot', 'default']
-        for s in preferred_styles:
-            if s in plt.style.available:
-                try:
-                    plt.style.use(s)
-                except (OSError, ValueError, ImportError):
-                    continue
-                break
-
-        fig, ax = plt.subplots(figsize=(12, 7))
+    def _construir_histograma_duraciones(self, fig, columnas):
+        duraciones = columnas.duraciones
         fig.patch.set_facecolor('#f5f5f5')
+        ax = fig.add_subplot()
         ax.set_facecolor('#ffffff')
 
         # Calcular número de bins óptimo
@@ -1837,9 +1533,9 @@ class AnalizadorVideosApp:
         # Colorear los bins con degradado según frecuencia
         cm = plt.colormaps.get_cmap('RdYlGn_r')
         bin_centers = 0.5 * (bins[:-1] + bins[1:])
-        col = bin_centers - min(bin_centers)
-        if max(col) > 0:
-            col /= max(col)
+        col = bin_centers - bin_centers.min()
+        if col.max() > 0:
+            col /= col.max()
         for c, p in zip(col, patches):
             p.set_facecolor(cm(c))
 
@@ -1863,8 +1559,8 @@ class AnalizadorVideosApp:
         ax.axvspan(0, 5, alpha=0.1, color='#e74c3c', label='Muy corto (< 5 min)')
         ax.axvspan(5, 20, alpha=0.1, color='#f39c12', label='Corto (5-20 min)')
         ax.axvspan(20, 60, alpha=0.1, color='#2ecc71', label='Normal (20-60 min)')
-        if max(duraciones) > 60:
-            ax.axvspan(60, max(duraciones) + 5, alpha=0.1, color='#3498db',
+        if duraciones.max() > 60:
+            ax.axvspan(60, duraciones.max() + 5, alpha=0.1, color='#3498db',
                       label='Largo (> 60 min)')
 
         # Etiquetas y título mejorados
@@ -1883,10 +1579,10 @@ class AnalizadorVideosApp:
         legend.get_frame().set_facecolor('#ecf0f1')
 
         # Estadísticas en texto
-        muy_cortos = sum(1 for d in duraciones if d < 5)
-        muy_largos = sum(1 for d in duraciones if d > 60)
+        muy_cortos = int(np.count_nonzero(duraciones < 5))
+        muy_largos = int(np.count_nonzero(duraciones > 60))
         stats_text = (f'Total: {len(duraciones)} vídeos\nDesv. Est: {np.std(duraciones):.1f} min\n'
-                      f'Rango: {min(duraciones):.1f} - {max(duraciones):.1f} min\n'
+                      f'Rango: {duraciones.min():.1f} - {duraciones.max():.1f} min\n'
                       f'Muy cortos (<5 min): {muy_cortos}\nMuy largos (>60 min): {muy_largos}')
         ax.text(0.5, 0.98, stats_text, transform=ax.transAxes,
                fontsize=10, verticalalignment='top', horizontalalignment='center',
@@ -1901,30 +1597,20 @@ class AnalizadorVideosApp:
         ax.spines['bottom'].set_color('#2c3e50')
         ax.tick_params(colors='#2c3e50', labelsize=10)
 
-        plt.tight_layout()
-        plt.show()
+        fig.tight_layout()
 
     def mostrar_histograma_altos(self):
         """Muestra un histograma de la distribución de altos de fotograma."""
-        if not self.resultados:
+        if not len(self.resultados):
             messagebox.askokcancel("Sin datos", "No hay vídeos válidos para graficar.")
             return
+        self._mostrar_grafico_cacheado('altos', "Distribución de altos", (12, 7),
+                                       self._construir_histograma_altos)
 
-        altos = [r[3] for r in self.resultados]
-
-        # Elegir estilo disponible
-        preferred_styles = ['seaborn-v0_8-darkgrid', 'seaborn-darkgrid',
-                            'seaborn', 'ggplot', 'default']
-        for s in preferred_styles:
-            if s in plt.style.available:
-                try:
-                    plt.style.use(s)
-                except (OSError, ValueError, ImportError):
-                    continue
-                break
-
-        fig, ax = plt.subplots(figsize=(12, 7))
+    def _construir_histograma_altos(self, fig, columnas):
+        altos = columnas.altos
         fig.patch.set_facecolor('#f5f5f5')
+        ax = fig.add_subplot()
         ax.set_facecolor('#ffffff')
 
         # Crear el histograma
@@ -1932,241 +1618,274 @@ class AnalizadorVideosApp:
                                    edgecolor='white', alpha=0.7, rwidth=0.85)
 
         # Personalización
-        plt.title('Distribución de Altos de Fotograma', fontsize=16, fontweight='bold', pad=20)
-        plt.xlabel('Alto (píxeles)', fontsize=12)
-        plt.ylabel('Frecuencia (Número de vídeos)', fontsize=12)
+        ax.set_title('Distribución de Altos de Fotograma', fontsize=16, fontweight='bold', pad=20)
+        ax.set_xlabel('Alto (píxeles)', fontsize=12)
+        ax.set_ylabel('Frecuencia (Número de vídeos)', fontsize=12)
 
         # Añadir etiquetas sobre las barras
-        for i, value in enumerate(n):
-            if value > 0:
-                ax.text(bins[i] + (bins[i+1]-bins[i])/2, value, int(value),
-                        ha='center', va='bottom', fontsize=10, fontweight='bold')
+        for i in np.flatnonzero(n > 0):
+            ax.text(bins[i] + (bins[i+1]-bins[i])/2, n[i], int(n[i]),
+                    ha='center', va='bottom', fontsize=10, fontweight='bold')
 
         ax.grid(axis='y', linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        plt.show()
+        fig.tight_layout()
 
     def mostrar_grafico_ratio_vs_alto(self):
         """Muestra un gráfico de dispersión de Ratio (MB/min) vs Alto de fotograma
         dividido por formato."""
-        if not self.resultados:
+        if not len(self.resultados):
             messagebox.askokcancel("Sin datos", "No hay vídeos válidos para graficar.")
             return
-
-        # Separar datos: MKV vs Otros
-        mkv_altos, mkv_ratios = [], []
-        otros_altos, otros_ratios = [], []
-
-        for r in self.resultados:
-            # r = (nombre, duracion, peso, alto)
-            nombre, dur, peso, alto = r[0], r[1], r[2], r[3]
-            if dur > 0:
-                ratio = peso / dur
-                ext = os.path.splitext(nombre)[1].lower()
-                if ext == '.mkv':
-                    mkv_altos.append(alto)
-                    mkv_ratios.append(ratio)
-                else:
-                    otros_altos.append(alto)
-                    otros_ratios.append(ratio)
-
-        if not mkv_altos and not otros_altos:
+        if not np.any(ResultadosColumnares.desde_tuplas(self.resultados).validos):
             messagebox.askokcancel("Sin datos", "No hay vídeos con duración válida.")
             return
-
-        # Estilo
-        preferred_styles = ['seaborn-v0_8-darkgrid', 'seaborn-darkgrid',
-                            'seaborn', 'ggplot', 'default']
-        for s in preferred_styles:
-            if s in plt.style.available:
-                try:
-                    plt.style.use(s)
-                except (OSError, ValueError, ImportError):
-                    continue
-                break
-
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 12), sharex=True)
+        self._mostrar_grafico_cacheado('ratio_alto', "Ratio vs alto de fotograma", (12, 12),
+                                       self._construir_grafico_ratio_vs_alto,
+                                       self._actualizar_grafico_ratio_vs_alto)
+
+    @staticmethod
+    def _grupos_ratio_vs_alto(columnas):
+        """(altos, ratios) de MKV y del resto, solo vídeos con duración válida"""
+        mkv = columnas.validos & columnas.es_mkv
+        otros = columnas.validos & ~columnas.es_mkv
+        return ((columnas.altos[mkv], columnas.ratios[mkv]),
+                (columnas.altos[otros], columnas.ratios[otros]))
+
+    @staticmethod
+    def _texto_stats_ratio(ratios):
+        return (f'Muestras: {len(ratios)}\n'
+                f'Media: {np.mean(ratios):.2f}\n'
+                f'Mediana: {np.median(ratios):.2f}\n'
+                f'Desv. Est: {np.std(ratios):.2f}\n'
+                f'Min: {ratios.min():.2f}\n'
+                f'Max: {ratios.max():.2f}')
+
+    def _construir_grafico_ratio_vs_alto(self, fig, columnas):
+        ax1, ax2 = fig.subplots(2, 1, sharex=True)
         fig.patch.set_facecolor('#f5f5f5')
 
         def configurar_subplot(ax, altos, ratios, titulo, color_map):
             ax.set_facecolor('#ffffff')
-            if altos:
-                scatter = ax.scatter(altos, ratios, alpha=0.6, c=ratios, cmap=color_map,
-                                    edgecolors='w', s=100)
+            if len(altos):
+                muestra = indices_muestra(len(altos))
+                scatter = ax.scatter(altos[muestra], ratios[muestra], alpha=0.6,
+                                     c=ratios[muestra], cmap=color_map, edgecolors='w', s=100,
+                                     rasterized=len(altos) > MAX_PUNTOS_DISPERSION)
                 # Líneas de referencia
                 ax.axhline(80, color='green', linestyle='--', alpha=0.5, label='Umbral 80 MB/min')
                 ax.axhline(150, color='red', linestyle='--', alpha=0.5, label='Umbral 150 MB/min')
 
                 # Caja de estadísticas
-                media = np.mean(ratios)
-                mediana = np.median(ratios)
-                std = np.std(ratios)
-                stats_text = (f'Muestras: {len(ratios)}\n'
-                             f'Media: {media:.2f}\n'
-                             f'Mediana: {mediana:.2f}\n'
-                             f'Desv. Est: {std:.2f}\n'
-                             f'Min: {min(ratios):.2f}\n'
-                             f'Max: {max(ratios):.2f}')
-
-                ax.text(0.02, 0.95, stats_text, transform=ax.transAxes, fontsize=9,
-                        verticalalignment='top', bbox=dict(boxstyle='round',
-                        facecolor='#ecf0f1', alpha=0.8, edgecolor='#2c3e50'))
+                texto = ax.text(0.02, 0.95, self._texto_stats_ratio(ratios),
+                                transform=ax.transAxes, fontsize=9,
+                                verticalalignment='top', bbox=dict(boxstyle='round',
+                                facecolor='#ecf0f1', alpha=0.8, edgecolor='#2c3e50'))
 
                 ax.set_title(titulo, fontsize=14, fontweight='bold')
                 ax.set_ylabel('Ratio (MB/min)', fontsize=10)
                 ax.legend(loc='upper right', fontsize=8)
-                return scatter
-            else:
-                ax.text(0.5, 0.5, "Sin datos para este grupo", ha='center',
-                        va='center', transform=ax.transAxes)
-                return None
+                return scatter, texto
+            ax.text(0.5, 0.5, "Sin datos para este grupo", ha='center',
+                    va='center', transform=ax.transAxes)
+            return None
 
-        configurar_subplot(ax1, mkv_altos, mkv_ratios, "Archivos MKV", 'viridis')
-        configurar_subplot(ax2, otros_altos, otros_ratios, "Otros Formatos", 'plasma')
+        (mkv_altos, mkv_ratios), (otros_altos, otros_ratios) = self._grupos_ratio_vs_alto(columnas)
+        artistas = [configurar_subplot(ax1, mkv_altos, mkv_ratios, "Archivos MKV", 'viridis'),
+                    configurar_subplot(ax2, otros_altos, otros_ratios, "Otros Formatos", 'plasma')]
 
-        plt.xlabel('Alto de fotograma (píxeles)', fontsize=12)
+        ax2.set_xlabel('Alto de fotograma (píxeles)', fontsize=12)
         fig.suptitle('Relación Ratio (MB/min) vs Alto de Fotograma', fontsize=16, fontweight='bold')
 
-        plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-        plt.show()
+        fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+        return {'ejes': (ax1, ax2), 'grupos': artistas}
+
+    def _actualizar_grafico_ratio_vs_alto(self, fig, artistas, columnas):
+        grupos = self._grupos_ratio_vs_alto(columnas)
+        if any((previo is None) != (not len(altos))
+               for previo, (altos, _ratios) in zip(artistas['grupos'], grupos)):
+            # Un grupo aparece o desaparece: cambia la maquetación, se vuelve a dibujar
+            fig.clear()
+            return self._construir_grafico_ratio_vs_alto(fig, columnas)
+        for ax, previo, (altos, ratios) in zip(artistas['ejes'], artistas['grupos'], grupos):
+            if previo is None:
+                continue
+            scatter, texto = previo
+            muestra = indices_muestra(len(altos))
+            scatter.set_offsets(np.column_stack((altos[muestra], ratios[muestra])))
+            scatter.set_array(ratios[muestra])
+            scatter.set_clim(ratios.min(), ratios.max())
+            scatter.set_rasterized(len(altos) > MAX_PUNTOS_DISPERSION)
+            texto.set_text(self._texto_stats_ratio(ratios))
+            ax.relim()
+            ax.autoscale_view()
+        return artistas
 
     def mostrar_boxplot_ratio(self):
         """Genera dos histogramas de la relación Peso/Duración (MB/min)
         uno para archivos MKV y otro para todos los demás, con cajas de estadísticas."""
-        if not self.resultados:
+        if not len(self.resultados):
             messagebox.askokcancel("Sin datos", "No hay vídeos válidos para graficar.")
             return
-
-        # Separar ratios por formato (MKV vs otros)
-        ratios_mkv = []
-        ratios_otros = []
-
-        for r in self.resultados:
-            nombre, dur, peso = r[0], r[1], r[2]
-            if dur and dur > 0:
-                ratio = peso / dur
-                ext = os.path.splitext(nombre)[1].lower()
-                if ext == '.mkv':
-                    ratios_mkv.append(ratio)
-                else:
-                    ratios_otros.append(ratio)
-
-        if not ratios_mkv and not ratios_otros:
+        if not np.any(ResultadosColumnares.desde_tuplas(self.resultados).validos):
             messagebox.askokcancel("Sin datos", "No hay ratios válidos (duración 0).")
             return
+        self._mostrar_grafico_cacheado('boxplot_ratio', "Distribución de Peso/Duración",
+                                       (12, 11), self._construir_histogramas_ratio,
+                                       estilos=['seaborn-darkgrid', 'seaborn', 'ggplot',
+                                                'default'])
 
-        # Elegir estilo disponible (fallback seguro)
-        preferred_styles = ['seaborn-darkgrid', 'seaborn', 'ggplot', 'default']
-        for s in preferred_styles:
-            if s in plt.style.available:
-                try:
-                    plt.style.use(s)
-                except (OSError, ValueError, ImportError):
-                    continue
-                break
+    def _construir_histogramas_ratio(self, fig, columnas):
+        # Separar ratios por formato (MKV vs otros)
+        ratios_mkv = columnas.ratios[columnas.validos & columnas.es_mkv]
+        ratios_otros = columnas.ratios[columnas.validos & ~columnas.es_mkv]
 
         # Crear dos subplots (uno arriba, otro abajo)
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 11))
+        ax1, ax2 = fig.subplots(2, 1)
         cm = plt.colormaps.get_cmap('viridis')
 
-        # --- Subplot 1: Archivos MKV ---
-        if ratios_mkv:
-            n_bins = max(10, int(np.ceil(np.log2(len(ratios_mkv)) + 1)))
-            _, bins, patches = ax1.hist(ratios_mkv, bins=n_bins, color='#9fb3c8',
-                                         edgecolor='#2b5f78', alpha=0.75, linewidth=1.2)
+        def histograma(ax, ratios, titulo, sin_datos):
+            if not len(ratios):
+                ax.text(0.5, 0.5, sin_datos, ha='center', va='center',
+                        transform=ax.transAxes, fontsize=12, color='gray')
+                ax.set_title(f'{titulo} (n=0)', fontsize=12, fontweight='bold',
+                             color='#7f8c8d')
+                return
+            n_bins = max(10, int(np.ceil(np.log2(len(ratios)) + 1)))
+            _, bins, patches = ax.hist(ratios, bins=n_bins, color='#9fb3c8',
+                                       edgecolor='#2b5f78', alpha=0.75, linewidth=1.2)
 
             # Colorear los bins en degradado
             bin_centers = 0.5 * (bins[:-1] + bins[1:])
-            col = bin_centers - min(bin_centers)
-            if max(col) > 0:
-                col /= max(col)
+            col = bin_centers - bin_centers.min()
+            if col.max() > 0:
+                col /= col.max()
             for c, p in zip(col, patches):
-                plt.setp(p, 'facecolor', cm(c))
+                p.set_facecolor(cm(c))
 
             # Líneas de referencia
-            media_mkv = np.mean(ratios_mkv)
-            mediana_mkv = np.median(ratios_mkv)
-            std_mkv = np.std(ratios_mkv)
-            min_mkv = min(ratios_mkv)
-            max_mkv = max(ratios_mkv)
+            media = np.mean(ratios)
+            mediana = np.median(ratios)
+            std = np.std(ratios)
 
-            ax1.axvline(media_mkv, color='#e74c3c', linestyle='--', linewidth=2.5,
-                       label=f'Media: {media_mkv:.2f}', alpha=0.9)
-            ax1.axvline(mediana_mkv, color='#3498db', linestyle='-.', linewidth=2.5,
-                       label=f'Mediana: {mediana_mkv:.2f}', alpha=0.9)
+            ax.axvline(media, color='#e74c3c', linestyle='--', linewidth=2.5,
+                       label=f'Media: {media:.2f}', alpha=0.9)
+            ax.axvline(mediana, color='#3498db', linestyle='-.', linewidth=2.5,
+                       label=f'Mediana: {mediana:.2f}', alpha=0.9)
 
             # Caja de estadísticas
-            stats_mkv = (f'n = {len(ratios_mkv)}\nMedia: {media_mkv:.2f} MB/min\n'
-                         f'Mediana: {mediana_mkv:.2f} MB/min\nDesv. Est: {std_mkv:.2f}\n'
-                         f'Rango: {min_mkv:.2f} - {max_mkv:.2f}')
-            ax1.text(0.98, 0.97, stats_mkv, transform=ax1.transAxes,
+            stats = (f'n = {len(ratios)}\nMedia: {media:.2f} MB/min\n'
+                     f'Mediana: {mediana:.2f} MB/min\nDesv. Est: {std:.2f}\n'
+                     f'Rango: {ratios.min():.2f} - {ratios.max():.2f}')
+            ax.text(0.98, 0.97, stats, transform=ax.transAxes,
                     fontsize=10, verticalalignment='top', horizontalalignment='right',
                     bbox=dict(boxstyle='round', facecolor='#ecf0f1', alpha=0.95,
-                             edgecolor='#2c3e50', pad=0.8, linewidth=1.5),
+                              edgecolor='#2c3e50', pad=0.8, linewidth=1.5),
                     family='monospace', fontweight='bold', color='#2c3e50')
 
-            ax1.set_xlabel('Ratio (MB/min)', fontsize=11, fontweight='bold')
-            ax1.set_ylabel('Frecuencia', fontsize=11, fontweight='bold')
-            ax1.set_title(f'Archivos MKV (n={len(ratios_mkv)})', fontsize=12, fontweight='bold',
-                          color='#2c3e50')
-            ax1.legend(loc='upper left', fontsize=10, framealpha=0.9, edgecolor='#2c3e50')
-            ax1.grid(True, alpha=0.3, linestyle='--')
-        else:
-            ax1.text(0.5, 0.5, 'Sin datos MKV', ha='center', va='center',
-                    transform=ax1.transAxes, fontsize=12, color='gray')
-            ax1.set_title('Archivos MKV (n=0)', fontsize=12, fontweight='bold', color='#7f8c8d')
+            ax.set_xlabel('Ratio (MB/min)', fontsize=11, fontweight='bold')
+            ax.set_ylabel('Frecuencia', fontsize=11, fontweight='bold')
+            ax.set_title(f'{titulo} (n={len(ratios)})', fontsize=12, fontweight='bold',
+                         color='#2c3e50')
+            ax.legend(loc='upper left', fontsize=10, framealpha=0.9, edgecolor='#2c3e50')
+            ax.grid(True, alpha=0.3, linestyle='--')
 
-        # --- Subplot 2: Otros formatos ---
-        if ratios_otros:
-            n_bins = max(10, int(np.ceil(np.log2(len(ratios_otros)) + 1)))
-            _, bins, patches = ax2.hist(ratios_otros, bins=n_bins, color='#9fb3c8',
-                                         edgecolor='#2b5f78', alpha=0.75, linewidth=1.2)
+        # --- Subplot 1: Archivos MKV --- / --- Subplot 2: Otros formatos ---
+        histograma(ax1, ratios_mkv, 'Archivos MKV', 'Sin datos MKV')
+        histograma(ax2, ratios_otros, 'Otros formatos', 'Sin datos')
 
-            # Colorear los bins en degradado
-            bin_centers = 0.5 * (bins[:-1] + bins[1:])
-            col = bin_centers - min(bin_centers)
-            if max(col) > 0:
-                col /= max(col)
-            for c, p in zip(col, patches):
-                plt.setp(p, 'facecolor', cm(c))
-
-            # Líneas de referencia
-            media_otros = np.mean(ratios_otros)
-            mediana_otros = np.median(ratios_otros)
-            std_otros = np.std(ratios_otros)
-            min_otros = min(ratios_otros)
-            max_otros = max(ratios_otros)
-
-            ax2.axvline(media_otros, color='#e74c3c', linestyle='--', linewidth=2.5,
-                       label=f'Media: {media_otros:.2f}', alpha=0.9)
-            ax2.axvline(mediana_otros, color='#3498db', linestyle='-.', linewidth=2.5,
-                       label=f'Mediana: {mediana_otros:.2f}', alpha=0.9)
+        fig.suptitle('Histograma: distribución de Peso/Duración (MB/min)',
+                     fontsize=14, fontweight='bold', y=0.995, color='#2c3e50')
+        fig.tight_layout()
+
+    def _mostrar_grafico_cacheado(self, nombre, titulo, tamano, construir, actualizar=None,
+                                  estilos=ESTILOS_GRAFICOS, traer_al_frente=True):
+        """Muestra una gráfica reutilizando su figura mientras no cambien los resultados.
+
+        La figura se guarda por nombre junto con la versión de self.resultados con la que
+        se dibujó. Si la versión coincide solo se vuelve a mostrar; si cambió se usa
+        `actualizar` (cambia datos de los artistas) o, en su defecto, se redibuja sobre la
+        misma figura. La construcción usa la API orientada a objetos y corre en un hilo
+        aparte, salvo si la ventana está abierta (entonces la figura es del hilo de Tk).
+        """
+        entrada = self._graficos.setdefault(nombre, {
+            'version': None, 'figura': None, 'artistas': None,
+            'ventana': None, 'canvas': None, 'construyendo': False})
+        entrada['parametros'] = (titulo, tamano, construir, actualizar, estilos)
+        if entrada['construyendo']:
+            return
+        version = self._version_resultados
+        if entrada['version'] == version:
+            self._ventana_grafico(nombre, titulo, traer_al_frente)
+            return
+        columnas = ResultadosColumnares.desde_tuplas(self.resultados)
+        entrada['construyendo'] = True
 
-            # Caja de estadísticas
-            stats_otros = (f'n = {len(ratios_otros)}\nMedia: {media_otros:.2f} MB/min\n'
-                           f'Mediana: {mediana_otros:.2f} MB/min\nDesv. Est: {std_otros:.2f}\n'
-                           f'Rango: {min_otros:.2f} - {max_otros:.2f}')
-            ax2.text(0.98, 0.97, stats_otros, transform=ax2.transAxes,
-                    fontsize=10, verticalalignment='top', horizontalalignment='right',
-                    bbox=dict(boxstyle='round', facecolor='#ecf0f1', alpha=0.95,
-                             edgecolor='#2c3e50', pad=0.8, linewidth=1.5),
-                    family='monospace', fontweight='bold', color='#2c3e50')
+        def _construir():
+            try:
+                with plt.style.context(elegir_estilo(estilos)):
+                    if entrada['figura'] is not None and actualizar is not None:
+                        entrada['artistas'] = actualizar(entrada['figura'], entrada['artistas'],
+                                                         columnas)
+                    else:
+                        figura = entrada['figura'] or Figure(figsize=tamano)
+                        figura.clear()
+                        entrada['artistas'] = construir(figura, columnas)
+                        entrada['figura'] = figura
+                entrada['version'] = version
+            except (ValueError, TypeError, RuntimeError) as e:
+                print(f"No se pudo dibujar la gráfica '{nombre}': {e}")
+                return
+            finally:
+                entrada['construyendo'] = False
+            self.root.after(0, lambda: self._ventana_grafico(nombre, titulo, traer_al_frente))
 
-            ax2.set_xlabel('Ratio (MB/min)', fontsize=11, fontweight='bold')
-            ax2.set_ylabel('Frecuencia', fontsize=11, fontweight='bold')
-            ax2.set_title(f'Otros formatos (n={len(ratios_otros)})', fontsize=12, fontweight='bold',
-                          color='#2c3e50')
-            ax2.legend(loc='upper left', fontsize=10, framealpha=0.9, edgecolor='#2c3e50')
-            ax2.grid(True, alpha=0.3, linestyle='--')
+        ventana = entrada['ventana']
+        try:
+            abierta = ventana is not None and ventana.winfo_exists()
+        except tk.TclError:
+            abierta = False
+        if abierta:
+            _construir()
         else:
-            ax2.text(0.5, 0.5, 'Sin datos', ha='center', va='center',
-                    transform=ax2.transAxes, fontsize=12, color='gray')
-            ax2.set_title('Otros formatos (n=0)', fontsize=12, fontweight='bold', color='#7f8c8d')
+            threading.Thread(target=_construir, daemon=True).start()
 
-        fig.suptitle('Histograma: distribución de Peso/Duración (MB/min)',
-                     fontsize=14, fontweight='bold', y=0.995, color='#2c3e50')
-        plt.tight_layout()
-        plt.show()
+    def _ventana_grafico(self, nombre, titulo, traer_al_frente=True):
+        """Muestra (o trae al frente) la ventana con la figura cacheada `nombre`"""
+        entrada = self._graficos[nombre]
+        ventana = entrada['ventana']
+        try:
+            if ventana is not None and ventana.winfo_exists():
+                entrada['canvas'].draw_idle()
+                if traer_al_frente:
+                    ventana.deiconify()
+                    ventana.lift()
+                return
+        except tk.TclError:
+            pass
+        if not traer_al_frente:
+            return  # Se cerró mientras se redibujaba
+        ventana = tk.Toplevel(self.root)
+        ventana.title(titulo)
+        canvas = FigureCanvasTkAgg(entrada['figura'], master=ventana)
+        barra = NavigationToolbar2Tk(canvas, ventana)
+        barra.update()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        canvas.draw_idle()
+        entrada['ventana'] = ventana
+        entrada['canvas'] = canvas
+
+    def _refrescar_graficos_abiertos(self):
+        """Redibuja con los resultados actuales las gráficas que tengan la ventana abierta"""
+        if not len(self.resultados):
+            return
+        for nombre, entrada in self._graficos.items():
+            try:
+                abierta = entrada['ventana'] is not None and entrada['ventana'].winfo_exists()
+            except tk.TclError:
+                abierta = False
+            if abierta and entrada['version'] != self._version_resultados:
+                self._mostrar_grafico_cacheado(nombre, *entrada['parametros'],
+                                               traer_al_frente=False)
 
     def mostrar_analisis_anterior(self):
         """Muestra el análisis anterior, comentarios y gráfico comparativo"""
@@ -2278,9 +1997,9 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
             return
 
         # Calcular datos actuales
-        peso_total_actual = sum(r[2] for r in self.resultados)
-        duracion_total_actual = sum(r[1] for r in self.resultados)
-        altos_actual = [r[3] for r in self.resultados]
+        columnas = ResultadosColumnares.desde_tuplas(self.resultados)
+        peso_total_actual = float(columnas.pesos.sum())
+        duracion_total_actual = float(columnas.duraciones.sum())
 
         # Preparar datos para gráfico
         categorias = ['Total Archivos', 'Peso Total (MB)', 'Duración (min)', 'Alto Promedio']
@@ -2294,7 +2013,7 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
             len(self.resultados),
             peso_total_actual,
             duracion_total_actual,
-            sum(altos_actual) / len(altos_actual) if altos_actual else 0
+            float(columnas.altos.mean()) if len(columnas) else 0
         ]
 
         # Crear gráfico
@@ -2343,7 +2062,7 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
         """Abre una ventana para búsqueda avanzada por peso, duración, formato, etc."""
         ventana = tk.Toplevel(self.root)
         ventana.title("🔍 Búsqueda Avanzada")
-        ventana.geometry("500x680")
+        ventana.geometry("500x900")
         ventana.resizable(False, False)
         ventana.configure(bg=COLOR_BG)
 
@@ -2435,6 +2154,40 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
         entry_peso_max.bind("<FocusOut>", lambda e: entry_peso_max.insert(
             0, "Opcional") if not entry_peso_max.get() else None)
 
+        # ----- SECCIÓN RATIO -----
+        frame_ratio = tk.LabelFrame(main_frame, text="⚖️  Ratio (MB/min)",
+                                    bg=COLOR_FRAME, fg=COLOR_LABEL,
+                                    font=("Arial", 10, "bold"), padx=10, pady=10)
+        frame_ratio.pack(fill=tk.X, pady=10)
+
+        # Ratio mínimo
+        frame_ratio_min = tk.Frame(frame_ratio, bg=COLOR_FRAME)
+        frame_ratio_min.pack(fill=tk.X, pady=5)
+        tk.Label(frame_ratio_min, text="Mínimo:", bg=COLOR_FRAME, fg=COLOR_TEXT,
+                width=12).pack(side=tk.LEFT)
+        entry_ratio_min = tk.Entry(frame_ratio_min, width=20, bg=COLOR_ENTRY,
+                                  fg=COLOR_TEXT, font=("Arial", 10))
+        entry_ratio_min.pack(side=tk.LEFT, padx=5)
+        entry_ratio_min.insert(0, "Opcional")
+        entry_ratio_min.bind("<FocusIn>", lambda e: entry_ratio_min.delete(
+            0, tk.END) if entry_ratio_min.get() == "Opcional" else None)
+        entry_ratio_min.bind("<FocusOut>", lambda e: entry_ratio_min.insert(
+            0, "Opcional") if not entry_ratio_min.get() else None)
+
+        # Ratio máximo
+        frame_ratio_max = tk.Frame(frame_ratio, bg=COLOR_FRAME)
+        frame_ratio_max.pack(fill=tk.X, pady=5)
+        tk.Label(frame_ratio_max, text="Máximo:", bg=COLOR_FRAME, fg=COLOR_TEXT,
+                width=12).pack(side=tk.LEFT)
+        entry_ratio_max = tk.Entry(frame_ratio_max, width=20, bg=COLOR_ENTRY,
+                                  fg=COLOR_TEXT, font=("Arial", 10))
+        entry_ratio_max.pack(side=tk.LEFT, padx=5)
+        entry_ratio_max.insert(0, "Opcional")
+        entry_ratio_max.bind("<FocusIn>", lambda e: entry_ratio_max.delete(
+            0, tk.END) if entry_ratio_max.get() == "Opcional" else None)
+        entry_ratio_max.bind("<FocusOut>", lambda e: entry_ratio_max.insert(
+            0, "Opcional") if not entry_ratio_max.get() else None)
+
         # ----- SECCIÓN FORMATO -----
         frame_formato = tk.LabelFrame(main_frame, text="📁  Formato",
                                      bg=COLOR_FRAME, fg=COLOR_LABEL,
@@ -2486,6 +2239,13 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
         entry_alto_max.bind("<FocusOut>", lambda e: entry_alto_max.insert(
             0, "Opcional") if not entry_alto_max.get() else None)
 
+        # Ámbito: todas las carpetas analizadas o solo la seleccionada
+        solo_carpeta_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(main_frame, text="Solo la carpeta seleccionada",
+                       variable=solo_carpeta_var, bg=COLOR_BG, fg=COLOR_TEXT,
+                       selectcolor=COLOR_FRAME, activebackground=COLOR_BG,
+                       state="normal" if self.carpeta else "disabled").pack(anchor=tk.W)
+
         # Separador visual
         separador2 = ttk.Separator(main_frame, orient='horizontal')
         separador2.pack(fill=tk.X, pady=15)
@@ -2510,6 +2270,8 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
                 peso_max_val = obtener_valor(entry_peso_max, "Opcional")
                 alto_min_val = obtener_valor(entry_alto_min, "Opcional")
                 alto_max_val = obtener_valor(entry_alto_max, "Opcional")
+                ratio_min_val = obtener_valor(entry_ratio_min, "Opcional")
+                ratio_max_val = obtener_valor(entry_ratio_max, "Opcional")
                 formato_val = obtener_valor(entry_formato, "Opcional")
 
                 dur_min = float(dur_min_val) if dur_min_val else None
@@ -2518,38 +2280,32 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
                 peso_max = float(peso_max_val) if peso_max_val else None
                 alto_min = int(alto_min_val) if alto_min_val else None
                 alto_max = int(alto_max_val) if alto_max_val else None
-                formato = formato_val.lower() if formato_val else None
+                ratio_min = float(ratio_min_val) if ratio_min_val else None
+                ratio_max = float(ratio_max_val) if ratio_max_val else None
+                formato = formato_val.lower().lstrip('.') if formato_val else None
             except ValueError:
                 messagebox.showerror("Error", "Por favor,"
                                      " introduce valores numéricos válidos para duración,"
-                                     " peso y alto.")
+                                     " peso, ratio y alto.")
                 return
 
-            encontrados = []
-            for r in self.resultados:
-                nombre, duracion, peso, alto = r[0], r[1], r[2], r[3]
-                cumple = True
-                if dur_min is not None and duracion < dur_min:
-                    cumple = False
-                if dur_max is not None and duracion > dur_max:
-                    cumple = False
-                if peso_min is not None and peso < peso_min:
-                    cumple = False
-                if peso_max is not None and peso > peso_max:
-                    cumple = False
-                if alto_min is not None and alto < alto_min:
-                    cumple = False
-                if alto_max is not None and alto > alto_max:
-                    cumple = False
-                if formato and not nombre.lower().endswith(f".{formato}"):
-                    cumple = False
-                if cumple:
-                    encontrados.append((nombre, duracion, peso, alto))
-
-            if encontrados:
+            # Consultar el índice de todas las carpetas analizadas (sin re-sondear)
+            indice = self.indice_busqueda
+            indice.actualizar()
+            encontrados = indice.consultar(
+                {'duracion': (dur_min, dur_max), 'peso': (peso_min, peso_max),
+                 'ratio': (ratio_min, ratio_max), 'alto': (alto_min, alto_max)},
+                formato=formato,
+                carpeta=self.carpeta if solo_carpeta_var.get() else None)
+
+            if len(encontrados):
                 lineas = [f"✓ Búsqueda avanzada: {len(encontrados)} resultado(s) encontrado(s)\n\n"]
-                for nombre, dur, peso, alt in encontrados:
-                    lineas.append(f"{nombre}\t{dur:.2f} min\t{peso:.2f} MB\t{alt}p\n")
+                for i in encontrados[:MAX_LINEAS_LOG].tolist():
+                    ruta, dur, peso, alt = indice.fila(i)
+                    lineas.append(f"{os.path.basename(ruta)}\t{dur:.2f} min\t{peso:.2f} MB\t"
+                                  f"{alt}p\t{os.path.dirname(ruta)}\n")
+                if len(encontrados) > MAX_LINEAS_LOG:
+                    lineas.append(f"... y {len(encontrados) - MAX_LINEAS_LOG} más.\n")
                 texto = "".join(lineas)
             else:
                 texto = "❌ No se encontraron archivos con los criterios especificados.\n"
@@ -2582,6 +2338,11 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
                              bg=COLOR_BG, fg=COLOR_TEXT, font=("Arial", 9, "italic"))
         info_label.pack(pady=(10, 0))
 
+    def _actualizar_boton_busqueda(self):
+        """La búsqueda avanzada está disponible si hay alguna carpeta analizada"""
+        estado = "normal" if self.gestor_analisis_historico.datos else "disabled"
+        self.boton_busqueda_avanzada["state"] = estado
+
     def _actualizar_boton_analisis_anterior(self):
         """Habilita el botón de análisis anterior si la carpeta ya fue analizada"""
         if self.carpeta and self.gestor_analisis_historico.carpeta_analizada_antes(self.carpeta):
@@ -2625,11 +2386,7 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
 
     def _procesar_video(self, ruta):
         """Carga el clip y devuelve duración/peso (MB/min) y alto"""
-        with VideoFileClip(ruta) as clip:
-            duracion = clip.duration / 60
-            peso = os.path.getsize(ruta) / (1024 * 1024)
-            alto = clip.size[1]
-        return duracion, peso, alto
+        return sondear_video(ruta)
 
     def _mover_archivo_a_errores(self, ruta, archivo):
         """Mueve un archivo a su carpeta 'errores' y devuelve si tuvo éxito"""
@@ -2645,6 +2402,7 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
         for intento in range(1, max_intentos + 1):
             try:
                 shutil.move(ruta, destino)
+                self._registrar_movimiento_indice(ruta, destino)
                 # Registrar el movimiento en el historial
                 return True
             except (OSError, shutil.Error) as exc:
@@ -2659,25 +2417,16 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
                 return False
 
     def _detener_procesos_analisis(self, wait=False):
-        """Cancela y cierra el executor que analiza vídeos"""
-        if self._analisis_future and not self._analisis_future.done():
-            try:
-                self._analisis_future.cancel()
-            except (RuntimeError, CancelledError):
-                pass
-        if self._analysis_executor:
-            try:
-                self._analysis_executor.shutdown(wait=wait)
-            except (RuntimeError, OSError):
-                pass
-            finally:
-                self._analysis_executor = None
-        self._analisis_future = None
+        """Detiene el análisis en curso: cancela las tareas pendientes y cierra su executor"""
+        motor = self._motor
+        if motor is not None:
+            motor.parar(wait)
 
     def on_closing(self):
         """Maneja el cierre de la aplicación de forma limpia"""
         self._parar_analisis = True
         self._detener_procesos_analisis(wait=False)
+        self._detener_vigilancia()
 
         # Limpiar variables de Tkinter para evitar errores en __del__ (Python 3.13+)
         try:
@@ -2693,14 +2442,62 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
         except Exception:
             pass
 
-    def _actualizar_texto_archivos(self, callback):
-        """Ejecuta operaciones sobre el Text central desde el hilo principal"""
-        def _run():
+    def _log_to_text(self, mensaje, tag='1.0'):
+        """Encola líneas para insertarlas en la parte superior del Text.
+        Se vuelcan agrupadas cada INTERVALO_LOG_MS para no saturar la cola de eventos de Tk."""
+        self._cola_log.put(('log', mensaje))
+
+    def _set_texto_archivos(self, texto):
+        """Reemplaza todo el contenido del Text central"""
+        self._cola_log.put(('set', texto))
+        if threading.current_thread() is threading.main_thread():
+            self._vaciar_cola_log()
+
+    def _publicar_progreso(self, valor, porcentaje):
+        """Guarda el progreso más reciente; solo se pinta el último de cada intervalo"""
+        self._progreso_pendiente = (valor, porcentaje)
+
+    def _ciclo_volcado_log(self):
+        """Vuelca periódicamente el log y el progreso pendientes"""
+        # Una sola lectura: el hilo de análisis pone self._motor a None al terminar
+        motor = self._motor
+        if motor is not None:
+            # Durante un análisis el repintado cuenta como etapa 'interfaz' de sus métricas
+            with motor.metricas.etapa('interfaz'):
+                self._vaciar_cola_log()
+        else:
+            self._vaciar_cola_log()
+        try:
+            self.root.after(INTERVALO_LOG_MS, self._ciclo_volcado_log)
+        except tk.TclError:
+            pass  # La ventana ya se cerró
+
+    def _vaciar_cola_log(self):
+        """Aplica en una sola operación todos los mensajes encolados (hilo principal)"""
+        reemplazo = None
+        mensajes = []
+        while True:
+            try:
+                tipo, texto = self._cola_log.get_nowait()
+            except queue.Empty:
+                break
+            if tipo == 'set':
+                reemplazo = texto
+                mensajes = []  # Lo anterior al reemplazo ya no se vería
+            else:
+                mensajes.append(texto)
+        if reemplazo is not None or mensajes:
             try:
-                if not self.root.winfo_exists():
-                    return
                 self.texto_archivos.config(state="normal")
-                callback()
+                if reemplazo is not None:
+                    self.texto_archivos.delete(1.0, tk.END)
+                    self.texto_archivos.insert('1.0', reemplazo)
+                if mensajes:
+                    # Cada mensaje iba arriba del anterior: el más reciente queda primero
+                    self.texto_archivos.insert('1.0', "".join(reversed(mensajes)))
+                    lineas = int(self.texto_archivos.index('end-1c').split('.')[0])
+                    if lineas > MAX_LINEAS_LOG:
+                        self.texto_archivos.delete(f"{MAX_LINEAS_LOG + 1}.0", tk.END)
             except (tk.TclError, AttributeError):
                 pass
             finally:
@@ -2708,254 +2505,84 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
                     self.texto_archivos.config(state="disabled")
                 except (tk.TclError, AttributeError):
                     pass
-        self.root.after(0, _run)
-
-    def _log_to_text(self, mensaje, tag='1.0'):
-        """Inserta líneas en la parte superior del Text de forma segura"""
-        self._actualizar_texto_archivos(lambda: self.texto_archivos.insert(tag, mensaje))
-
-    def _set_texto_archivos(self, texto):
-        """Reemplaza todo el contenido del Text central"""
-        def _update():
-            self.texto_archivos.delete(1.0, tk.END)
-            self.texto_archivos.insert('1.0', texto)
-        self._actualizar_texto_archivos(_update)
-
-    def _analizar_videos_thread(self, carpeta):
-        """ Función que se ejecuta en un hilo para analizar los vídeos en carpeta y subcarpetas """
-        tiempo_inicio = time.time()
-        extensiones_video = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm')
-        archivos = []
-        rutas_archivos = []
-        carpetas_archivos = []
-        # Recorrer carpeta y subcarpetas
-        for root_dir, _, files in os.walk(carpeta):
-            if os.path.basename(root_dir).lower() == "errores":
-                continue
-            for f in files:
-                if f.lower().endswith(extensiones_video):
-                    archivos.append(f)
-                    rutas_archivos.append(os.path.join(root_dir, f))
-                    carpetas_archivos.append(root_dir)
-        total = len(rutas_archivos)
-        resultados = []
-        # Contadores para movimientos realizados durante el análisis
-        moved_counts = {'optimizar': 0, 'review': 0, 'errores': 0}
-
+        progreso, self._progreso_pendiente = self._progreso_pendiente, None
+        if progreso is not None:
+            self._actualizar_progreso(*progreso)
+
+    def _analizar_videos_thread(self, carpeta, workers=WORKERS_POR_DEFECTO, modo="hilos",
+                                reanudar=False, reintentar_cuarentena=False):
+        """ Función que se ejecuta en un hilo para analizar los vídeos en carpeta y subcarpetas.
+        El trabajo lo hace MotorAnalisis; aquí se conectan sus avisos con la interfaz.
+        Con `reanudar` recupera lo ya sondeado en el punto de control de una sesión anterior
+        y con `reintentar_cuarentena` vuelve a sondear los archivos en cuarentena. """
         self._set_texto_archivos("")
 
         self.videos_problema.clear()
         self._detener_procesos_analisis(wait=False)
         self.root.after(0, self._actualizar_botones_problemas)
 
-        def crear_barra():
+        def crear_barra(total):
             """ Crea la barra de progreso """
             self.progress = ttk.Progressbar(self.frame3, length=800,
                                             mode="determinate", maximum=total)
             self.progress.pack(pady=2)
             self.label_porcentaje.config(text="0%")
             self.frame3.update_idletasks()
-        self.root.after(0, crear_barra)
-        self._analysis_executor = ThreadPoolExecutor(max_workers=1)
-
-        for idx, (
-            archivo, ruta, carpeta_actual
-            ) in enumerate(zip(archivos, rutas_archivos, carpetas_archivos), 1):
-            if self._parar_analisis:
-                break  # Sale del bucle si se pulsó "Parar"
-            carpetita = os.path.basename(os.path.dirname(ruta))
-            self._log_to_text(f"Analizando archivo: {idx}\n{carpetita} - {archivo}\n")
-
-            if not self._analysis_executor:
-                self._analysis_executor = ThreadPoolExecutor(max_workers=1)
-            future = self._analysis_executor.submit(self._procesar_video, ruta)
-            self._analisis_future = future
-            skip_video = False
 
-            try:
-                duracion, peso, alto = future.result(timeout=30)
-                if duracion > 0:
-                    resultados.append((archivo, duracion, peso, ruta, carpeta_actual, alto))
-            except TimeoutError:
-                self._registrar_video_problema(ruta, archivo, "Timeout >30s")
-                self._log_to_text(f"Timeout >30s en {archivo}, registro problemático.\n")
-                skip_video = True
-            except CancelledError:
-                # Cuando se cancela la tarea, continuar sin marcar como problema
-                self._log_to_text(f"Análisis cancelado para {archivo}.\n")
-                skip_video = True
-            except (OSError, ValueError) as e:
-                parent_basename = os.path.basename(os.path.dirname(ruta)).lower()
-                err_msg = str(e)
-                self._log_to_text(err_msg + "\n")
-                self._registrar_video_problema(ruta, archivo, err_msg)
-                if parent_basename == "errores":
-                    print(f"Archivo ya en 'errores', no se mueve: {ruta}")
-                skip_video = True
-
-            porcentaje = int((idx / total) * 100)
-            self.root.after(0, lambda val=idx,
-                            pct=porcentaje: self._actualizar_progreso(val, pct))
-
-            if skip_video:
-                continue
-            if idx % 5 == 0:
-                self.root.after(0, self.frame3.update_idletasks)
+        def publicar_progreso(procesados, total):
+            self._publicar_progreso(procesados, int(procesados / total * 100))
+
+        metricas = MetricasAnalisis()
+        self._metricas = metricas
+        motor = MotorAnalisis(
+            self.datos, workers, modo,
+            al_log=self._log_to_text,
+            al_empezar=lambda total: self.root.after(0, lambda: crear_barra(total)),
+            al_progreso=publicar_progreso,
+            al_problema=self._registrar_video_problema,
+            al_mover=self._movimientos_realizados,
+            metricas=metricas, reintentar_cuarentena=reintentar_cuarentena)
+        self._motor = motor
+        if self._parar_analisis:
+            motor.parar()  # Se pulsó Parar antes de que el hilo arrancara
+        informe = motor.analizar(carpeta, reanudar)
+        self._motor = None
+        total = informe['total_archivos']
+        tiempo_total = informe['tiempo']
 
         self.root.after(0, lambda: self.boton_parar.config(state="disabled"))
-        self._detener_procesos_analisis(wait=True)
         self.root.after(0, self._actualizar_botones_problemas)
+        self.root.after(0, self._habilitar_boton_deshacer_lote)
 
-        # --- Mover archivos que cumplen la condición a la carpeta
-        # "review", "xcut" o "optimizar" ---
-        for nombre, duracion, peso, ruta, carpeta_actual, *_extra in resultados:
-            # Evita crear subcarpetas dentro de sí mismas (review/xcut/optimizar)
-            basename_actual = os.path.basename(carpeta_actual).lower()
-            # calcular ratio MB/min de forma segura
-            ratio = (peso / duracion) if duracion else 0
-
-            # Prioridad: mover a 'optimizar' si la relación peso/duración es excesiva
-            if ratio > 100:
-                if basename_actual != "optimizar":
-                    optim_dir = os.path.join(carpeta_actual, "optimizar")
-                else:
-                    optim_dir = carpeta_actual
-                if not os.path.exists(optim_dir):
-                    os.makedirs(optim_dir)
-                destino = os.path.join(optim_dir, nombre)
-                try:
-                    shutil.move(ruta, destino)
-                    moved_counts['optimizar'] += 1
-                except (OSError, shutil.Error) as e:
-                    print(f"No se pudo mover {nombre} a 'optimizar': {e}")
-
-            elif duracion > 20 and ratio < 50:
-                # Verificar que el archivo sea .mkv antes de mover a review
-                ext_archivo = os.path.splitext(nombre)[1].lower()
-                if ext_archivo == ".mkv":
-                    if basename_actual != "review":
-                        review_dir = os.path.join(carpeta_actual, "review")
-                    else:
-                        review_dir = carpeta_actual
-                    if not os.path.exists(review_dir):
-                        os.makedirs(review_dir)
-                    destino = os.path.join(review_dir, nombre)
-                    try:
-                        shutil.move(ruta, destino)
-                        moved_counts['review'] += 1
-                    except (OSError, shutil.Error) as e:
-                        print(f"No se pudo mover {nombre}: {e}")
-
-        # Calcular estadísticas por extensión y preparar resumen
-        # Conteo total de archivos por extensión (a partir de la lista inicial `archivos`)
-        counts_by_ext = {}
-        for f in archivos:
-            ext = os.path.splitext(f)[1].lower() or 'sin_ext'
-            counts_by_ext[ext] = counts_by_ext.get(ext, 0) + 1
-
-        # Calcular peso medio por minuto por extensión usando los resultados válidos
-        peso_sum_by_ext = {}
-        dur_sum_by_ext = {}
-
-        for nombre, dur, peso, ruta, carpeta, alto in resultados:
-            ext = os.path.splitext(nombre)[1].lower() or 'sin_ext'
-            peso_sum_by_ext[ext] = peso_sum_by_ext.get(ext, 0.0) + peso
-            dur_sum_by_ext[ext] = dur_sum_by_ext.get(ext, 0.0) + dur
-
-        avg_by_ext = {}
-        for ext in counts_by_ext:
-            total_peso = peso_sum_by_ext.get(ext, 0.0)
-            total_dur = dur_sum_by_ext.get(ext, 0.0)
-            avg = (total_peso / total_dur) if total_dur > 0 else 0.0
-            avg_by_ext[ext] = avg
-
-        resumen_por_alto = self.generar_resumen_por_alto(resultados)
-
-        # Preparar texto del resumen
-        resumen_lines = []
-        resumen_lines.append("\nResumen del análisis:\n")
-        resumen_lines.append("="*80 + "\n")
-
-        # Calcular rating
-        estrellas_rating, pct_bien, bien_opt, mal_opt, categoria_rating = (
-            calcular_rating_optimizacion(resultados))
-        rating_info = {
-            'estrellas': estrellas_rating,
-            'pct_bien': pct_bien,
-            'bien_optimizados': bien_opt,
-            'mal_optimizados': mal_opt,
-            'categoria': categoria_rating
-        }
-        estrella_llena = "★"
-        estrella_vacia = "☆"
-        representacion_estrellas = (
-            estrella_llena * estrellas_rating + estrella_vacia * (5 - estrellas_rating))
-
-        resumen_lines.append(f"\nRATING DE OPTIMIZACIÓN: {representacion_estrellas} - "
-                             f"{categoria_rating}\n")
-        resumen_lines.append(f"Archivos bien optimizados (10-100 MB/min): {bien_opt} "
-                             f"({pct_bien:.1f}%)\n")
-        resumen_lines.append(f"Archivos mal optimizados (>100 MB/min): {mal_opt} "
-                             f"({100-pct_bien:.1f}%)\n")
-        resumen_lines.append("="*80 + "\n")
-
-        resumen_lines.append("\nNúmero de archivos por extensión:\n")
-        for ext, cnt in sorted(counts_by_ext.items(), key=lambda x: x[0]):
-            resumen_lines.append(f"- {cnt} archivos {ext}\n")
-        resumen_lines.append("\nPeso medio por minuto por extensión:\n")
-        for ext, avg in sorted(avg_by_ext.items(), key=lambda x: x[0]):
-            resumen_lines.append(f"- {ext}: {avg:.2f} MB/min\n")
-
-        resumen_lines.append("\nPeso medio por minuto por alto de fotograma:\n")
-        for alto in sorted(resumen_por_alto.keys()):
-            datos = resumen_por_alto[alto]
-            resumen_lines.append(
-                f"- {alto}p: {datos['promedio']:.2f} MB/min ({datos['conteo']} archivos)\n"
-            )
-
-        resumen_lines.append("\nArchivos movidos durante el análisis:\n")
-        for k, v in moved_counts.items():
-            resumen_lines.append(f"- {v} archivos -> {k}\n")
+        resumen_text = texto_resumen(informe)
         if self.videos_problema:
-            resumen_lines.append(
+            resumen_text += (
                 f"\nSe detectaron {len(self.videos_problema)} vídeos problemáticos."
                 " Usa 'Mostrar problemáticos' para verlos y"
                 " 'Mover problemáticos' para enviarlos a errores.\n")
 
-        resumen_text = "".join(resumen_lines)
-
         # Preparado el resumen (se mostrará desde 'actualizar_interfaz')
 
         def destruir_barra():
             if self.progress is not None:
                 self.progress.destroy()
 
+        self._progreso_pendiente = None  # Que un volcado tardío no pise el 100 %
         self.root.after(0, lambda: self._actualizar_progreso(total, 100))
         self.root.after(0, destruir_barra)
         self.root.after(0, lambda: self.boton_busqueda_avanzada.config(state="normal"))
         self.root.after(0, lambda: self._actualizar_boton_analisis_anterior())
 
-        # Registrar el análisis en el historial con estadísticas por formato
-        # Usar len(resultados) que es la cantidad de videos procesados correctamente
-        self.gestor_historial.registrar_analisis(
-            carpeta=self.carpeta,
-            counts_by_ext=counts_by_ext,
-            avg_by_ext=avg_by_ext,
-            total_archivos=len(resultados),
-            rating=rating_info
-        )
-
-        # Actualiza resultados para mostrar solo nombre, duracion, peso, alto
-        self.resultados = [(nombre, duracion, peso, alto) for nombre, duracion,
-                           peso, _, _, alto in resultados]
-
-        # Registrar análisis en historial
-        self.gestor_analisis_historico.registrar_analisis(self.carpeta, self.resultados)
-
-        tiempo_fin = time.time()  # <-- Añade esto justo antes de actualizar_interfaz
-        tiempo_total = tiempo_fin - tiempo_inicio
+        # Los resultados se exponen como (nombre, duracion, peso, alto) sobre las columnas
+        self.resultados = informe['columnas']
+        self._version_resultados += 1
 
         def actualizar_interfaz():
+            with metricas.etapa('interfaz'):
+                _actualizar_interfaz()
+            self.boton_metricas["state"] = "normal"
+
+        def _actualizar_interfaz():
             if not self.resultados:
                 self.label_resultado.config(text="No se encontraron vídeos válidos.")
                 self.boton_grafico["state"] = "disabled"
@@ -2998,7 +2625,7 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
             # Habilitar/deshabilitar botón Boxplot según número de ratios válidos
             # Condición: necesitamos al menos 3 vídeos con duración > 0
             # para que el boxplot tenga sentido
-            valid_ratios_count = sum(1 for r in self.resultados if r[1] and r[1] > 0)
+            valid_ratios_count = int(np.count_nonzero(self.resultados.validos))
             if valid_ratios_count >= 3:
                 self.boton_boxplot["state"] = "normal"
             else:
@@ -3021,6 +2648,213 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
 
         self.root.after(0, actualizar_interfaz)
 
+    def alternar_vigilancia(self):
+        """Activa o desactiva el modo vigilancia sobre la carpeta seleccionada"""
+        if self._vigilante is not None:
+            self._detener_vigilancia()
+            return
+        if not self.carpeta:
+            messagebox.askokcancel("Aviso", "Primero selecciona una carpeta.")
+            return
+        if self._motor is not None:
+            messagebox.askokcancel("Aviso", "Espera a que termine el análisis en curso.")
+            return
+        workers, _modo = self._leer_config_workers()
+        self._vigilante = VigilanteCarpeta(self.carpeta)
+        self.boton_vigilar.config(text="⏹ No vigilar", bg=COLOR_BUTTON_HIGHLIGHT)
+        self.boton_analizar["state"] = "disabled"
+        self.notebook.select(self.frame_resultados)
+        # La variable Tk se lee aquí, en el hilo de la interfaz, no desde el vigilante
+        reintentar = self.reintentar_cuarentena_var.get()
+        threading.Thread(target=self._vigilar_thread,
+                         args=(self._vigilante, workers, reintentar), daemon=True).start()
+
+    def _detener_vigilancia(self):
+        """Termina el modo vigilancia (el hilo sale en la siguiente comprobación)"""
+        if self._vigilante is None:
+            return
+        self._vigilante = None
+        try:
+            self.boton_vigilar.config(text="👁️ Vigilar", bg=COLOR_BUTTON)
+            self.boton_analizar["state"] = "normal"
+        except (tk.TclError, AttributeError):
+            pass
+
+    def _vigilar_thread(self, vigilante, workers, reintentar):
+        """Hilo del modo vigilancia: mantiene los resultados de la carpeta al día
+        sondeando solo los vídeos que el vigilante da por nuevos o modificados"""
+        carpeta = vigilante.raiz
+        archivos = vigilante.iniciar()
+        self._log_to_text(f"Vigilando {carpeta} ({vigilante.modo}): {len(archivos)} vídeos.\n")
+        registros = {}  # ruta -> (nombre, duracion, peso, ruta, carpeta, alto) válidos
+        rutas, posiciones = [], {}  # fila de cada ruta en self.resultados
+        columnas = ResultadosColumnares.desde_tuplas([])
+        cambiados, borrados = archivos, set()
+        primera = True
+        limite_sondeo = TimeoutAdaptativo()  # Aprende de todos los lotes de la vigilancia
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            while self._vigilante is vigilante:
+                if cambiados or borrados or primera:
+                    afectadas = set(cambiados) | set(borrados)
+                    antes = {ruta: registros.get(ruta) for ruta in afectadas}
+                    for ruta in borrados:
+                        registros.pop(ruta, None)
+                    self._sondear_cambios(executor, cambiados, registros, limite_sondeo,
+                                          reintentar, lambda: self._vigilante is vigilante)
+                    afectadas = [ruta for ruta in afectadas if registros.get(ruta) != antes[ruta]]
+                    n_cambiados, n_borrados = len(cambiados), len(borrados)
+                    if afectadas or primera:
+                        primera = False
+                        columnas = self._aplicar_cambios_vigilancia(
+                            columnas, rutas, posiciones, registros, afectadas)
+                        self.resultados = columnas
+                        self._version_resultados += 1
+                        self.root.after(0, lambda: self._mostrar_resultados_vigilancia(
+                            vigilante, n_cambiados, n_borrados))
+                    else:
+                        self._log_to_text(f"Vigilancia: {n_cambiados} vídeos tocados y"
+                                          f" {n_borrados} borrados sin cambios en los"
+                                          " resultados.\n")
+                cambiados, borrados = vigilante.esperar_cambios()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            vigilante.cerrar()
+        self._log_to_text(f"Fin de la vigilancia de {carpeta}.\n")
+
+    @staticmethod
+    def _aplicar_cambios_vigilancia(columnas, rutas, posiciones, registros, afectadas):
+        """Lleva a `columnas` solo las filas de `afectadas`: la fila vieja de cada
+        ruta se sustituye por la última (rutas/posiciones se actualizan en el sitio)
+        y el registro nuevo, si lo hay, se añade al final"""
+        indices = np.arange(len(rutas))
+        for ruta in afectadas:
+            i = posiciones.pop(ruta, None)
+            if i is None:
+                continue
+            ultima = rutas.pop()
+            if i < len(rutas):
+                rutas[i] = ultima
+                posiciones[ultima] = i
+                indices[i] = indices[len(rutas)]
+        nuevas = []
+        for ruta in afectadas:
+            if ruta in registros:
+                posiciones[ruta] = len(rutas)
+                rutas.append(ruta)
+                nuevas.append(registros[ruta])
+        return columnas.con_filas(indices[:len(rutas) - len(nuevas)], nuevas)
+
+    def _sondear_cambios(self, executor, cambiados, registros, limite_sondeo, reintentar,
+                         activo):
+        """Actualiza `registros` con los vídeos cambiados {ruta: (tamano, mtime_ns)}.
+        Lo que siga en la caché o en la cuarentena con la misma firma no se vuelve a sondear
+        salvo que `reintentar` pida volver a probar los de la cuarentena. Cada sondeo tiene
+        el límite de `limite_sondeo` como en MotorAnalisis; si `activo()` deja de ser cierto
+        se abandonan los que queden."""
+        if not cambiados:
+            return
+        en_cache = self.cache_sondeos.buscar(cambiados)
+        en_cuarentena = self.datos.cuarentena.buscar(cambiados)
+        futuros = {}
+        acertadas = []
+        nuevos_sondeos = []
+        fallidos = []
+
+        def anotar(ruta, duracion, peso, alto):
+            if duracion > 0:
+                registros[ruta] = (os.path.basename(ruta), duracion, peso, ruta,
+                                   os.path.dirname(ruta), alto)
+            else:
+                registros.pop(ruta, None)
+
+        for ruta, firma in cambiados.items():
+            guardado = en_cache.get(ruta)
+            if guardado is not None and tuple(guardado[:2]) == firma:
+                anotar(ruta, *guardado[2:])
+                acertadas.append(ruta)
+                continue
+            aislado = en_cuarentena.get(ruta)
+            if not reintentar and aislado is not None and tuple(aislado[:2]) == firma:
+                registros.pop(ruta, None)
+                self._registrar_video_problema(ruta, os.path.basename(ruta),
+                                               f"En cuarentena: {aislado[2]}")
+                continue
+            self._log_to_text(f"Cambio detectado: {os.path.basename(ruta)}\n")
+            futuros[executor.submit(sondear_video_cronometrado, ruta)] = (ruta, firma)
+
+        pendientes = dict(futuros)
+        inicios = {}  # future -> instante en que empezó a ejecutarse
+        while pendientes and activo():
+            hechos, _ = wait(pendientes, timeout=0.5, return_when=FIRST_COMPLETED)
+            ahora = time.monotonic()
+            # El límite de cada archivo corre desde que su sondeo empieza a ejecutarse
+            for future in list(pendientes):
+                if future in hechos:
+                    continue
+                if future.running():
+                    inicios.setdefault(future, ahora)
+                ruta, firma = pendientes[future]
+                limite = limite_sondeo.para(max(0, firma[0]))
+                if future in inicios and ahora - inicios[future] > limite:
+                    del pendientes[future]
+                    future.cancel()
+                    motivo = f"Timeout >{limite:.0f}s"
+                    registros.pop(ruta, None)
+                    self._registrar_video_problema(ruta, os.path.basename(ruta), motivo)
+                    self._log_to_text(f"{motivo} en {os.path.basename(ruta)},"
+                                      " registro problemático.\n")
+                    fallidos.append((ruta, *firma, motivo))
+            for future in hechos:
+                ruta, firma = pendientes.pop(future)
+                try:
+                    duracion, peso, alto, segundos = future.result()
+                except (OSError, ValueError) as e:
+                    registros.pop(ruta, None)
+                    self._registrar_video_problema(ruta, os.path.basename(ruta), str(e))
+                    self._log_to_text(f"{e}\n")
+                    fallidos.append((ruta, *firma, str(e)))
+                    continue
+                limite_sondeo.anotar(segundos)
+                anotar(ruta, duracion, peso, alto)
+                nuevos_sondeos.append((ruta, *firma, duracion, peso, alto))
+        for future in pendientes:
+            future.cancel()  # Vigilancia detenida: sin resultado ni cuarentena
+        self.cache_sondeos.guardar(nuevos_sondeos, acertadas)
+        self.datos.cuarentena.actualizar(
+            fallidos, [ruta for ruta, *_sondeo in nuevos_sondeos if ruta in en_cuarentena])
+        if futuros:
+            self.root.after(0, self._actualizar_botones_problemas)
+
+    def _mostrar_resultados_vigilancia(self, vigilante, cambiados, borrados):
+        """Refresca resumen, rating, botones y gráficas abiertas tras un lote de cambios"""
+        if self._vigilante is not vigilante:
+            return
+        if cambiados or borrados:
+            self._log_to_text(f"Vigilancia: {cambiados} vídeos nuevos o modificados,"
+                              f" {borrados} borrados.\n")
+        columnas = self.resultados
+        if not len(columnas):
+            self.label_resultado.config(text=f"Vigilando ({vigilante.modo}):"
+                                             " aún no hay vídeos válidos.")
+            return
+        estrellas, _pct_bien, _bien_opt, _mal_opt, categoria = (
+            calcular_rating_optimizacion(columnas))
+        representacion_estrellas = "★" * estrellas + "☆" * (5 - estrellas)
+        self.label_resultado.config(
+            text=(f"Vigilando ({vigilante.modo})"
+                  f"   |   Peso medio por minuto: {calcular_peso_medio(columnas):.2f} MB/min"
+                  f"   |   Duración media: {calcular_duracion_media(columnas):.1f} min"
+                  f"   |   Total archivos: {len(columnas)}"
+                  f"   |   Rating: {representacion_estrellas} ({categoria})"))
+        self.boton_grafico["state"] = "normal"
+        self.boton_histograma["state"] = "normal"
+        self.boton_histograma_altos["state"] = "normal"
+        self.boton_ratio_alto["state"] = "normal"
+        self.boton_boxplot["state"] = (
+            "normal" if np.count_nonzero(columnas.validos) >= 3 else "disabled")
+        self._refrescar_graficos_abiertos()
+
     def _actualizar_progreso(self, valor, porcentaje):
         try:
             if self.progress:
@@ -3032,25 +2866,7 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
     def generar_resumen_por_alto(self, resultados=None):
         """Devuelve estadísticas agregadas (conteo/promedio) por altura"""
         resultados = resultados if resultados is not None else self.resultados
-        resumen = {}
-        for registro in resultados:
-            if len(registro) < 4:
-                continue
-            alto = registro[-1]
-            duracion = registro[1]
-            peso = registro[2]
-            datos = resumen.setdefault(alto, {
-                'peso_total': 0.0,
-                'dur_total': 0.0,
-                'conteo': 0
-            })
-            datos['peso_total'] += peso
-            datos['dur_total'] += duracion
-            datos['conteo'] += 1
-        for datos in resumen.values():
-            dur_total = datos['dur_total']
-            datos['promedio'] = (datos['peso_total'] / dur_total) if dur_total > 0 else 0.0
-        return resumen
+        return ResultadosColumnares.desde_tuplas(resultados).resumen_por_alto()
 
     def _registrar_video_problema(self, ruta, archivo, motivo):
         """Registra un video como problemático para mostrar/mover luego"""
@@ -3119,6 +2935,32 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
         self._log_to_text(mensaje + "\n")
         messagebox.showinfo("Videos problemáticos", mensaje)
 
+    def mostrar_metricas(self):
+        """Muestra el tiempo por etapa y las latencias de sondeo del último análisis"""
+        if self._metricas is None:
+            messagebox.showinfo("Tiempos", "Aún no se ha realizado ningún análisis.")
+            return
+
+        ventana = tk.Toplevel(self.root)
+        ventana.title("Tiempos del análisis")
+        ventana.geometry("900x600")
+        ventana.configure(bg=COLOR_BG)
+
+        frame_texto = ttk.Frame(ventana)
+        frame_texto.pack(fill="both", expand=True, padx=5, pady=5)
+
+        texto = tk.Text(frame_texto, height=25, width=100, bg=COLOR_BG, fg=COLOR_TEXT,
+                        insertbackground=COLOR_LABEL, wrap="none")
+        texto.pack(side="left", fill="both", expand=True)
+
+        scroll = ttk.Scrollbar(frame_texto, orient="vertical", command=texto.yview)
+        scroll.pack(side="right", fill="y")
+        texto.configure(yscrollcommand=scroll.set)
+        texto.config(font=("Consolas", 9))
+
+        texto.insert(tk.END, texto_metricas(self._metricas.resumen()))
+        texto.config(state="disabled")
+
     def mostrar_historial_movimientos(self):
         """Muestra una ventana con el historial de análisis realizados"""
         # Recargar el historial desde el archivo para asegurar que está actualizado
@@ -3196,6 +3038,15 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
                 linea_rating = "Rating: no disponible\n"
             texto.insert(tk.END, linea_rating)
 
+            metricas = analisis.get('metricas')
+            if metricas:
+                sondeos = metricas.get('sondeos', {})
+                texto.insert(tk.END, (
+                    f"Tiempo: {metricas.get('total_s', 0):.1f} s | "
+                    f"Sondeos: {sondeos.get('total', 0)} "
+                    f"(caché {sondeos.get('cache', 0)}, timeouts {sondeos.get('timeouts', 0)}) | "
+                    f"p90: {sondeos.get('p90_ms', 0)} ms\n"))
+
         texto.config(state="disabled")
 
     def deshacer_ultimo_movimiento(self):
@@ -3289,84 +3140,114 @@ Altos únicos:          {', '.join(str(a) + 'p' for a in analisis_anterior['alto
         self.root.after(0, _update)
 
     def buscar_avis_repetidos(self):
-        """Busca archivos .avi que tengan el mismo nombre base pero con diferente extensión
-        y los mueve a una carpeta 'repeat'."""
-        if not self.carpeta:
-            messagebox.askokcancel("Advertencia", "Primero selecciona una carpeta.")
-            return
-
-        extensiones_video = ('.mp4', '.mov', '.mkv', '.wmv', '.flv', '.webm')
-        archivos_repetidos = []
+        """Mueve a 'repeat' los .avi que tienen el mismo nombre base que otro vídeo"""
+        self._buscar_repetidos('.avi', self.texto_avi)
 
-        # Recorrer carpeta y subcarpetas
-        for root_dir, _, files in os.walk(self.carpeta):
-            archivos_avi = [f for f in files if f.lower().endswith('.avi')]
+    def buscar_movs_repetidos(self):
+        """Mueve a 'repeat' los .mov que tienen el mismo nombre base que otro vídeo"""
+        self._buscar_repetidos('.mov', self.texto_mov)
 
-            for archivo_avi in archivos_avi:
-                nombre_base = os.path.splitext(archivo_avi)[0]
+    def buscar_mkvs_repetidos(self):
+        """Mueve a 'repeat' los .mkv que tienen el mismo nombre base que otro vídeo"""
+        self._buscar_repetidos('.mkv', self.texto_mkv)
 
-                # Buscar si existe el mismo nombre con otra extensión
-                for archivo in files:
-                    if archivo != archivo_avi and os.path.splitext(archivo)[0] == nombre_base:
-                        if archivo.lower().endswith(extensiones_video):
-                            archivos_repetidos.append((os.path.join(root_dir, archivo_avi),
-                                                       root_dir))
-                            break
+    def _buscar_repetidos(self, ext, texto_widget):
+        """Busca archivos `ext` que tengan el mismo nombre base pero con diferente extensión
+        y los mueve a una carpeta 'repeat' junto al archivo."""
+        if not self.carpeta:
+            messagebox.askokcancel("Advertencia", "Primero selecciona una carpeta.")
+            return
 
-        if not archivos_repetidos:
-            print("No se encontraron archivos .avi repetidos.")
+        def escribir(linea):
             try:
-                self.texto_avi.config(state="normal")
-                self.texto_avi.insert(tk.END, "No se encontraron archivos .avi repetidos.\n")
-                self.texto_avi.config(state="disabled")
+                texto_widget.config(state="normal")
+                texto_widget.insert(tk.END, linea)
+                texto_widget.config(state="disabled")
             except tk.TclError:
+                # Ignorar errores de actualización del widget Text
+                # (por ejemplo, si la interfaz se cerró)
                 pass
-            #messagebox.askokcancel("Resultado", "No se encontraron archivos .avi repetidos.")
-            return
 
-        # Mover archivos repetidos a carpeta 'repeat'
-        movidos = 0
-        for ruta_avi, carpeta_origen in archivos_repetidos:
-            repeat_dir = os.path.join(carpeta_origen, "repeat")
-            if not os.path.exists(repeat_dir):
-                os.makedirs(repeat_dir)
+        entre_carpetas = bool(self.repetidos_entre_carpetas_var.get())
+        archivos_repetidos = self._obtener_indice().repetidos_por_base(ext, entre_carpetas)
 
-            nombre_archivo = os.path.basename(ruta_avi)
-            destino = os.path.join(repeat_dir, nombre_archivo)
+        if not archivos_repetidos:
+            print(f"No se encontraron archivos {ext} repetidos.")
+            escribir(f"No se encontraron archivos {ext} repetidos.\n")
+            return
 
-            try:
-                shutil.move(ruta_avi, destino)
-                movidos += 1
-                print(f"Movido: {nombre_archivo} -> repeat/")
-                try:
-                    self.texto_avi.config(state="normal")
-                    self.texto_avi.insert(tk.END, f"Movido: {nombre_archivo} -> {repeat_dir}\n")
-                    self.texto_avi.config(state="disabled")
-                except tk.TclError:
-                    # Ignorar errores de actualización del widget Text
-                    # (por ejemplo, si la interfaz se cerró)
-                    pass
-            except (OSError, shutil.Error) as e:
-                print(f"No se pudo mover {nombre_archivo}: {e}")
-                try:
-                    self.texto_avi.config(state="normal")
-                    self.texto_avi.insert(tk.END, f"No se pudo mover {nombre_archivo}: {e}\n")
-                    self.texto_avi.config(state="disabled")
-                except tk.TclError:
-                    # Ignorar errores de actualización del widget Text relacionados con Tkinter
-                    pass
+        movidos = self._mover_a_repeat(archivos_repetidos, escribir,
+                                       f"Repetidos {ext} a 'repeat'")
+        print(f"Se movieron {movidos} archivos {ext} repetidos a carpetas 'repeat'.")
+        escribir(f"Se movieron {movidos} archivos {ext} repetidos a carpetas 'repeat'.\n")
+
+    def _mover_a_repeat(self, repetidos, escribir, descripcion):
+        """Mueve cada archivo de [(ruta, carpeta_origen, variantes)] a la carpeta 'repeat'
+        de su carpeta como un lote deshacible y devuelve cuántos se movieron.
+        Nunca sobrescribe: si en 'repeat' ya hay un archivo con ese nombre, o la carpeta
+        no se puede crear, el archivo se queda donde está."""
+        plan = PlanMovimientos()
+        for ruta, carpeta_origen, variantes in repetidos:
+            otras = ", ".join(os.path.relpath(v, carpeta_origen) for v in variantes)
+            plan.anadir(ruta, os.path.join(carpeta_origen, "repeat", os.path.basename(ruta)),
+                        otras)
+        hechos, fallidos = self._ejecutar_plan_movimientos(plan, descripcion)
+
+        for origen, destino, otras in hechos:
+            nombre_archivo = os.path.basename(origen)
+            print(f"Movido: {nombre_archivo} -> repeat/ (variantes: {otras})")
+            escribir(f"Movido: {nombre_archivo} -> {os.path.dirname(destino)}"
+                     f"  [variantes: {otras}]\n")
+        for origen, _destino, _otras, e in fallidos:
+            nombre_archivo = os.path.basename(origen)
+            print(f"No se pudo mover {nombre_archivo}: {e}")
+            escribir(f"No se pudo mover {nombre_archivo}: {e}\n")
+        return len(hechos)
+
+    def buscar_duplicados_contenido(self):
+        """Busca vídeos byte a byte idénticos en todo el árbol y mueve las copias a 'repeat'"""
+        if not self.carpeta:
+            messagebox.askokcancel("Advertencia", "Primero selecciona una carpeta.")
+            return
+        indice = self._obtener_indice()
+        rutas = [os.path.join(d, nombre) for d, nombres in indice.directorios()
+                 if os.path.basename(d).lower() not in ("repeat", "errores")
+                 for nombre in nombres if os.path.splitext(nombre)[1].lower() in EXTENSIONES_VIDEO]
+        workers, _modo = self._leer_config_workers()
+        self._parar_analisis = False
+        self.boton_parar.config(state="normal")
+        self.boton_duplicados.config(state="disabled")
+        self.notebook.select(self.frame_resultados)
+        self._set_texto_archivos(f"Buscando duplicados por contenido entre {len(rutas)} vídeos...\n")
+        threading.Thread(target=self._duplicados_thread, args=(rutas, workers),
+                         daemon=True).start()
 
-        print(f"Se movieron {movidos} archivos .avi repetidos a carpetas 'repeat'.")
-        try:
-            self.texto_avi.config(state="normal")
-            self.texto_avi.insert(tk.END,
-                                  f"Se movieron {movidos} archivos .avi repetidos"
-                                  " a carpetas 'repeat'.\n")
-            self.texto_avi.config(state="disabled")
-        except tk.TclError:
-            # Ignorar errores específicos de tkinter al actualizar el widget Text
-            pass
-        #messagebox.askokcancel("Resultado", f"Se movieron {movidos} archivos .avi repetidos.")
+    def _duplicados_thread(self, rutas, workers):
+        """Hilo de búsqueda de duplicados: conserva el primer archivo de cada grupo"""
+        tiempo_inicio = time.time()
+        grupos = buscar_duplicados_contenido(rutas, workers,
+                                             parar=lambda: self._parar_analisis)
+        copias = []
+        for grupo in grupos:
+            original = grupo[0]
+            for ruta in grupo[1:]:
+                copias.append((ruta, os.path.dirname(ruta), [original]))
+
+        movidos = 0
+        if not self._parar_analisis:
+            movidos = self._mover_a_repeat(copias, self._log_to_text,
+                                           "Duplicados por contenido a 'repeat'")
+        mensaje = (f"Duplicados por contenido: {len(grupos)} grupos, {len(copias)} copias,"
+                   f" {movidos} movidas a 'repeat' ({time.time() - tiempo_inicio:.1f} s)\n")
+        if self._parar_analisis:
+            mensaje = "Búsqueda de duplicados cancelada.\n"
+        print(mensaje.strip())
+        self._log_to_text(mensaje)
+
+        def restaurar_botones():
+            self.boton_parar.config(state="disabled")
+            self.boton_duplicados.config(state="normal")
+        self.root.after(0, restaurar_botones)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,339 @@
+""" Banco de pruebas de rendimiento del analizador de vídeos.
+
+Genera árboles sintéticos de vídeos MP4/MKV/AVI mínimos (solo la cabecera que lee
+video_probe) y mide por separado cada etapa del análisis de MotorAnalisis: recorrido,
+sondeo, guardado de la caché, estadísticas, registro en los historiales y clasificación
+(calcular_rating_optimizacion y las reglas de ordenación, sin mover nada). Con el
+sondeo simulado no se abre ningún archivo, para medir solo la sobrecarga propia.
+
+    python benchmark_analisis.py                          # 1k, 10k y 100k archivos
+    python benchmark_analisis.py -n 1000 10000 -o hoy.json
+    python benchmark_analisis.py -n 10000 --comparar ayer.json
+
+Escribe los tiempos en JSON (o CSV) para poder comparar versiones; con --comparar
+avisa de las etapas que han empeorado más que el umbral y termina con código 1.
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime
+import numpy as np
+from motor_analisis import (WORKERS_POR_DEFECTO, MODOS_WORKERS, DatosAnalizador, MotorAnalisis,
+                            MetricasAnalisis, calcular_rating_optimizacion,
+                            planificar_ordenacion, sondear_video_cronometrado)
+
+TAMANOS_POR_DEFECTO = (1000, 10000, 100000)
+ARCHIVOS_POR_CARPETA = 200  # Vídeos por carpeta hoja del árbol sintético
+CARPETAS_POR_GRUPO = 50  # Carpetas hoja por carpeta intermedia
+PROPORCION_OTROS = 0.1  # Archivos que no son vídeo (el recorrido los tiene que descartar)
+ALTOS = (360, 480, 720, 1080, 2160)
+UMBRAL_REGRESION = 0.2  # Empeoramiento relativo a partir del que se avisa al comparar
+MINIMO_REGRESION_S = 0.05  # Por debajo de esto las diferencias son ruido
+
+
+# --- Cabeceras sintéticas ---
+def _caja_mp4(tipo, datos):
+    return struct.pack('>I4s', 8 + len(datos), tipo) + datos
+
+
+def cabecera_mp4(duracion_s, ancho, alto):
+    """ftyp + moov (mvhd y una pista de vídeo con tkhd y hdlr)"""
+    mvhd = _caja_mp4(b'mvhd', bytes(12) + struct.pack('>II', 1000, int(duracion_s * 1000))
+                     + bytes(80))
+    tkhd = bytearray(84)
+    struct.pack_into('>ii', tkhd, 40, 0x10000, 0)  # Matriz sin rotación
+    struct.pack_into('>II', tkhd, 76, ancho << 16, alto << 16)
+    hdlr = _caja_mp4(b'hdlr', bytes(8) + b'vide' + bytes(12))
+    trak = _caja_mp4(b'trak', _caja_mp4(b'tkhd', bytes(tkhd)) + _caja_mp4(b'mdia', hdlr))
+    return (_caja_mp4(b'ftyp', b'isom' + bytes(4)) + _caja_mp4(b'moov', mvhd + trak)
+            + _caja_mp4(b'mdat', b''))
+
+
+def _elemento_ebml(id_elem, datos):
+    # Tamaño siempre en 8 bytes (marca 0x01) para no calcular la longitud mínima
+    return (id_elem.to_bytes((id_elem.bit_length() + 7) // 8, 'big') + b'\x01'
+            + len(datos).to_bytes(7, 'big') + datos)
+
+
+def cabecera_mkv(duracion_s, ancho, alto):
+    """Cabecera EBML + Segment con Info (escala y duración) y Tracks (una pista de vídeo)"""
+    info = _elemento_ebml(0x1549A966,
+                          _elemento_ebml(0x2AD7B1, (1000000).to_bytes(3, 'big'))
+                          + _elemento_ebml(0x4489, struct.pack('>d', duracion_s * 1000)))
+    video = _elemento_ebml(0xE0, _elemento_ebml(0xB0, ancho.to_bytes(2, 'big'))
+                           + _elemento_ebml(0xBA, alto.to_bytes(2, 'big')))
+    pista = _elemento_ebml(0xAE, _elemento_ebml(0x83, b'\x01') + video)
+    return (_elemento_ebml(0x1A45DFA3, b'')
+            + _elemento_ebml(0x18538067, info + _elemento_ebml(0x1654AE6B, pista)))
+
+
+def _chunk_riff(fourcc, datos, tipo_lista=b''):
+    datos = tipo_lista + datos
+    return struct.pack('<4sI', fourcc, len(datos)) + datos + b'\x00' * (len(datos) & 1)
+
+
+def cabecera_avi(duracion_s, ancho, alto, fps=25):
+    """RIFF AVI con hdrl: avih (fotogramas y dimensiones) y strl/strh de vídeo"""
+    frames = int(duracion_s * fps)
+    avih = bytearray(56)
+    struct.pack_into('<I', avih, 0, 1000000 // fps)
+    struct.pack_into('<I', avih, 16, frames)
+    struct.pack_into('<II', avih, 32, ancho, alto)
+    strh = bytearray(56)
+    strh[0:4] = b'vids'
+    struct.pack_into('<II', strh, 20, 1, fps)
+    struct.pack_into('<I', strh, 32, frames)
+    strl = _chunk_riff(b'LIST', _chunk_riff(b'strh', bytes(strh)), b'strl')
+    hdrl = _chunk_riff(b'LIST', _chunk_riff(b'avih', bytes(avih)) + strl, b'hdrl')
+    return _chunk_riff(b'RIFF', hdrl, b'AVI ')
+
+
+CABECERAS = {'.mp4': cabecera_mp4, '.mkv': cabecera_mkv, '.avi': cabecera_avi}
+
+
+def generar_arbol(raiz, archivos, semilla=0):
+    """Crea `archivos` vídeos sintéticos (y un 10 % de archivos que no lo son) repartidos
+    en raiz/gNNN/dNNNNN/. Si el árbol ya existe con el mismo tamaño se reutiliza."""
+    marca = os.path.join(raiz, ".benchmark_arbol")
+    try:
+        with open(marca, encoding="utf-8") as f:
+            if json.load(f) == {'archivos': archivos, 'semilla': semilla}:
+                return
+    except (OSError, ValueError):
+        pass
+    shutil.rmtree(raiz, ignore_errors=True)
+    azar = random.Random(semilla)
+    extensiones = sorted(CABECERAS)
+    carpeta = None
+    for i in range(archivos):
+        if i % ARCHIVOS_POR_CARPETA == 0:
+            hoja = i // ARCHIVOS_POR_CARPETA
+            carpeta = os.path.join(raiz, f"g{hoja // CARPETAS_POR_GRUPO:03d}", f"d{hoja:05d}")
+            os.makedirs(carpeta)
+        ext = extensiones[i % len(extensiones)]
+        alto = azar.choice(ALTOS)
+        cabecera = CABECERAS[ext](azar.uniform(60, 7200), alto * 16 // 9, alto)
+        with open(os.path.join(carpeta, f"v{i:07d}{ext}"), "wb") as f:
+            f.write(cabecera)
+        if azar.random() < PROPORCION_OTROS:
+            with open(os.path.join(carpeta, f"v{i:07d}.srt"), "wb") as f:
+                f.write(b"1\n00:00:00,000 --> 00:00:01,000\n-\n")
+    with open(marca, "w", encoding="utf-8") as f:
+        json.dump({'archivos': archivos, 'semilla': semilla}, f)
+
+
+# --- Sondeo simulado ---
+def sondeo_simulado(ruta):
+    """Sustituto de sondear_video_cronometrado que no abre el archivo: deriva duración,
+    ratio y alto del nombre, repartidos de forma que salgan vídeos bien y mal optimizados
+    y candidatos a 'review'. Es de módulo para poder usarse también con procesos."""
+    inicio = time.perf_counter()
+    h = zlib.crc32(os.path.basename(ruta).encode("utf-8"))
+    duracion = 1 + h % 120
+    ratio = 5 + (h >> 8) % 200
+    alto = ALTOS[(h >> 16) % len(ALTOS)]
+    return duracion, duracion * ratio, alto, time.perf_counter() - inicio
+
+
+SONDEADORES = {'simulado': sondeo_simulado, 'real': sondear_video_cronometrado}
+
+
+# --- Medición ---
+def _medir_clasificacion(columnas):
+    """Segundos de calcular_rating_optimizacion y de planificar la ordenación"""
+    carpetas = columnas.carpetas.tolist() if columnas.carpetas is not None else []
+    tuplas = [(nombre, duracion, peso, os.path.join(carpeta, nombre), carpeta, alto)
+              for (nombre, duracion, peso, alto), carpeta in zip(columnas, carpetas)]
+    inicio = time.perf_counter()
+    calcular_rating_optimizacion(columnas)
+    planificar_ordenacion(tuplas)
+    return time.perf_counter() - inicio
+
+
+def medir(raiz, archivos, sondeo, workers, modo, repeticiones, dir_trabajo):
+    """Analiza el árbol `repeticiones` veces con historiales y caché vacíos y devuelve
+    el mejor tiempo de cada etapa, además del de un segundo análisis ya cacheado"""
+    mejores = {}
+    for repeticion in range(repeticiones):
+        dir_datos = os.path.join(dir_trabajo, f"datos_{sondeo}_{archivos}_{repeticion}")
+        shutil.rmtree(dir_datos, ignore_errors=True)
+        os.makedirs(dir_datos)
+        datos = DatosAnalizador(dir_datos)
+        etapas = {}
+        for pasada in ("", "_cacheado"):
+            metricas = MetricasAnalisis()
+            motor = MotorAnalisis(datos, workers, modo, ordenar=False, metricas=metricas,
+                                  sondeador=SONDEADORES[sondeo])
+            informe = motor.analizar(raiz)
+            resumen = informe['metricas']
+            if pasada:
+                etapas['analisis_cacheado'] = resumen['total_s']
+                continue
+            etapas.update(resumen['etapas_s'])
+            etapas['clasificacion'] = _medir_clasificacion(informe['columnas'])
+            etapas['analisis'] = resumen['total_s']
+            validos = len(informe['columnas'])
+        for etapa, segundos in etapas.items():
+            mejores[etapa] = min(segundos, mejores.get(etapa, float("inf")))
+        shutil.rmtree(dir_datos, ignore_errors=True)
+    return {
+        'archivos': archivos,
+        'sondeo': sondeo,
+        'modo': modo,
+        'workers': workers,
+        'repeticiones': repeticiones,
+        'validos': validos,
+        'etapas_s': {etapa: round(segundos, 4) for etapa, segundos in mejores.items()},
+        'archivos_por_s': (round(archivos / mejores['analisis'], 1)
+                           if mejores['analisis'] else None),
+    }
+
+
+def entorno():
+    """Versión del código y de la máquina con la que se midió"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'fecha': datetime.now().isoformat(timespec="seconds"),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+# --- Salida y comparación ---
+def escribir_resultados(informe, formato, salida):
+    if formato == "csv":
+        writer = csv.writer(salida)
+        writer.writerow(['Archivos', 'Sondeo', 'Modo', 'Workers', 'Etapa', 'Segundos'])
+        for resultado in informe['resultados']:
+            for etapa, segundos in resultado['etapas_s'].items():
+                writer.writerow([resultado['archivos'], resultado['sondeo'], resultado['modo'],
+                                 resultado['workers'], etapa, segundos])
+    else:
+        json.dump(informe, salida, indent=2, ensure_ascii=False)
+        salida.write("\n")
+
+
+def texto_tabla(resultados):
+    """Tabla legible con una columna por medición"""
+    etapas = []
+    for resultado in resultados:
+        etapas.extend(e for e in resultado['etapas_s'] if e not in etapas)
+    cabeceras = [f"{r['archivos']} {r['sondeo']}" for r in resultados]
+    lineas = [f"{'etapa (s)':<18}" + "".join(f"{c:>18}" for c in cabeceras)]
+    for etapa in etapas:
+        lineas.append(f"{etapa:<18}" + "".join(
+            f"{r['etapas_s'].get(etapa, float('nan')):>18.3f}" for r in resultados))
+    lineas.append(f"{'archivos/s':<18}" + "".join(
+        f"{r['archivos_por_s'] or 0:>18.0f}" for r in resultados))
+    return "\n".join(lineas) + "\n"
+
+
+def comparar(resultados, base, umbral=UMBRAL_REGRESION):
+    """Devuelve [(medición, etapa, antes, ahora)] de las etapas que han empeorado más
+    que `umbral` respecto a las mismas mediciones de `base`. Las etapas sin tiempo
+    de referencia (0 s) no tienen porcentaje con el que comparar y se omiten."""
+    anteriores = {(r['archivos'], r['sondeo'], r['modo'], r['workers']): r['etapas_s']
+                  for r in base.get('resultados', [])}
+    regresiones = []
+    for resultado in resultados:
+        clave = (resultado['archivos'], resultado['sondeo'], resultado['modo'],
+                 resultado['workers'])
+        antes = anteriores.get(clave)
+        if antes is None:
+            continue
+        for etapa, ahora in resultado['etapas_s'].items():
+            previo = antes.get(etapa)
+            if (previo and ahora - previo > MINIMO_REGRESION_S
+                    and ahora > previo * (1 + umbral)):
+                regresiones.append((f"{clave[0]} {clave[1]}", etapa, previo, ahora))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mide el rendimiento del analizador sobre árboles de vídeos sintéticos.")
+    parser.add_argument("-n", "--archivos", type=int, nargs="+",
+                        default=list(TAMANOS_POR_DEFECTO),
+                        help="Tamaños de árbol a medir (por defecto: %(default)s)")
+    parser.add_argument("--sondeo", choices=("simulado", "real", "ambos"), default="ambos",
+                        help="simulado: sin abrir los archivos | real: leyendo las cabeceras")
+    parser.add_argument("-w", "--workers", type=int, default=WORKERS_POR_DEFECTO)
+    parser.add_argument("--modo", choices=MODOS_WORKERS, default=MODOS_WORKERS[0])
+    parser.add_argument("-r", "--repeticiones", type=int, default=1,
+                        help="Análisis por medición; se guarda el mejor tiempo de cada etapa")
+    parser.add_argument("--arboles", help="Carpeta donde generar (y reutilizar) los árboles;"
+                                          " por defecto una temporal que se borra al acabar")
+    parser.add_argument("-f", "--formato", choices=("json", "csv"), default="json")
+    parser.add_argument("-o", "--salida", help="Archivo de resultados (por defecto, la consola)")
+    parser.add_argument("--comparar", help="Resultados JSON de otra versión con los que comparar")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION,
+                        help="Empeoramiento relativo que cuenta como regresión"
+                             " (por defecto: %(default)s)")
+    args = parser.parse_args(argv)
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+
+    sondeos = ("simulado", "real") if args.sondeo == "ambos" else (args.sondeo,)
+    dir_trabajo = tempfile.mkdtemp(prefix="benchmark_analisis_")
+    dir_arboles = args.arboles or os.path.join(dir_trabajo, "arboles")
+    resultados = []
+    try:
+        for archivos in args.archivos:
+            raiz = os.path.join(dir_arboles, f"arbol_{archivos}")
+            inicio = time.perf_counter()
+            generar_arbol(raiz, archivos)
+            print(f"Árbol de {archivos} archivos listo en {time.perf_counter() - inicio:.1f} s",
+                  file=sys.stderr)
+            for sondeo in sondeos:
+                resultado = medir(raiz, archivos, sondeo, max(1, args.workers), args.modo,
+                                  max(1, args.repeticiones), dir_trabajo)
+                resultados.append(resultado)
+                print(f"  {sondeo}: {resultado['etapas_s']['analisis']:.2f} s"
+                      f" ({resultado['archivos_por_s']} archivos/s)", file=sys.stderr)
+    finally:
+        shutil.rmtree(dir_trabajo, ignore_errors=True)
+
+    sys.stderr.write("\n" + texto_tabla(resultados))
+    informe = {'entorno': entorno(), 'resultados': resultados}
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8", newline="") as salida:
+            escribir_resultados(informe, args.formato, salida)
+    else:
+        escribir_resultados(informe, args.formato, sys.stdout)
+
+    if base is not None:
+        regresiones = comparar(resultados, base, args.umbral)
+        for medicion, etapa, antes, ahora in regresiones:
+            variacion = f"{(ahora / antes - 1) * 100:+.0f} %" if antes else "n/a"
+            print(f"REGRESIÓN {medicion} - {etapa}: {antes:.3f} s -> {ahora:.3f} s"
+                  f" ({variacion})", file=sys.stderr)
+        if regresiones:
+            return 1
+        print(f"Sin regresiones respecto a {args.comparar}.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
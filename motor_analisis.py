@@ -0,0 +1,2832 @@
+""" Motor del analizador de vídeos, sin interfaz gráfica.
+
+Reúne el sondeo, la clasificación y la ordenación de los vídeos de una carpeta junto
+con los historiales, la caché y los índices que usa analizer.py. También se puede usar
+desde la línea de órdenes, p. ej. para analizar varios discos a la vez:
+
+    python motor_analisis.py /media/disco1 /media/disco2 -p 2 -w 8 -f json -o informe.json
+
+Escribe en los mismos historiales que lee la interfaz (por defecto en la carpeta de trabajo).
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import csv
+import errno
+import hashlib
+import heapq
+import itertools
+import json
+import mmap
+import os
+import select
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor, CancelledError,
+                                wait, FIRST_COMPLETED)
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from moviepy import VideoFileClip
+from video_probe import leer_cabecera_video
+
+# --- Sondeo de vídeos en paralelo ---
+EXTENSIONES_VIDEO = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm')
+TIMEOUT_SONDEO = 30  # Segundos máximos por archivo mientras no haya latencias observadas
+TIMEOUT_SONDEO_MINIMO = 10.0  # Nunca se abandona un sondeo antes de esto
+TIMEOUT_SONDEO_MAXIMO = 120.0  # Ni se espera más, por grande que sea el archivo
+SEGUNDOS_TIMEOUT_POR_GB = 2.0  # Margen añadido por cada GB del archivo
+MARGEN_TIMEOUT_LATENCIA = 10  # Veces la latencia p99 observada que se concede a cada sondeo
+MUESTRAS_TIMEOUT = 20  # Sondeos necesarios antes de fiarse de las latencias observadas
+WORKERS_POR_DEFECTO = os.cpu_count() or 1
+MODOS_WORKERS = ("hilos", "procesos")
+
+# --- Historiales ---
+MINIMO_COMPACTAR_DIARIO = 200  # Operaciones en el diario antes de plantearse compactar
+
+# --- Reanudación de análisis ---
+INTERVALO_CHECKPOINT = 2.0  # Segundos entre volcados a disco del punto de control
+
+def sondear_video(ruta):
+    """Devuelve duración (min), peso (MB) y alto (px) del vídeo.
+    Lee primero la cabecera del contenedor y solo abre el clip con moviepy
+    (que lanza un lector ffmpeg) si ese camino rápido falla.
+    Es una función de módulo para poder enviarla también a un ProcessPoolExecutor."""
+    peso = os.path.getsize(ruta) / (1024 * 1024)
+    try:
+        duracion_seg, _ancho, alto = leer_cabecera_video(ruta)
+        return duracion_seg / 60, peso, alto
+    except ValueError:
+        pass
+    with VideoFileClip(ruta) as clip:
+        duracion = clip.duration / 60
+        alto = clip.size[1]
+    return duracion, peso, alto
+
+
+class TimeoutAdaptativo:
+    """Límite de espera de cada sondeo según el tamaño del archivo y las latencias vistas.
+
+    Hasta reunir MUESTRAS_TIMEOUT sondeos concede TIMEOUT_SONDEO; después,
+    MARGEN_TIMEOUT_LATENCIA veces la latencia p99 de los últimos sondeos. A eso se le
+    suma SEGUNDOS_TIMEOUT_POR_GB por GB del archivo y se acota entre el mínimo y el máximo.
+    """
+    def __init__(self, muestras=500):
+        self._latencias = deque(maxlen=muestras)
+        self._base = TIMEOUT_SONDEO
+        self._sin_recalcular = 0
+
+    def anotar(self, segundos):
+        """Registra la latencia de un sondeo terminado (la p99 se recalcula cada
+        MUESTRAS_TIMEOUT sondeos para no ordenar la ventana en cada uno)"""
+        self._latencias.append(segundos)
+        self._sin_recalcular += 1
+        if self._sin_recalcular >= MUESTRAS_TIMEOUT:
+            self._sin_recalcular = 0
+            self._base = float(np.percentile(self._latencias, 99)) * MARGEN_TIMEOUT_LATENCIA
+
+    def para(self, tamano):
+        """Segundos que se espera al sondeo de un archivo de `tamano` bytes"""
+        limite = self._base + tamano / 1024 ** 3 * SEGUNDOS_TIMEOUT_POR_GB
+        return min(TIMEOUT_SONDEO_MAXIMO, max(TIMEOUT_SONDEO_MINIMO, limite))
+
+
+def matar_procesos_executor(executor):
+    """Mata los procesos de un ProcessPoolExecutor (p. ej. con un lector de moviepy
+    bloqueado). El pool queda roto: sus tareas en vuelo hay que enviarlas a otro."""
+    # ProcessPoolExecutor no expone qué proceso ejecuta cada tarea ni cómo pararlos
+    for proceso in list((getattr(executor, '_processes', None) or {}).values()):
+        try:
+            proceso.kill()
+        except (OSError, AttributeError):
+            pass
+
+# --- Movimientos en bloque ---
+MOVIMIENTOS_EN_PARALELO = 4  # Copias simultáneas cuando origen y destino están en discos distintos
+
+class PlanMovimientos:
+    """Movimientos de archivos que se ejecutan en bloque.
+
+    Agrupa por carpeta de destino para crear cada carpeta una sola vez, usa
+    os.rename dentro del mismo dispositivo y deja para un pool de hilos solo los
+    movimientos entre dispositivos (copia + borrado). Nunca sobrescribe un destino
+    existente, para que el lote se pueda deshacer.
+    """
+    def __init__(self):
+        self.movimientos = []  # (origen, destino, etiqueta)
+        self.carpetas_creadas = []
+
+    def __len__(self):
+        return len(self.movimientos)
+
+    def anadir(self, origen, destino, etiqueta=None):
+        if origen != destino:
+            self.movimientos.append((origen, destino, etiqueta))
+
+    def ejecutar(self, workers=MOVIMIENTOS_EN_PARALELO):
+        """Devuelve (hechos [(origen, destino, etiqueta)],
+        fallidos [(origen, destino, etiqueta, error)])"""
+        por_destino = {}
+        for movimiento in self.movimientos:
+            por_destino.setdefault(os.path.dirname(movimiento[1]), []).append(movimiento)
+
+        dispositivos = {}
+        def dispositivo(carpeta):
+            if carpeta not in dispositivos:
+                try:
+                    dispositivos[carpeta] = os.stat(carpeta).st_dev
+                except OSError:
+                    dispositivos[carpeta] = None
+            return dispositivos[carpeta]
+
+        hechos = []
+        fallidos = []
+        entre_dispositivos = []
+        for carpeta, movimientos in por_destino.items():
+            if not os.path.isdir(carpeta):
+                try:
+                    os.makedirs(carpeta)
+                    self.carpetas_creadas.append(carpeta)
+                except OSError as e:
+                    fallidos.extend((*movimiento, e) for movimiento in movimientos)
+                    continue
+            dispositivo_destino = dispositivo(carpeta)
+            for origen, destino, etiqueta in movimientos:
+                if os.path.lexists(destino):
+                    fallidos.append((origen, destino, etiqueta,
+                                     FileExistsError(errno.EEXIST, "El destino ya existe",
+                                                     destino)))
+                    continue
+                if dispositivo(os.path.dirname(origen)) != dispositivo_destino:
+                    entre_dispositivos.append((origen, destino, etiqueta))
+                    continue
+                try:
+                    os.rename(origen, destino)
+                    hechos.append((origen, destino, etiqueta))
+                except OSError as e:
+                    if e.errno == errno.EXDEV:
+                        entre_dispositivos.append((origen, destino, etiqueta))
+                    else:
+                        fallidos.append((origen, destino, etiqueta, e))
+
+        if entre_dispositivos:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futuros = [(executor.submit(shutil.move, origen, destino),
+                            (origen, destino, etiqueta))
+                           for origen, destino, etiqueta in entre_dispositivos]
+                for futuro, movimiento in futuros:
+                    try:
+                        futuro.result()
+                        hechos.append(movimiento)
+                    except (OSError, shutil.Error) as e:
+                        fallidos.append((*movimiento, e))
+        return hechos, fallidos
+
+# --- Detección de duplicados por contenido ---
+TAMANO_BLOQUE_HASH = 64 * 1024  # Bytes leídos del principio y del final en la etapa rápida
+
+def _hash_extremos(ruta, tamano):
+    """Hash de los primeros y últimos 64 KB (el archivo completo si es pequeño)"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, 'rb') as f:
+        h.update(f.read(TAMANO_BLOQUE_HASH))
+        if tamano > 2 * TAMANO_BLOQUE_HASH:
+            f.seek(-TAMANO_BLOQUE_HASH, os.SEEK_END)
+        h.update(f.read(TAMANO_BLOQUE_HASH))
+    return h.hexdigest()
+
+def _hash_completo(ruta):
+    """Hash del contenido completo del archivo"""
+    h = hashlib.blake2b(digest_size=32)
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+def _agrupar_por_hash(executor, entradas, funcion, parar):
+    """Calcula funcion(ruta, tamano) en paralelo para [(clave, ruta, tamano)] y agrupa
+    las rutas por (clave, hash) conservando el orden de entrada"""
+    futures = [executor.submit(funcion, ruta, tamano) for _, ruta, tamano in entradas]
+    grupos = {}
+    for (clave, ruta, tamano), future in zip(entradas, futures):
+        if parar():
+            for pendiente in futures:
+                pendiente.cancel()
+            return {}
+        try:
+            digest = future.result()
+        except OSError as e:
+            print(f"No se pudo leer {ruta}: {e}")
+            continue
+        grupos.setdefault((clave, digest), []).append((ruta, tamano))
+    return grupos
+
+def buscar_duplicados_contenido(rutas, workers=WORKERS_POR_DEFECTO, parar=None):
+    """Devuelve los grupos (listas de rutas, en el orden recibido) de archivos byte a
+    byte idénticos.
+
+    Trabaja por etapas para no leer cada byte: agrupa por tamaño, después por el hash
+    de los primeros y últimos 64 KB y solo calcula el hash completo de los candidatos
+    que siguen empatados. Los hashes se calculan en paralelo con `workers` hilos.
+    """
+    parar = parar or (lambda: False)
+    por_tamano = {}
+    for ruta in rutas:
+        try:
+            tamano = os.path.getsize(ruta)
+        except OSError:
+            continue
+        if tamano > 0:
+            por_tamano.setdefault(tamano, []).append(ruta)
+    candidatos = [(tamano, ruta, tamano) for tamano, grupo in por_tamano.items()
+                  if len(grupo) > 1 for ruta in grupo]
+
+    duplicados = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        por_extremos = _agrupar_por_hash(executor, candidatos,
+                                         _hash_extremos, parar)
+        pendientes = []
+        for clave, grupo in por_extremos.items():
+            if len(grupo) < 2:
+                continue
+            if grupo[0][1] <= 2 * TAMANO_BLOQUE_HASH:
+                # El hash de extremos ya cubrió el archivo entero
+                duplicados.append([ruta for ruta, _ in grupo])
+            else:
+                pendientes.extend((clave, ruta, tamano) for ruta, tamano in grupo)
+        por_contenido = _agrupar_por_hash(executor, pendientes,
+                                          lambda ruta, _tamano: _hash_completo(ruta), parar)
+        duplicados.extend([ruta for ruta, _ in grupo] for grupo in por_contenido.values()
+                          if len(grupo) > 1)
+    orden = {ruta: i for i, ruta in enumerate(rutas)}
+    duplicados.sort(key=lambda grupo: orden[grupo[0]])
+    return duplicados
+
+class ResultadosColumnares:
+    """Resultados de un análisis guardados por columnas NumPy.
+
+    Guarda nombre, duración (min), peso (MB), alto (px) y, si se conoce, la
+    carpeta de cada vídeo. Se construye una vez por análisis y los ratios y las
+    máscaras se calculan vectorizados una sola vez. Para el resto del código se
+    comporta como la lista de tuplas (nombre, duración, peso, alto) de siempre.
+    """
+    def __init__(self, nombres, duraciones, pesos, altos, carpetas=None):
+        self.nombres = np.asarray(nombres, dtype=object)
+        self.duraciones = np.asarray(duraciones, dtype=np.float64)
+        self.pesos = np.asarray(pesos, dtype=np.float64)
+        self.altos = np.asarray(altos, dtype=np.int64)
+        self.carpetas = np.asarray(carpetas, dtype=object) if carpetas is not None else None
+        self.extensiones = np.array([os.path.splitext(n)[1].lower() for n in self.nombres],
+                                    dtype=str)
+        self.validos = self.duraciones > 0
+        self.ratios = np.divide(self.pesos, self.duraciones,
+                                out=np.zeros_like(self.pesos), where=self.validos)
+        self.es_mkv = self.extensiones == '.mkv'
+
+    @classmethod
+    def desde_tuplas(cls, resultados):
+        """Acepta tuplas (nombre, dur, peso, alto) o (nombre, dur, peso, ruta, carpeta, alto)"""
+        if isinstance(resultados, cls):
+            return resultados
+        registros = [r for r in resultados if len(r) >= 4]
+        carpetas = None
+        if registros and all(len(r) >= 6 for r in registros):
+            carpetas = [r[4] for r in registros]
+        return cls([r[0] for r in registros], [r[1] for r in registros],
+                   [r[2] for r in registros], [r[-1] for r in registros], carpetas)
+
+    def __len__(self):
+        return len(self.duraciones)
+
+    def __iter__(self):
+        return iter(zip(self.nombres.tolist(), self.duraciones.tolist(),
+                        self.pesos.tolist(), self.altos.tolist()))
+
+    def __getitem__(self, i):
+        return (self.nombres[i], float(self.duraciones[i]),
+                float(self.pesos[i]), int(self.altos[i]))
+
+    def filtrar(self, mascara):
+        """Devuelve un nuevo conjunto con las filas donde `mascara` es cierta"""
+        carpetas = self.carpetas[mascara] if self.carpetas is not None else None
+        return ResultadosColumnares(self.nombres[mascara], self.duraciones[mascara],
+                                    self.pesos[mascara], self.altos[mascara], carpetas)
+
+    def con_filas(self, indices, nuevas):
+        """Devuelve un nuevo conjunto con las filas `indices` seguidas de las tuplas
+        `nuevas`. Solo las nuevas pasan por Python; el resto lo copia NumPy con sus
+        columnas derivadas ya calculadas."""
+        anadidas = ResultadosColumnares.desde_tuplas(nuevas)
+        resultado = ResultadosColumnares.__new__(ResultadosColumnares)
+        for campo in ('nombres', 'duraciones', 'pesos', 'altos', 'extensiones',
+                      'validos', 'ratios', 'es_mkv'):
+            setattr(resultado, campo, np.concatenate(
+                (getattr(self, campo)[indices], getattr(anadidas, campo))))
+        partes = [(self.carpetas, len(indices)), (anadidas.carpetas, len(anadidas))]
+        if any(carpetas is None and n for carpetas, n in partes):
+            resultado.carpetas = None
+        else:
+            resultado.carpetas = np.concatenate(
+                (self.carpetas[indices] if self.carpetas is not None else np.empty(0, object),
+                 anadidas.carpetas if anadidas.carpetas is not None else np.empty(0, object)))
+        return resultado
+
+    def peso_medio(self):
+        total_duracion = self.duraciones.sum()
+        return float(self.pesos.sum() / total_duracion) if total_duracion else 0
+
+    def duracion_media(self):
+        return float(self.duraciones.mean()) if len(self) else 0
+
+    def conteo_rating(self):
+        """Cuenta (bien, mal) optimizados: 10-100 MB/min frente a >100 MB/min"""
+        ratios = self.ratios[self.validos]
+        bien = int(np.count_nonzero((ratios >= 10) & (ratios <= 100)))
+        mal = int(np.count_nonzero(ratios > 100))
+        return bien, mal
+
+    def resumen_por_alto(self):
+        """{alto: {'peso_total', 'dur_total', 'conteo', 'promedio'}} agrupado con bincount"""
+        if not len(self):
+            return {}
+        altos, grupo = np.unique(self.altos, return_inverse=True)
+        pesos = np.bincount(grupo, weights=self.pesos)
+        duraciones = np.bincount(grupo, weights=self.duraciones)
+        conteos = np.bincount(grupo)
+        promedios = np.divide(pesos, duraciones, out=np.zeros_like(pesos),
+                              where=duraciones > 0)
+        return {alto: {'peso_total': peso, 'dur_total': dur, 'conteo': conteo,
+                       'promedio': promedio}
+                for alto, peso, dur, conteo, promedio in zip(
+                    altos.tolist(), pesos.tolist(), duraciones.tolist(),
+                    conteos.tolist(), promedios.tolist())}
+
+    def ratio_por_extension(self):
+        """{ext: peso total / duración total} de los resultados"""
+        if not len(self):
+            return {}
+        extensiones, grupo = np.unique(self.extensiones, return_inverse=True)
+        pesos = np.bincount(grupo, weights=self.pesos)
+        duraciones = np.bincount(grupo, weights=self.duraciones)
+        ratios = np.divide(pesos, duraciones, out=np.zeros_like(pesos), where=duraciones > 0)
+        return {(ext or 'sin_ext'): ratio
+                for ext, ratio in zip(extensiones.tolist(), ratios.tolist())}
+
+    def contar_en_rangos(self, limites):
+        """Cuenta ratios en [limites[i], limites[i+1]) para cada tramo"""
+        ordenados = np.sort(self.ratios)
+        posiciones = np.searchsorted(ordenados, limites, side='left')
+        return np.diff(posiciones).tolist()
+
+def calcular_peso_medio(resultados):
+    """ Calcula el peso medio por minuto de los vídeos analizados """
+    if not len(resultados):
+        return 0
+    return ResultadosColumnares.desde_tuplas(resultados).peso_medio()
+
+def calcular_duracion_media(resultados):
+    """ Calcula la duración media de los vídeos analizados """
+    if not len(resultados):
+        return 0
+    return ResultadosColumnares.desde_tuplas(resultados).duracion_media()
+
+def calcular_rating_optimizacion(resultados):
+    """
+    Calcula el rating de optimización (1-5 estrellas) basado
+    en el porcentaje de archivos bien optimizados.
+    
+    Criterios:
+    - Archivos < 10 MB/min: Descartados (baja calidad)
+    - Archivos 10-100 MB/min: Bien optimizados
+    - Archivos > 100 MB/min: Mal optimizados
+    
+    Rating:
+    - 5 estrellas: % bien optimizados >= 90%
+    - 4 estrellas: % bien optimizados >= 70%
+    - 3 estrellas: % bien optimizados >= 50%
+    - 2 estrellas: % bien optimizados >= 20%
+    - 1 estrella: % bien optimizados < 20%
+    """
+    if not len(resultados):
+        return 0, 0, 0, 0, "Sin datos"
+
+    # Los archivos < 10 MB/min (baja calidad) quedan fuera del recuento
+    bien_optimizados, mal_optimizados = (
+        ResultadosColumnares.desde_tuplas(resultados).conteo_rating())
+
+    total_contable = bien_optimizados + mal_optimizados
+
+    if total_contable == 0:
+        return 0, 0, 0, 0, "Sin archivos contables"
+
+    pct_bien = (bien_optimizados / total_contable) * 100
+    _pct_mal = (mal_optimizados / total_contable) * 100
+
+    # Asignar estrellas
+    if pct_bien >= 90:
+        estrellas = 5
+        categoria = "Excelente"
+    elif pct_bien >= 70:
+        estrellas = 4
+        categoria = "Muy bueno"
+    elif pct_bien >= 50:
+        estrellas = 3
+        categoria = "Aceptable"
+    elif pct_bien >= 20:
+        estrellas = 2
+        categoria = "Bajo"
+    else:
+        estrellas = 1
+        categoria = "Crítico"
+
+    return estrellas, pct_bien, bien_optimizados, mal_optimizados, categoria
+
+class DiarioJSON:
+    """Diario de operaciones (JSON Lines) que se añade sobre una instantánea JSON.
+
+    Cada cambio se anota como una línea al final del diario, así que registrar no
+    depende del tamaño del historial. La primera línea guarda la firma (tamaño,
+    mtime) de la instantánea sobre la que se aplica: si al compactar se reescribe
+    la instantánea pero no llega a vaciarse el diario, este se ignora al cargar.
+    """
+    def __init__(self, archivo_base, minimo_compactar=MINIMO_COMPACTAR_DIARIO):
+        self.archivo_base = archivo_base
+        self.archivo = archivo_base + ".diario.jsonl"
+        self.minimo_compactar = minimo_compactar
+        self.operaciones = 0
+
+    def _firma_base(self):
+        try:
+            stat = os.stat(self.archivo_base)
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def leer(self):
+        """Devuelve las operaciones anotadas sobre la instantánea actual"""
+        operaciones = []
+        self.operaciones = 0
+        try:
+            with open(self.archivo, 'rb') as f:
+                contenido = f.read()
+        except IOError:
+            return operaciones
+        completo = contenido.rfind(b"\n") + 1
+        if completo < len(contenido):
+            # Última línea a medio escribir: se descarta para poder seguir añadiendo
+            try:
+                os.truncate(self.archivo, completo)
+            except OSError:
+                pass
+        lineas = contenido[:completo].splitlines()
+        try:
+            cabecera = json.loads(lineas[0]) if lineas else None
+        except json.JSONDecodeError:
+            cabecera = None
+        if not cabecera or cabecera.get('base') != self._firma_base():
+            self._reiniciar()
+            return operaciones
+        for linea in lineas[1:]:
+            try:
+                operaciones.append(json.loads(linea))
+            except json.JSONDecodeError:
+                continue
+        self.operaciones = len(operaciones)
+        return operaciones
+
+    def _reiniciar(self):
+        """Deja el diario vacío, con la cabecera de la instantánea actual"""
+        try:
+            with open(self.archivo, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'base': self._firma_base()}) + "\n")
+        except IOError as e:
+            print(f"Error reiniciando diario {self.archivo}: {e}")
+        self.operaciones = 0
+
+    def anotar(self, operacion):
+        """Añade una operación al final del diario"""
+        if not os.path.exists(self.archivo):
+            self._reiniciar()
+        try:
+            with open(self.archivo, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(operacion, ensure_ascii=False) + "\n")
+            self.operaciones += 1
+        except IOError as e:
+            print(f"Error anotando en diario {self.archivo}: {e}")
+
+    def necesita_compactar(self, tamano_datos):
+        """Compacta cuando el diario supera a los datos (coste amortizado constante)"""
+        return self.operaciones > max(self.minimo_compactar, tamano_datos)
+
+    def compactar(self, datos):
+        """Reescribe la instantánea con `datos` y vacía el diario"""
+        temporal = self.archivo_base + ".tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False, indent=2)
+        os.replace(temporal, self.archivo_base)
+        self._reiniciar()
+
+
+class GestorHistorialAnalisis:
+    """Gestiona el historial de análisis realizados con estadísticas por formato"""
+    def __init__(self, archivo_historial="analisis_historial.json", callback_actualizar=None):
+        self.archivo_historial = archivo_historial
+        self.historial = []
+        self._ultimo_por_carpeta = {}  # carpeta -> índice de su última entrada
+        self.diario = DiarioJSON(archivo_historial)
+        self.callback_actualizar = callback_actualizar
+        self.cargar_historial()
+
+    def cargar_historial(self):
+        """Carga el historial desde el archivo JSON y aplica el diario pendiente"""
+        self.historial = []
+        if os.path.exists(self.archivo_historial):
+            try:
+                with open(self.archivo_historial, 'r', encoding='utf-8') as f:
+                    self.historial = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                self.historial = []
+        self._reindexar()
+        operaciones = self.diario.leer()
+        for operacion in operaciones:
+            self._aplicar(operacion)
+
+        necesita_guardar = bool(operaciones)
+
+        # Migrar registros antiguos que no tengan 'veces'
+        for entrada in self.historial:
+            if 'veces' not in entrada:
+                entrada['veces'] = 1
+                necesita_guardar = True
+
+            # Reparar total_archivos que esté en 0
+            if entrada.get('total_archivos', 0) == 0 and entrada.get(
+                'estadisticas_por_formato'):
+                total_calculado = sum(
+                    stats.get('cantidad', 0)
+                    for stats in entrada['estadisticas_por_formato'].values()
+                )
+                if total_calculado > 0:
+                    entrada['total_archivos'] = total_calculado
+                    necesita_guardar = True
+
+        # Si hay cambios, guardar el historial actualizado (y vaciar el diario)
+        if necesita_guardar:
+            self.guardar_historial()
+
+    def guardar_historial(self):
+        """Guarda el historial completo en el archivo JSON y vacía el diario"""
+        try:
+            self.diario.compactar(self.historial)
+        except IOError as e:
+            print(f"Error guardando historial: {e}")
+
+    def _reindexar(self):
+        self._ultimo_por_carpeta = {}
+        for i, entrada in enumerate(self.historial):
+            self._ultimo_por_carpeta[entrada.get('carpeta')] = i
+
+    def _aplicar(self, operacion):
+        """Aplica una operación del diario sobre el historial en memoria"""
+        tipo = operacion.get('op')
+        if tipo == 'nuevo':
+            self.historial.append(operacion['entrada'])
+            self._ultimo_por_carpeta[operacion['entrada']['carpeta']] = len(self.historial) - 1
+        elif tipo == 'repetir' and 0 <= operacion['indice'] < len(self.historial):
+            entrada = self.historial[operacion['indice']]
+            entrada['veces'] = entrada.get('veces', 1) + 1
+            entrada['timestamp'] = operacion['timestamp']
+            if 'metricas' in operacion:
+                entrada['metricas'] = operacion['metricas']
+        elif tipo == 'deshacer' and self.historial:
+            carpeta = self.historial.pop()['carpeta']
+            self._ultimo_por_carpeta.pop(carpeta, None)
+            for i in range(len(self.historial) - 1, -1, -1):
+                if self.historial[i]['carpeta'] == carpeta:
+                    self._ultimo_por_carpeta[carpeta] = i
+                    break
+
+    def _registrar_operacion(self, operacion):
+        """Aplica una operación y la anota en el diario, compactando de vez en cuando"""
+        self._aplicar(operacion)
+        self.diario.anotar(operacion)
+        if self.diario.necesita_compactar(len(self.historial)):
+            self.guardar_historial()
+
+    def registrar_analisis(self, carpeta, counts_by_ext, avg_by_ext, total_archivos, *,
+                           rating=None, metricas=None):
+        """Registra un análisis con estadísticas por formato y opcionalmente rating
+        y métricas de tiempo (MetricasAnalisis.resumen())."""
+        nuevo_analisis = {
+            'timestamp': datetime.now().isoformat(),
+            'carpeta': carpeta,
+            'total_archivos': total_archivos,
+            'estadisticas_por_formato': {},
+            'veces': 1  # Contador de repeticiones
+        }
+
+        # Agregar estadísticas por cada formato encontrado
+        for ext in sorted(counts_by_ext.keys()):
+            nuevo_analisis['estadisticas_por_formato'][ext] = {
+                'cantidad': counts_by_ext[ext],
+                'ratio_promedio_mb_min': round(avg_by_ext.get(ext, 0.0), 2)
+            }
+
+        if rating is not None:
+            nuevo_analisis['rating'] = {
+                'estrellas': rating.get('estrellas'),
+                'pct_bien': rating.get('pct_bien'),
+                'bien_optimizados': rating.get('bien_optimizados'),
+                'mal_optimizados': rating.get('mal_optimizados'),
+                'categoria': rating.get('categoria')
+            }
+        if metricas is not None:
+            nuevo_analisis['metricas'] = metricas
+
+        # Buscar el último análisis de la MISMA carpeta (no solo el último del historial)
+        indice = self._ultimo_por_carpeta.get(carpeta)
+        ultimo_misma_carpeta = self.historial[indice] if indice is not None else None
+
+        # Comparar con el último análisis de la misma carpeta
+        if ultimo_misma_carpeta is not None:
+            # Verificar si tiene los mismos datos
+            datos_iguales = (ultimo_misma_carpeta['total_archivos'] == total_archivos and
+                ultimo_misma_carpeta['estadisticas_por_formato'] == nuevo_analisis[
+                    'estadisticas_por_formato'])
+            if rating is not None:
+                datos_iguales = datos_iguales and (
+                    ultimo_misma_carpeta.get('rating') == nuevo_analisis.get('rating'))
+            if datos_iguales:
+                # Es idéntico: incrementar contador en lugar de crear nueva entrada
+                # (las métricas sí se sustituyen por las de esta ejecución)
+                operacion = {'op': 'repetir', 'indice': indice,
+                             'timestamp': datetime.now().isoformat()}
+                if metricas is not None:
+                    operacion['metricas'] = metricas
+                self._registrar_operacion(operacion)
+                # Ejecutar callback si existe para actualizar UI
+                if self.callback_actualizar:
+                    self.callback_actualizar()
+                return
+
+        # Es diferente o es primera vez de esta carpeta: agregar como nueva entrada
+        self._registrar_operacion({'op': 'nuevo', 'entrada': nuevo_analisis})
+        # Ejecutar callback si existe para actualizar UI
+        if self.callback_actualizar:
+            self.callback_actualizar()
+
+    def deshacer_ultimo(self):
+        """Deshace el último análisis registrado"""
+        if not self.historial:
+            return False, "No hay análisis para deshacer"
+
+        ultimo = self.historial[-1]
+        self._registrar_operacion({'op': 'deshacer'})
+        return True, f"Análisis de {ultimo['carpeta']} eliminado del historial"
+
+    def deshacer_multiples(self, cantidad):
+        """Deshace múltiples análisis"""
+        if cantidad > len(self.historial):
+            cantidad = len(self.historial)
+
+        deshechados = 0
+        for _ in range(cantidad):
+            exito, _ = self.deshacer_ultimo()
+            if exito:
+                deshechados += 1
+
+        return deshechados, 0
+
+    def exportar_csv(self, archivo_salida="analisis_historial.csv"):
+        """Exporta el historial a CSV"""
+        if not self.historial:
+            return False, "No hay análisis para exportar"
+
+        try:
+            with open(archivo_salida, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['Timestamp', 'Carpeta', 'Veces', 'Total Archivos', 'Formato',
+                                 'Cantidad', 'Ratio Promedio (MB/min)', 'Tiempo Total (s)',
+                                 'Sondeos', 'Latencia p90 (ms)', 'Timeouts'])
+
+                for analisis in self.historial:
+                    veces = analisis.get('veces', 1)
+                    metricas = analisis.get('metricas', {})
+                    sondeos = metricas.get('sondeos', {})
+                    columnas_metricas = [metricas.get('total_s', ''), sondeos.get('total', ''),
+                                         sondeos.get('p90_ms', ''), sondeos.get('timeouts', '')]
+                    for ext, stats in analisis['estadisticas_por_formato'].items():
+                        writer.writerow([
+                            analisis['timestamp'],
+                            analisis['carpeta'],
+                            veces,
+                            analisis['total_archivos'],
+                            ext,
+                            stats['cantidad'],
+                            stats['ratio_promedio_mb_min']
+                        ] + columnas_metricas)
+            return True, f"Historial exportado a {archivo_salida}"
+        except IOError as e:
+            return False, f"Error exportando CSV: {e}"
+
+    def exportar_json(self, archivo_salida="analisis_historial_export.json"):
+        """Exporta el historial a JSON"""
+        if not self.historial:
+            return False, "No hay análisis para exportar"
+
+        try:
+            with open(archivo_salida, 'w', encoding='utf-8') as f:
+                json.dump(self.historial, f, ensure_ascii=False, indent=2)
+            return True, f"Historial exportado a {archivo_salida}"
+        except IOError as e:
+            return False, f"Error exportando JSON: {e}"
+
+    def obtener_resumen(self):
+        """Obtiene un resumen del historial"""
+        if not self.historial:
+            return "No hay análisis registrados"
+
+        total = len(self.historial)
+        total_repeticiones = sum(analisis.get('veces', 1) - 1 for analisis in self.historial)
+        resumen = f"Total análisis únicos: {total}"
+        if total_repeticiones > 0:
+            total_ejecuciones = total + total_repeticiones
+            resumen += (f" | Total ejecuciones (incluyendo repetidas): {total_ejecuciones}"
+                        f" | Análisis duplicados: {total_repeticiones}")
+        return resumen
+
+    def limpiar_historial(self):
+        """Limpia todo el historial"""
+        self.historial = []
+        self._ultimo_por_carpeta = {}
+        self.guardar_historial()
+
+class GestorAnalisisHistorico:
+    """Gestiona análisis históricos por carpeta con comentarios y comparativas"""
+    def __init__(self, archivo_datos="analisis_carpetas.json"):
+        self.archivo_datos = archivo_datos
+        self.datos = {}
+        self._num_registros = 0  # Análisis + comentarios, para decidir cuándo compactar
+        self.diario = DiarioJSON(archivo_datos)
+        self.cargar_datos()
+
+    def cargar_datos(self):
+        """Carga los datos históricos de carpetas y aplica el diario pendiente"""
+        if os.path.exists(self.archivo_datos):
+            try:
+                with open(self.archivo_datos, 'r', encoding='utf-8') as f:
+                    self.datos = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                self.datos = {}
+        else:
+            self.datos = {}
+        self._num_registros = sum(len(entrada.get('analisis', [])) +
+                                  len(entrada.get('comentarios', []))
+                                  for entrada in self.datos.values())
+        operaciones = self.diario.leer()
+        for operacion in operaciones:
+            self._aplicar(operacion)
+        if operaciones:
+            self.guardar_datos()
+
+    def guardar_datos(self):
+        """Guarda todos los datos históricos y vacía el diario"""
+        try:
+            self.diario.compactar(self.datos)
+        except IOError as e:
+            print(f"Error guardando datos: {e}")
+
+    def _entrada_carpeta(self, clave, carpeta):
+        if clave not in self.datos:
+            self.datos[clave] = {
+                'carpeta': carpeta,
+                'comentarios': [],
+                'analisis': []
+            }
+        return self.datos[clave]
+
+    def _aplicar(self, operacion):
+        """Aplica una operación del diario sobre los datos en memoria"""
+        entrada = self._entrada_carpeta(operacion['clave'], operacion['carpeta'])
+        if operacion.get('op') == 'analisis':
+            entrada['analisis'].append(operacion['analisis'])
+        elif operacion.get('op') == 'comentario':
+            entrada['comentarios'].append(operacion['comentario'])
+        self._num_registros += 1
+
+    def _registrar_operacion(self, operacion):
+        """Aplica una operación y la anota en el diario, compactando de vez en cuando"""
+        self._aplicar(operacion)
+        self.diario.anotar(operacion)
+        if self.diario.necesita_compactar(self._num_registros):
+            self.guardar_datos()
+
+    def registrar_analisis(self, carpeta, resultados):
+        """Registra un análisis de una carpeta"""
+        clave = os.path.abspath(carpeta)
+
+        # Calcular estadísticas
+        columnas = ResultadosColumnares.desde_tuplas(resultados)
+        total = len(columnas)
+        peso_total = float(columnas.pesos.sum())
+        duracion_total = float(columnas.duraciones.sum())
+
+        analisis_actual = {
+            'timestamp': datetime.now().isoformat(),
+            'total_archivos': total,
+            'peso_total_mb': round(peso_total, 2),
+            'duracion_total_min': round(duracion_total, 2),
+            'peso_promedio_mb': round(peso_total / total, 2) if total else 0,
+            'duracion_promedio_min': round(duracion_total / total, 2) if total else 0,
+            'alto_promedio': round(float(columnas.altos.mean()), 0) if total else 0,
+            'altos_unicos': np.unique(columnas.altos).tolist(),
+        }
+
+        self._registrar_operacion({'op': 'analisis', 'clave': clave, 'carpeta': carpeta,
+                                   'analisis': analisis_actual})
+
+    def obtener_analisis_anterior(self, carpeta):
+        """Obtiene el análisis anterior de una carpeta"""
+        clave = os.path.abspath(carpeta)
+        if clave in self.datos and len(self.datos[clave]['analisis']) > 0:
+            return self.datos[clave]['analisis'][-1]
+        return None
+
+    def obtener_todos_analisis(self, carpeta):
+        """Obtiene todos los análisis de una carpeta"""
+        clave = os.path.abspath(carpeta)
+        if clave in self.datos:
+            return self.datos[clave]['analisis']
+        return []
+
+    def carpeta_analizada_antes(self, carpeta):
+        """Verifica si una carpeta ha sido analizada antes"""
+        clave = os.path.abspath(carpeta)
+        return clave in self.datos and len(self.datos[clave]['analisis']) > 0
+
+    def anadir_comentario(self, carpeta, comentario):
+        """Añade un comentario a una carpeta"""
+        clave = os.path.abspath(carpeta)
+        self._registrar_operacion({'op': 'comentario', 'clave': clave, 'carpeta': carpeta,
+                                   'comentario': {
+                                       'timestamp': datetime.now().isoformat(),
+                                       'texto': comentario
+                                   }})
+
+    def obtener_comentarios(self, carpeta):
+        """Obtiene los comentarios de una carpeta"""
+        clave = os.path.abspath(carpeta)
+        if clave in self.datos:
+            return self.datos[clave]['comentarios']
+        return []
+
+
+class GestorLotesMovimientos:
+    """Registra cada lote de movimientos como una unidad para poder deshacerlo entero.
+
+    Si se le dan la caché y la cuarentena de sondeos, al deshacer un lote también
+    devuelve sus entradas a las rutas originales.
+    """
+    def __init__(self, archivo_datos="movimientos_lotes.json", cache_sondeos=None,
+                 cuarentena=None):
+        self.archivo_datos = archivo_datos
+        self.cache_sondeos = cache_sondeos
+        self.cuarentena = cuarentena
+        self.lotes = []
+        self.diario = DiarioJSON(archivo_datos)
+        self.cargar_datos()
+
+    def cargar_datos(self):
+        """Carga los lotes guardados y aplica el diario pendiente"""
+        self.lotes = []
+        if os.path.exists(self.archivo_datos):
+            try:
+                with open(self.archivo_datos, 'r', encoding='utf-8') as f:
+                    self.lotes = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                self.lotes = []
+        operaciones = self.diario.leer()
+        for operacion in operaciones:
+            self._aplicar(operacion)
+        if operaciones:
+            self.guardar_datos()
+
+    def guardar_datos(self):
+        """Guarda todos los lotes y vacía el diario"""
+        try:
+            self.diario.compactar(self.lotes)
+        except IOError as e:
+            print(f"Error guardando lotes de movimientos: {e}")
+
+    def _aplicar(self, operacion):
+        if operacion.get('op') == 'lote':
+            self.lotes.append(operacion['lote'])
+        elif operacion.get('op') == 'deshacer' and self.lotes:
+            self.lotes.pop()
+
+    def _registrar_operacion(self, operacion):
+        self._aplicar(operacion)
+        self.diario.anotar(operacion)
+        if self.diario.necesita_compactar(len(self.lotes)):
+            self.guardar_datos()
+
+    def registrar_lote(self, descripcion, movimientos, carpetas_creadas=()):
+        """Guarda un lote [(origen, destino)] ya ejecutado"""
+        if not movimientos:
+            return
+        self._registrar_operacion({'op': 'lote', 'lote': {
+            'timestamp': datetime.now().isoformat(),
+            'descripcion': descripcion,
+            'movimientos': [[origen, destino] for origen, destino in movimientos],
+            'carpetas_creadas': list(carpetas_creadas),
+        }})
+
+    def ultimo_lote(self):
+        return self.lotes[-1] if self.lotes else None
+
+    def deshacer_ultimo_lote(self):
+        """Devuelve los archivos del último lote a su sitio.
+        Devuelve (hechos, fallidos) como PlanMovimientos.ejecutar; los que no se
+        pudieron devolver quedan registrados como un lote nuevo para reintentarlo."""
+        lote = self.ultimo_lote()
+        if lote is None:
+            return [], []
+        plan = PlanMovimientos()
+        for origen, destino in reversed(lote['movimientos']):
+            plan.anadir(destino, origen)
+        hechos, fallidos = plan.ejecutar()
+        movimientos = [(origen, destino) for origen, destino, _etiqueta in hechos]
+        if self.cache_sondeos is not None:
+            self.cache_sondeos.renombrar(movimientos)
+        if self.cuarentena is not None:
+            self.cuarentena.renombrar(movimientos)
+        for carpeta in reversed(lote.get('carpetas_creadas', [])):
+            try:
+                os.rmdir(carpeta)
+            except OSError:
+                pass  # No está vacía o ya no existe
+        self._registrar_operacion({'op': 'deshacer'})
+        self.registrar_lote(f"{lote['descripcion']} (pendiente de deshacer)",
+                            [(origen, destino) for destino, origen, _etiqueta, _error in fallidos])
+        return hechos, fallidos
+
+
+class CacheSondeos:
+    """Caché persistente (SQLite) de los sondeos de vídeo.
+
+    Cada entrada guarda duración (min), peso (MB) y alto de un archivo y solo es
+    válida mientras el archivo conserve el mismo tamaño y fecha de modificación.
+    """
+    def __init__(self, archivo_db="cache_sondeos.db", max_entradas=500000):
+        self.archivo_db = archivo_db
+        self.max_entradas = max_entradas
+        self._crear_tabla()
+
+    def _conectar(self):
+        return sqlite3.connect(self.archivo_db, timeout=10)
+
+    def _crear_tabla(self):
+        conn = self._conectar()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sondeos (
+                    ruta TEXT PRIMARY KEY,
+                    tamano INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    duracion REAL NOT NULL,
+                    peso REAL NOT NULL,
+                    alto INTEGER NOT NULL,
+                    ultimo_uso REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sondeos_uso ON sondeos (ultimo_uso)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _rango_carpeta(carpeta):
+        """Devuelve los límites (inclusivo, exclusivo) de las rutas bajo `carpeta`"""
+        prefijo = os.path.join(carpeta, "")
+        return prefijo, prefijo + "\U0010ffff"
+
+    def cargar_carpeta(self, carpeta):
+        """Devuelve {ruta: (tamano, mtime_ns, duracion, peso, alto)} de la carpeta y
+        todas sus subcarpetas con una sola consulta por rango de clave"""
+        desde, hasta = self._rango_carpeta(carpeta)
+        conn = self._conectar()
+        try:
+            filas = conn.execute(
+                "SELECT ruta, tamano, mtime_ns, duracion, peso, alto FROM sondeos"
+                " WHERE ruta >= ? AND ruta < ?", (desde, hasta)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error leyendo caché de sondeos: {e}")
+            return {}
+        finally:
+            conn.close()
+        return {fila[0]: fila[1:] for fila in filas}
+
+    def guardar(self, entradas, rutas_usadas=()):
+        """Inserta/actualiza sondeos [(ruta, tamano, mtime_ns, duracion, peso, alto)]
+        y marca como usadas las rutas acertadas, todo en una transacción (admite
+        iteradores, que se consumen sin copiarlos a una lista)"""
+        ahora = time.time()
+        conn = self._conectar()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO sondeos VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((*entrada, ahora) for entrada in entradas))
+                conn.executemany("UPDATE sondeos SET ultimo_uso = ? WHERE ruta = ?",
+                                 ((ahora, ruta) for ruta in rutas_usadas))
+            self._limitar_tamano(conn)
+        except sqlite3.Error as e:
+            print(f"Error guardando caché de sondeos: {e}")
+        finally:
+            conn.close()
+
+    def buscar(self, rutas):
+        """Devuelve {ruta: (tamano, mtime_ns, duracion, peso, alto)} de las rutas dadas
+        que estén en la caché (consultas por bloques de 500)"""
+        rutas = list(rutas)
+        encontrados = {}
+        conn = self._conectar()
+        try:
+            for i in range(0, len(rutas), 500):
+                bloque = rutas[i:i + 500]
+                filas = conn.execute(
+                    "SELECT ruta, tamano, mtime_ns, duracion, peso, alto FROM sondeos"
+                    f" WHERE ruta IN ({', '.join('?' * len(bloque))})", bloque).fetchall()
+                encontrados.update((fila[0], fila[1:]) for fila in filas)
+        except sqlite3.Error as e:
+            print(f"Error leyendo caché de sondeos: {e}")
+        finally:
+            conn.close()
+        return encontrados
+
+    def renombrar(self, movimientos):
+        """Actualiza la ruta de las entradas de archivos movidos [(origen, destino)]"""
+        movimientos = [(origen, destino) for origen, destino in movimientos
+                       if origen != destino]
+        if not movimientos:
+            return
+        conn = self._conectar()
+        try:
+            with conn:
+                conn.executemany("DELETE FROM sondeos WHERE ruta = ?",
+                                 [(destino,) for _, destino in movimientos])
+                conn.executemany("UPDATE sondeos SET ruta = ? WHERE ruta = ?",
+                                 [(destino, origen) for origen, destino in movimientos])
+        except sqlite3.Error as e:
+            print(f"Error actualizando caché de sondeos: {e}")
+        finally:
+            conn.close()
+
+    def podar(self, carpeta, rutas_existentes):
+        """Elimina las entradas bajo `carpeta` cuyos archivos ya no existen"""
+        desde, hasta = self._rango_carpeta(carpeta)
+        conn = self._conectar()
+        try:
+            rutas = conn.execute("SELECT ruta FROM sondeos WHERE ruta >= ? AND ruta < ?",
+                                 (desde, hasta)).fetchall()
+            desaparecidas = [(ruta,) for (ruta,) in rutas if ruta not in rutas_existentes]
+            with conn:
+                conn.executemany("DELETE FROM sondeos WHERE ruta = ?", desaparecidas)
+            return len(desaparecidas)
+        except sqlite3.Error as e:
+            print(f"Error podando caché de sondeos: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def _limitar_tamano(self, conn):
+        """Descarta las entradas usadas hace más tiempo si se supera max_entradas"""
+        total = conn.execute("SELECT COUNT(*) FROM sondeos").fetchone()[0]
+        sobrantes = total - self.max_entradas
+        if sobrantes > 0:
+            with conn:
+                conn.execute("DELETE FROM sondeos WHERE ruta IN (SELECT ruta FROM sondeos"
+                             " ORDER BY ultimo_uso ASC LIMIT ?)", (sobrantes,))
+
+
+class CuarentenaSondeos:
+    """Archivos cuyo sondeo dio timeout o error, guardados en la misma base que la caché.
+
+    Como en CacheSondeos, cada entrada solo vale mientras el archivo conserve tamaño y
+    fecha de modificación: si cambia se vuelve a sondear. Mientras tanto el análisis los
+    salta (salvo que se pida reintentarlos) en vez de esperar otra vez su timeout.
+    """
+    def __init__(self, archivo_db="cache_sondeos.db"):
+        self.archivo_db = archivo_db
+        self._crear_tabla()
+
+    def _conectar(self):
+        return sqlite3.connect(self.archivo_db, timeout=10)
+
+    def _crear_tabla(self):
+        conn = self._conectar()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cuarentena (
+                    ruta TEXT PRIMARY KEY,
+                    tamano INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    motivo TEXT NOT NULL,
+                    fallos INTEGER NOT NULL,
+                    ultimo_fallo REAL NOT NULL
+                )""")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def cargar_carpeta(self, carpeta):
+        """Devuelve {ruta: (tamano, mtime_ns, motivo, fallos)} bajo `carpeta`"""
+        desde, hasta = CacheSondeos._rango_carpeta(carpeta)
+        conn = self._conectar()
+        try:
+            filas = conn.execute(
+                "SELECT ruta, tamano, mtime_ns, motivo, fallos FROM cuarentena"
+                " WHERE ruta >= ? AND ruta < ?", (desde, hasta)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error leyendo la cuarentena: {e}")
+            return {}
+        finally:
+            conn.close()
+        return {fila[0]: fila[1:] for fila in filas}
+
+    def buscar(self, rutas):
+        """Devuelve {ruta: (tamano, mtime_ns, motivo, fallos)} de las rutas dadas"""
+        rutas = list(rutas)
+        encontrados = {}
+        conn = self._conectar()
+        try:
+            for i in range(0, len(rutas), 500):
+                bloque = rutas[i:i + 500]
+                filas = conn.execute(
+                    "SELECT ruta, tamano, mtime_ns, motivo, fallos FROM cuarentena"
+                    f" WHERE ruta IN ({', '.join('?' * len(bloque))})", bloque).fetchall()
+                encontrados.update((fila[0], fila[1:]) for fila in filas)
+        except sqlite3.Error as e:
+            print(f"Error leyendo la cuarentena: {e}")
+        finally:
+            conn.close()
+        return encontrados
+
+    def actualizar(self, fallidos=(), liberados=()):
+        """Pone en cuarentena [(ruta, tamano, mtime_ns, motivo)] (sumando un fallo a
+        las que ya estaban) y saca las rutas `liberados`, en una transacción"""
+        if not fallidos and not liberados:
+            return
+        ahora = time.time()
+        conn = self._conectar()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO cuarentena VALUES (?, ?, ?, ?, 1, ?)"
+                    " ON CONFLICT(ruta) DO UPDATE SET tamano = excluded.tamano,"
+                    " mtime_ns = excluded.mtime_ns, motivo = excluded.motivo,"
+                    " fallos = fallos + 1, ultimo_fallo = excluded.ultimo_fallo",
+                    [(*fallido, ahora) for fallido in fallidos])
+                conn.executemany("DELETE FROM cuarentena WHERE ruta = ?",
+                                 [(ruta,) for ruta in liberados])
+        except sqlite3.Error as e:
+            print(f"Error guardando la cuarentena: {e}")
+        finally:
+            conn.close()
+
+    def renombrar(self, movimientos):
+        """Actualiza la ruta de las entradas de archivos movidos [(origen, destino)]"""
+        movimientos = [(origen, destino) for origen, destino in movimientos
+                       if origen != destino]
+        if not movimientos:
+            return
+        conn = self._conectar()
+        try:
+            with conn:
+                conn.executemany("DELETE FROM cuarentena WHERE ruta = ?",
+                                 [(destino,) for _, destino in movimientos])
+                conn.executemany("UPDATE cuarentena SET ruta = ? WHERE ruta = ?",
+                                 [(destino, origen) for origen, destino in movimientos])
+        except sqlite3.Error as e:
+            print(f"Error actualizando la cuarentena: {e}")
+        finally:
+            conn.close()
+
+    def podar(self, carpeta, rutas_existentes):
+        """Elimina las entradas bajo `carpeta` cuyos archivos ya no existen"""
+        desde, hasta = CacheSondeos._rango_carpeta(carpeta)
+        conn = self._conectar()
+        try:
+            rutas = conn.execute("SELECT ruta FROM cuarentena WHERE ruta >= ? AND ruta < ?",
+                                 (desde, hasta)).fetchall()
+            desaparecidas = [(ruta,) for (ruta,) in rutas if ruta not in rutas_existentes]
+            with conn:
+                conn.executemany("DELETE FROM cuarentena WHERE ruta = ?", desaparecidas)
+            return len(desaparecidas)
+        except sqlite3.Error as e:
+            print(f"Error podando la cuarentena: {e}")
+            return 0
+        finally:
+            conn.close()
+
+
+class SesionAnalisis:
+    """Punto de control de un análisis en curso, para poder reanudarlo.
+
+    Se guarda como JSON Lines y solo se añaden líneas: una cabecera con la
+    carpeta y una línea por archivo sondeado (o con error). Si el análisis
+    termina se borra; si se para o el programa se cae, queda en disco.
+    """
+    def __init__(self, directorio, carpeta):
+        self.carpeta = carpeta
+        clave = hashlib.blake2b(
+            os.path.normcase(os.path.abspath(carpeta)).encode('utf-8', 'surrogateescape'),
+            digest_size=8).hexdigest()
+        self.archivo = os.path.join(directorio, f"{clave}.jsonl")
+        self._f = None
+        self._ultimo_volcado = 0.0
+
+    def _leer_lineas(self):
+        """Devuelve los registros válidos (se ignora una última línea a medio escribir)"""
+        registros = []
+        try:
+            with open(self.archivo, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    try:
+                        registros.append(json.loads(linea))
+                    except json.JSONDecodeError:
+                        continue
+        except OSError:
+            return []
+        if not registros or registros[0].get('carpeta') != self.carpeta:
+            return []
+        return registros
+
+    def resumen(self):
+        """Devuelve (inicio, archivos procesados) si hay una sesión sin terminar"""
+        registros = self._leer_lineas()
+        if not registros:
+            return None
+        return registros[0].get('inicio', ''), len(registros) - 1
+
+    def cargar(self):
+        """Devuelve los sondeos y errores guardados: {ruta: (tamano, mtime_ns, ...)}"""
+        sondeos = {}
+        errores = {}
+        for registro in self._leer_lineas()[1:]:
+            ruta = registro.get('r')
+            if 'e' in registro:
+                errores[ruta] = (registro['s'], registro['m'], registro['e'])
+            else:
+                sondeos[ruta] = (registro['s'], registro['m'],
+                                 registro['d'], registro['p'], registro['a'])
+        return sondeos, errores
+
+    def iniciar(self, reanudar=False):
+        """Abre el punto de control; sin `reanudar` empieza uno nuevo"""
+        os.makedirs(os.path.dirname(self.archivo) or ".", exist_ok=True)
+        if reanudar and self._leer_lineas():
+            with open(self.archivo, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                cortada = f.read(1) != b"\n"
+            self._f = open(self.archivo, 'a', encoding='utf-8')
+            if cortada:
+                self._f.write("\n")  # Aislar la línea que quedó a medias
+            return
+        self._f = open(self.archivo, 'w', encoding='utf-8')
+        self._escribir({'carpeta': self.carpeta,
+                        'inicio': datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+        self.volcar()
+
+    def anotar_sondeo(self, ruta, tamano, mtime_ns, duracion, peso, alto):
+        self._escribir({'r': ruta, 's': tamano, 'm': mtime_ns,
+                        'd': duracion, 'p': peso, 'a': alto})
+
+    def anotar_error(self, ruta, tamano, mtime_ns, mensaje):
+        """`tamano` y `mtime_ns` valen -1 si no se pudo hacer stat del archivo"""
+        self._escribir({'r': ruta, 's': tamano, 'm': mtime_ns, 'e': mensaje})
+
+    def _escribir(self, registro):
+        if self._f is None:
+            return
+        try:
+            self._f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            if time.monotonic() - self._ultimo_volcado > INTERVALO_CHECKPOINT:
+                self.volcar()
+        except OSError as e:
+            print(f"No se pudo escribir el punto de control: {e}")
+
+    def volcar(self):
+        """Lleva a disco lo escrito hasta ahora"""
+        if self._f is None:
+            return
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._ultimo_volcado = time.monotonic()
+
+    def cerrar(self):
+        """Cierra el punto de control dejándolo en disco para reanudar"""
+        if self._f is None:
+            return
+        try:
+            self.volcar()
+            self._f.close()
+        except OSError as e:
+            print(f"No se pudo cerrar el punto de control: {e}")
+        self._f = None
+
+    def descartar(self):
+        """Cierra y borra el punto de control (análisis terminado o descartado)"""
+        self.cerrar()
+        try:
+            os.remove(self.archivo)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"No se pudo borrar el punto de control: {e}")
+
+
+class IndiceCarpeta:
+    """Índice en memoria del árbol de una carpeta.
+
+    Se construye en una sola pasada con os.scandir y agrupa los archivos por
+    directorio, extensión y nombre base. Lo comparten las operaciones de las
+    pestañas AVI/MOV/MKV y se actualiza de forma incremental tras cada movimiento.
+    """
+    def __init__(self, raiz):
+        self.raiz = raiz
+        self._lock = threading.RLock()
+        self.archivos = {}       # directorio -> {nombre: extensión}, en orden de recorrido
+        self.subcarpetas = {}    # directorio -> [subdirectorios]
+        self.por_extension = {}  # extensión -> {directorio: número de archivos}
+        self.por_base = {}       # (directorio, nombre base) -> {nombre: extensión}
+        self.construir()
+
+    def construir(self):
+        """Recorre el árbol completo (mismo orden que os.walk descendente)"""
+        with self._lock:
+            self.archivos.clear()
+            self.subcarpetas.clear()
+            self.por_extension.clear()
+            self.por_base.clear()
+            self._escanear_arbol(self.raiz)
+
+    def _escanear_arbol(self, inicio):
+        pila = [inicio]
+        while pila:
+            directorio = pila.pop()
+            subdirs = self._escanear_directorio(directorio)
+            # Apilar en orden inverso para visitar los subdirectorios en orden de listado
+            pila.extend(reversed(subdirs))
+
+    def _escanear_directorio(self, directorio):
+        """Indexa un directorio y devuelve los subdirectorios por los que descender"""
+        self.archivos.setdefault(directorio, {})
+        self.subcarpetas.setdefault(directorio, [])
+        descender = []
+        try:
+            with os.scandir(directorio) as entradas:
+                for entrada in entradas:
+                    try:
+                        es_dir = entrada.is_dir()
+                    except OSError:
+                        es_dir = False
+                    if es_dir:
+                        self.subcarpetas[directorio].append(entrada.path)
+                        # Igual que os.walk: no seguir enlaces simbólicos a directorios
+                        if not entrada.is_symlink():
+                            descender.append(entrada.path)
+                    else:
+                        self._anadir_archivo(directorio, entrada.name)
+        except OSError as e:
+            print(f"No se pudo leer {directorio}: {e}")
+        return descender
+
+    def _anadir_archivo(self, directorio, nombre):
+        base, ext = os.path.splitext(nombre)
+        ext = ext.lower()
+        archivos_dir = self.archivos.setdefault(directorio, {})
+        if nombre in archivos_dir:
+            return
+        archivos_dir[nombre] = ext
+        conteo = self.por_extension.setdefault(ext, {})
+        conteo[directorio] = conteo.get(directorio, 0) + 1
+        self.por_base.setdefault((directorio, base), {})[nombre] = ext
+
+    def _quitar_archivo(self, directorio, nombre):
+        archivos_dir = self.archivos.get(directorio)
+        if not archivos_dir or nombre not in archivos_dir:
+            return
+        ext = archivos_dir.pop(nombre)
+        conteo = self.por_extension.get(ext, {})
+        if conteo.get(directorio, 0) <= 1:
+            conteo.pop(directorio, None)
+        else:
+            conteo[directorio] -= 1
+        clave = (directorio, os.path.splitext(nombre)[0])
+        grupo = self.por_base.get(clave)
+        if grupo is not None:
+            grupo.pop(nombre, None)
+            if not grupo:
+                del self.por_base[clave]
+
+    def _asegurar_directorio(self, directorio):
+        """Da de alta un directorio nuevo (p.ej. 'repeat' u 'optimizar') bajo su padre"""
+        if directorio in self.archivos:
+            return
+        padre = os.path.dirname(directorio)
+        if padre != directorio and padre in self.archivos:
+            self.subcarpetas[padre].append(directorio)
+        self.archivos[directorio] = {}
+        self.subcarpetas[directorio] = []
+
+    def registrar_movimiento(self, origen, destino):
+        """Actualiza el índice tras mover un archivo de `origen` a `destino`"""
+        with self._lock:
+            self._quitar_archivo(os.path.dirname(origen), os.path.basename(origen))
+            dir_destino = os.path.dirname(destino)
+            # Solo se indexan destinos dentro del árbol (directorio conocido o hijo directo)
+            if dir_destino in self.archivos or os.path.dirname(dir_destino) in self.archivos:
+                self._asegurar_directorio(dir_destino)
+                self._anadir_archivo(dir_destino, os.path.basename(destino))
+
+    def refrescar(self, directorio):
+        """Vuelve a leer un subárbol concreto del índice"""
+        with self._lock:
+            prefijo = os.path.join(directorio, "")
+            for d in [d for d in self.archivos if d == directorio or d.startswith(prefijo)]:
+                for nombre in list(self.archivos[d]):
+                    self._quitar_archivo(d, nombre)
+                if d != directorio:
+                    del self.archivos[d]
+                    del self.subcarpetas[d]
+            self.subcarpetas[directorio] = []
+            if os.path.isdir(directorio):
+                self._escanear_arbol(directorio)
+
+    def num_carpetas(self):
+        """Número de directorios indexados (incluida la raíz)"""
+        return len(self.archivos)
+
+    def contar_extensiones(self):
+        """Devuelve {extensión: número de archivos}, con 'sin_ext' para los que no tienen"""
+        with self._lock:
+            counts = {}
+            for ext, por_dir in self.por_extension.items():
+                total = sum(por_dir.values())
+                if total:
+                    counts[ext or 'sin_ext'] = total
+            return counts
+
+    def carpetas_con_extension(self, ext):
+        """Devuelve (carpetas con archivos `ext` en orden de recorrido, total de archivos)"""
+        with self._lock:
+            por_dir = self.por_extension.get(ext, {})
+            carpetas = [d for d in self.archivos if por_dir.get(d)]
+            return carpetas, sum(por_dir.values())
+
+    def carpetas_vacias(self):
+        """Devuelve los directorios sin archivos ni subdirectorios"""
+        with self._lock:
+            return [d for d, archivos in self.archivos.items()
+                    if not archivos and not self.subcarpetas.get(d)]
+
+    def directorios(self):
+        """Devuelve [(directorio, [nombres de archivo])] en orden de recorrido"""
+        with self._lock:
+            return [(d, list(archivos)) for d, archivos in self.archivos.items()]
+
+    def repetidos_por_base(self, ext, entre_carpetas=False):
+        """Devuelve [(ruta, directorio, variantes)] de los archivos `ext` que comparten
+        nombre base con otro vídeo de distinta extensión.
+
+        Los grupos ya están indexados por (directorio, nombre base), así que la búsqueda
+        es lineal. Con `entre_carpetas` se agrupa solo por nombre base en todo el árbol
+        (ignorando los archivos que ya están en una carpeta 'repeat').
+        """
+        with self._lock:
+            if entre_carpetas:
+                por_nombre = {}
+                for (directorio, base), nombres in self.por_base.items():
+                    por_nombre.setdefault(base, []).extend(
+                        (directorio, nombre, e) for nombre, e in nombres.items())
+                grupos = por_nombre.values()
+            else:
+                grupos = [[(directorio, nombre, e) for nombre, e in nombres.items()]
+                          for (directorio, _base), nombres in self.por_base.items()
+                          if len(nombres) > 1]
+            repetidos = []
+            for miembros in grupos:
+                if len(miembros) < 2:
+                    continue
+                variantes = [os.path.join(d, nombre) for d, nombre, e in miembros
+                             if e != ext and e in EXTENSIONES_VIDEO]
+                if not variantes:
+                    continue
+                for d, nombre, e in miembros:
+                    if e != ext:
+                        continue
+                    if entre_carpetas and os.path.basename(d).lower() == "repeat":
+                        continue
+                    repetidos.append((os.path.join(d, nombre), d, variantes))
+            return repetidos
+
+
+class IndiceBusqueda:
+    """Índice de consulta sobre los vídeos de todas las carpetas ya analizadas.
+
+    Lee de la caché de sondeos (sin volver a sondear nada) los archivos que cuelgan
+    de alguna carpeta registrada en GestorAnalisisHistorico y guarda duración, peso,
+    ratio (MB/min) y alto como columnas NumPy ordenadas. Un rango se resuelve con
+    searchsorted sobre la columna más selectiva y el resto se filtra vectorizado.
+    Solo se reconstruye cuando cambian la caché o el historial.
+    """
+    CAMPOS = ('duracion', 'peso', 'ratio', 'alto')
+
+    def __init__(self, cache_sondeos, gestor_historico):
+        self.cache_sondeos = cache_sondeos
+        self.gestor_historico = gestor_historico
+        self._version = None
+        self.rutas = np.empty(0, dtype=object)
+        self.columnas = {campo: np.empty(0) for campo in self.CAMPOS}
+        self.extensiones = np.empty(0, dtype=str)
+        self._ordenados = {}
+
+    def _version_actual(self):
+        try:
+            stat = os.stat(self.cache_sondeos.archivo_db)
+            firma_cache = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            firma_cache = None
+        return firma_cache, len(self.gestor_historico.datos)
+
+    def _carpetas_raiz(self):
+        """Carpetas analizadas sin las que ya están dentro de otra analizada"""
+        raices = []
+        for carpeta in sorted(entrada['carpeta'] for entrada
+                              in self.gestor_historico.datos.values()):
+            if raices and (carpeta == raices[-1] or
+                           carpeta.startswith(raices[-1].rstrip("/\\") + os.sep) or
+                           carpeta.startswith(raices[-1].rstrip("/\\") + "/")):
+                continue
+            raices.append(carpeta)
+        return raices
+
+    def actualizar(self):
+        """Reconstruye el índice si la caché o el historial han cambiado"""
+        version = self._version_actual()
+        if version == self._version:
+            return
+        rutas, duraciones, pesos, altos = [], [], [], []
+        for carpeta in self._carpetas_raiz():
+            for ruta, (_tamano, _mtime, duracion, peso, alto) in (
+                    self.cache_sondeos.cargar_carpeta(carpeta).items()):
+                if duracion > 0:
+                    rutas.append(ruta)
+                    duraciones.append(duracion)
+                    pesos.append(peso)
+                    altos.append(alto)
+        self.rutas = np.asarray(rutas, dtype=object)
+        duraciones = np.asarray(duraciones, dtype=np.float64)
+        pesos = np.asarray(pesos, dtype=np.float64)
+        self.columnas = {
+            'duracion': duraciones,
+            'peso': pesos,
+            'ratio': pesos / duraciones if len(duraciones) else np.empty(0),
+            'alto': np.asarray(altos, dtype=np.int64),
+        }
+        self.extensiones = np.array([os.path.splitext(r)[1].lower() for r in rutas], dtype=str)
+        self._ordenados = {}
+        for campo, valores in self.columnas.items():
+            orden = np.argsort(valores, kind='stable')
+            self._ordenados[campo] = (valores[orden], orden)
+        self._version = version
+
+    def __len__(self):
+        return len(self.rutas)
+
+    def consultar(self, rangos, formato=None, carpeta=None):
+        """Devuelve los índices que cumplen {campo: (mínimo, máximo)} (None = sin límite),
+        el formato (extensión sin punto) y, si se indica, que estén dentro de `carpeta`"""
+        # Rango de posiciones en cada columna ordenada; se parte del más estrecho
+        tramos = []
+        for campo, (minimo, maximo) in rangos.items():
+            if minimo is None and maximo is None:
+                continue
+            ordenados, orden = self._ordenados[campo]
+            desde = np.searchsorted(ordenados, minimo, 'left') if minimo is not None else 0
+            hasta = (np.searchsorted(ordenados, maximo, 'right') if maximo is not None
+                     else len(ordenados))
+            tramos.append((max(0, hasta - desde), orden[desde:hasta], campo, minimo, maximo))
+        tramos.sort(key=lambda tramo: tramo[0])
+        candidatos = tramos[0][1] if tramos else None
+        filtros = [tramo[2:] for tramo in tramos[1:]]
+        if candidatos is None:
+            candidatos = np.arange(len(self.rutas))
+        for campo, minimo, maximo in filtros:
+            valores = self.columnas[campo][candidatos]
+            if minimo is not None:
+                candidatos = candidatos[valores >= minimo]
+                valores = self.columnas[campo][candidatos]
+            if maximo is not None:
+                candidatos = candidatos[valores <= maximo]
+        if formato:
+            candidatos = candidatos[self.extensiones[candidatos] == f".{formato}"]
+        candidatos = np.sort(candidatos)
+        if carpeta:
+            prefijos = (carpeta.rstrip("/\\") + os.sep, carpeta.rstrip("/\\") + "/")
+            candidatos = np.asarray([i for i in candidatos.tolist()
+                                     if self.rutas[i].startswith(prefijos)], dtype=np.intp)
+        return candidatos
+
+    def fila(self, i):
+        """(ruta, duración, peso, alto) de la fila i"""
+        return (self.rutas[i], float(self.columnas['duracion'][i]),
+                float(self.columnas['peso'][i]), int(self.columnas['alto'][i]))
+
+
+# --- Modo vigilancia ---
+INTERVALO_VIGILANCIA = 2.0  # Segundos entre comprobaciones (y mínimo entre instantáneas)
+ESPERA_ESTABLE = 3.0  # Segundos sin cambiar tamaño/mtime para dar por acabada una copia
+
+# Máscaras de inotify(7)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_MASCARA_VIGILANCIA = (_IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO |
+                       _IN_CREATE | _IN_DELETE)
+_EVENTO_INOTIFY = struct.Struct('iIII')
+
+def _es_video_vigilable(ruta):
+    """Mismo criterio que el análisis: extensión de vídeo y fuera de carpetas 'errores'"""
+    return (ruta.lower().endswith(EXTENSIONES_VIDEO) and
+            os.path.basename(os.path.dirname(ruta)).lower() != "errores")
+
+def _cargar_inotify():
+    """Devuelve (inotify_init1, inotify_add_watch) de la libc o None si no existen"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        return libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+
+class VigilanteCarpeta:
+    """Detecta vídeos nuevos, modificados o borrados bajo una carpeta.
+
+    En Linux usa inotify y solo vuelve a mirar los archivos de los que llega algún
+    evento; si no hay inotify (o no quedan watches libres) compara instantáneas de
+    os.scandir por (tamaño, mtime), espaciadas según lo que tarde cada una. Un archivo
+    solo se da por cambiado cuando se cerró tras escribirlo o su firma lleva
+    ESPERA_ESTABLE segundos quieta, para no sondear copias a medias.
+    """
+    def __init__(self, raiz, usar_inotify=True):
+        self.raiz = raiz
+        self.archivos = {}  # ruta -> (tamano, mtime_ns) ya notificada
+        self._candidatos = {}  # ruta -> (firma, instante en que se vio por primera vez)
+        self._usar_inotify = usar_inotify
+        self._inotify = None  # Descriptor de inotify; None en modo instantáneas
+        self._add_watch = None
+        self._watches = {}  # wd -> directorio
+        self._intervalo = INTERVALO_VIGILANCIA
+        self._ultima_instantanea = 0.0
+
+    @property
+    def modo(self):
+        return "inotify" if self._inotify is not None else "instantáneas"
+
+    def iniciar(self):
+        """Abre inotify si se puede, toma la instantánea inicial y la devuelve"""
+        funciones = _cargar_inotify() if self._usar_inotify else None
+        if funciones is not None:
+            inotify_init1, self._add_watch = funciones
+            fd = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                self._inotify = fd
+        self.archivos = self._instantanea()
+        return dict(self.archivos)
+
+    def cerrar(self):
+        if self._inotify is not None:
+            try:
+                os.close(self._inotify)
+            except OSError:
+                pass
+            self._inotify = None
+            self._watches = {}
+
+    def _vigilar_directorio(self, directorio):
+        if self._inotify is None:
+            return
+        wd = self._add_watch(self._inotify, os.fsencode(directorio), _MASCARA_VIGILANCIA)
+        if wd >= 0:
+            self._watches[wd] = directorio
+        elif ctypes.get_errno() == errno.ENOSPC:
+            print("Sin watches de inotify libres; se vigila comparando instantáneas.")
+            self.cerrar()
+
+    def _escanear(self, directorio, firmas):
+        """Añade a `firmas` los vídeos bajo `directorio` y vigila sus carpetas.
+        El watch se pone antes de listar cada carpeta para no perder lo que llegue entre medias."""
+        pila = [directorio]
+        while pila:
+            actual = pila.pop()
+            self._vigilar_directorio(actual)
+            try:
+                with os.scandir(actual) as entradas:
+                    for entrada in entradas:
+                        try:
+                            if entrada.is_dir(follow_symlinks=False):
+                                pila.append(entrada.path)
+                            elif _es_video_vigilable(entrada.path):
+                                stat = entrada.stat()
+                                firmas[entrada.path] = (stat.st_size, stat.st_mtime_ns)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return firmas
+
+    def _instantanea(self):
+        inicio = time.monotonic()
+        firmas = self._escanear(self.raiz, {})
+        self._ultima_instantanea = time.monotonic()
+        # Árboles grandes: no dedicar más de ~10 % del tiempo a recorrerlos
+        self._intervalo = max(INTERVALO_VIGILANCIA, (self._ultima_instantanea - inicio) * 10)
+        return firmas
+
+    def _comparar_instantanea(self, sucios):
+        nueva = self._instantanea()
+        sucios.update(ruta for ruta, firma in nueva.items() if self.archivos.get(ruta) != firma)
+        sucios.update(ruta for ruta in self.archivos if ruta not in nueva)
+
+    def _leer_eventos(self, timeout, sucios, cerrados):
+        """Espera eventos de inotify y reparte las rutas afectadas en `sucios`
+        (hay que vigilar su firma) y `cerrados` (terminaron de escribirse)"""
+        try:
+            listos, _, _ = select.select([self._inotify], [], [], timeout)
+        except (OSError, ValueError):
+            return
+        if not listos:
+            return
+        datos = b""
+        while True:
+            try:
+                bloque = os.read(self._inotify, 64 * 1024)
+            except BlockingIOError:
+                break
+            except OSError:
+                return
+            if not bloque:
+                break
+            datos += bloque
+        desbordado = False
+        pos = 0
+        while pos + _EVENTO_INOTIFY.size <= len(datos):
+            wd, mascara, _cookie, longitud = _EVENTO_INOTIFY.unpack_from(datos, pos)
+            pos += _EVENTO_INOTIFY.size
+            nombre = datos[pos:pos + longitud].rstrip(b"\0")
+            pos += longitud
+            if mascara & _IN_Q_OVERFLOW:
+                desbordado = True
+                continue
+            if mascara & _IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directorio = self._watches.get(wd)
+            if directorio is None or not nombre:
+                continue
+            ruta = os.path.join(directorio, os.fsdecode(nombre))
+            if mascara & _IN_ISDIR:
+                if mascara & (_IN_CREATE | _IN_MOVED_TO):
+                    # Carpeta nueva o traída de fuera: vigilarla y mirar lo que ya contiene
+                    sucios.update(self._escanear(ruta, {}))
+                else:
+                    prefijo = os.path.join(ruta, "")
+                    sucios.update(r for r in self.archivos if r.startswith(prefijo))
+                continue
+            if not _es_video_vigilable(ruta):
+                continue
+            if mascara & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+                cerrados.add(ruta)
+            else:
+                sucios.add(ruta)
+        if desbordado:
+            self._comparar_instantanea(sucios)
+
+    def esperar_cambios(self, timeout=INTERVALO_VIGILANCIA):
+        """Espera hasta `timeout` segundos y devuelve (cambiados {ruta: firma}, borrados)
+        con los archivos nuevos o modificados que ya están estables y los que desaparecieron"""
+        sucios, cerrados = set(), set()
+        if self._inotify is not None:
+            self._leer_eventos(timeout, sucios, cerrados)
+        else:
+            time.sleep(timeout)
+            if time.monotonic() - self._ultima_instantanea >= self._intervalo:
+                self._comparar_instantanea(sucios)
+
+        ahora = time.monotonic()
+        cambiados, borrados = {}, set()
+        for ruta in sucios | cerrados | set(self._candidatos):
+            try:
+                stat = os.stat(ruta)
+                firma = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                firma = None
+            previo = self._candidatos.pop(ruta, None)
+            if firma is None:
+                if self.archivos.pop(ruta, None) is not None:
+                    borrados.add(ruta)
+            elif firma == self.archivos.get(ruta):
+                continue  # Se tocó pero quedó igual
+            elif ruta in cerrados or (previo is not None and previo[0] == firma and
+                                      ahora - previo[1] >= ESPERA_ESTABLE):
+                self.archivos[ruta] = firma
+                cambiados[ruta] = firma
+            elif previo is not None and previo[0] == firma:
+                self._candidatos[ruta] = previo
+            else:
+                self._candidatos[ruta] = (firma, ahora)
+        return cambiados, borrados
+
+# --- Métricas del análisis ---
+LIMITES_LATENCIA_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)  # Cubos
+MAX_SONDEOS_LENTOS = 10  # Archivos más lentos que se conservan en las métricas
+
+def sondear_video_cronometrado(ruta):
+    """Como sondear_video, añadiendo los segundos que tardó medidos dentro del worker
+    (sin contar la espera en la cola del pool)"""
+    inicio = time.perf_counter()
+    duracion, peso, alto = sondear_video(ruta)
+    return duracion, peso, alto, time.perf_counter() - inicio
+
+
+class MetricasAnalisis:
+    """Tiempo por etapa de un análisis y latencia de cada sondeo.
+
+    Las etapas se miden con `with metricas.etapa(nombre):` y se acumulan por nombre;
+    las latencias se guardan en un array compacto y se resumen en percentiles y en
+    un histograma por cubos (LIMITES_LATENCIA_MS). resumen() es lo que se exporta
+    con la entrada del historial.
+    """
+    def __init__(self):
+        self.etapas = {}  # nombre -> segundos acumulados
+        self.latencias = array('d')  # Segundos de cada sondeo
+        self.timeouts = 0
+        self.errores = 0
+        self.aciertos_cache = 0
+        self.cuarentena = 0  # Archivos saltados por estar en cuarentena
+        self._lentos = []  # Montículo (segundos, ruta) con los sondeos más lentos
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar(nombre, time.perf_counter() - inicio)
+
+    def sumar(self, nombre, segundos):
+        self.etapas[nombre] = self.etapas.get(nombre, 0.0) + segundos
+
+    def anotar_sondeo(self, ruta, segundos):
+        self.latencias.append(segundos)
+        if len(self._lentos) < MAX_SONDEOS_LENTOS:
+            heapq.heappush(self._lentos, (segundos, ruta))
+        elif segundos > self._lentos[0][0]:
+            heapq.heapreplace(self._lentos, (segundos, ruta))
+
+    def histograma(self):
+        """{etiqueta del cubo: número de sondeos} de las latencias en ms"""
+        ms = np.frombuffer(self.latencias, dtype=np.float64) * 1000
+        cuentas = np.bincount(np.searchsorted(LIMITES_LATENCIA_MS, ms, side='right'),
+                              minlength=len(LIMITES_LATENCIA_MS) + 1)
+        etiquetas = ([f"<{LIMITES_LATENCIA_MS[0]}"] +
+                     [f"{desde}-{hasta}" for desde, hasta
+                      in zip(LIMITES_LATENCIA_MS, LIMITES_LATENCIA_MS[1:])] +
+                     [f">={LIMITES_LATENCIA_MS[-1]}"])
+        return dict(zip(etiquetas, cuentas.tolist()))
+
+    def resumen(self):
+        """Diccionario serializable en JSON con todo lo medido hasta ahora"""
+        ms = np.frombuffer(self.latencias, dtype=np.float64) * 1000
+        sondeos = {'total': len(ms), 'cache': self.aciertos_cache,
+                   'cuarentena': self.cuarentena, 'timeouts': self.timeouts,
+                   'errores': self.errores}
+        if len(ms):
+            p50, p90, p99 = np.percentile(ms, [50, 90, 99]).tolist()
+            sondeos.update({'media_ms': round(float(ms.mean()), 1), 'p50_ms': round(p50, 1),
+                            'p90_ms': round(p90, 1), 'p99_ms': round(p99, 1),
+                            'max_ms': round(float(ms.max()), 1)})
+        return {
+            'total_s': round(time.perf_counter() - self._inicio, 3),
+            # Copia atómica: la interfaz puede sumar su etapa desde otro hilo
+            'etapas_s': {nombre: round(segundos, 3)
+                         for nombre, segundos in dict(self.etapas).items()},
+            'sondeos': sondeos,
+            'histograma_ms': self.histograma(),
+            'mas_lentos': [{'ruta': ruta, 'ms': round(segundos * 1000, 1)}
+                           for segundos, ruta in sorted(self._lentos, reverse=True)],
+        }
+
+
+def texto_metricas(resumen):
+    """Informe legible de un MetricasAnalisis.resumen()"""
+    lineas = [f"Tiempo total: {resumen['total_s']:.2f} s\n", "\nTiempo por etapa:\n"]
+    total = resumen['total_s'] or 1
+    for nombre, segundos in resumen['etapas_s'].items():
+        lineas.append(f"- {nombre:<14} {segundos:9.2f} s  ({segundos / total * 100:5.1f} %)\n")
+    sondeos = resumen['sondeos']
+    lineas.append(f"\nSondeos: {sondeos['total']}   |   Recuperados de la caché: "
+                  f"{sondeos['cache']}   |   En cuarentena: {sondeos.get('cuarentena', 0)}"
+                  f"   |   Timeouts: {sondeos['timeouts']}"
+                  f"   |   Errores: {sondeos['errores']}\n")
+    if sondeos['total']:
+        lineas.append(f"Latencia (ms): media {sondeos['media_ms']}   p50 {sondeos['p50_ms']}"
+                      f"   p90 {sondeos['p90_ms']}   p99 {sondeos['p99_ms']}"
+                      f"   máx {sondeos['max_ms']}\n")
+        lineas.append("\nHistograma de latencias (ms):\n")
+        mayor = max(resumen['histograma_ms'].values()) or 1
+        for cubo, cuenta in resumen['histograma_ms'].items():
+            lineas.append(f"{cubo:>12} | {'█' * round(cuenta / mayor * 40):<40} {cuenta}\n")
+    if resumen['mas_lentos']:
+        lineas.append("\nSondeos más lentos:\n")
+        for lento in resumen['mas_lentos']:
+            lineas.append(f"- {lento['ms']:10.1f} ms  {lento['ruta']}\n")
+    return "".join(lineas)
+
+
+# --- Tabla compacta de archivos ---
+ARCHIVOS_DERRAMAR = 500000  # Archivos a partir de los que las columnas pasan a disco
+BLOQUE_TABLA = 65536  # Archivos acumulados en memoria antes de volcarlos al derramar
+BLOQUE_CONSULTA = 20000  # Rutas por bloque de consultas a la caché y a la cuarentena
+CONJUNTOS_CARPETA = 8  # Carpetas cuyos nombres se guardan en un set para `ruta in tabla`
+
+# Estado de cada archivo de la tabla
+PENDIENTE, EN_CACHE, SONDEADO, PROBLEMA = 0, 1, 2, 3
+
+class TablaArchivos:
+    """Archivos de un recorrido guardados por columnas compactas.
+
+    Cada carpeta se guarda una sola vez (con un id entero) y por archivo solo se guarda
+    el id de su carpeta, el nombre codificado dentro de un búfer de bytes y columnas
+    NumPy (tamaño, mtime, duración, peso, alto y estado). Los archivos de una carpeta
+    quedan contiguos y ordenados; `ruta in tabla` usa un set con los nombres de la carpeta,
+    del que solo se conservan los de las últimas CONJUNTOS_CARPETA consultadas.
+    Si el recorrido pasa de `derramar_desde` archivos (None: nunca), nombres y columnas
+    se vuelcan a archivos temporales mapeados en memoria: lo que queda en RAM crece con
+    el número de carpetas, no con el de archivos. cerrar() libera esos archivos.
+    """
+    def __init__(self, derramar_desde=ARCHIVOS_DERRAMAR):
+        self.carpetas = []
+        self._prefijos = []  # carpeta con separador final, para componer rutas
+        self._ids = {}  # prefijo -> id de carpeta
+        self._rangos = []  # id -> (primer archivo, último + 1)
+        self._derramar_desde = derramar_desde
+        self._dir_temporal = None
+        self._salidas = None  # Archivos abiertos mientras se derrama el recorrido
+        self._total = 0
+        self._bytes_nombres = 0
+        self._buf_nombres = bytearray()
+        self._buf_desplazamientos = array('q', [0])  # Fin de cada nombre (y el 0 inicial)
+        self._buf_ids = array('I')
+        self._mapas = []  # mmap de los archivos del recorrido cuando se derrama
+        self._conjuntos = {}  # id de carpeta -> set de nombres codificados (las últimas)
+        # Vistas de acceso por índice (más rápidas que indexar NumPy de uno en uno)
+        self._nombres = self._desplazamientos = self._ids_archivo = None
+        self.ids = None
+        self.tamano = self.mtime = self.duracion = self.peso = self.alto = self.estado = None
+
+    def __len__(self):
+        return self._total
+
+    @property
+    def derramada(self):
+        return self._dir_temporal is not None
+
+    # Recorrido
+    def anadir_carpeta(self, carpeta, nombres):
+        """Añade los archivos `nombres` de `carpeta` (una sola vez por carpeta)"""
+        codificados = sorted(nombre.encode('utf-8', 'surrogateescape') for nombre in nombres)
+        if not codificados:
+            return
+        id_carpeta = len(self.carpetas)
+        self.carpetas.append(carpeta)
+        self._prefijos.append(os.path.join(carpeta, ""))
+        self._ids[self._prefijos[-1]] = id_carpeta
+        self._rangos.append((self._total, self._total + len(codificados)))
+        for nombre in codificados:
+            self._buf_nombres += nombre
+            self._bytes_nombres += len(nombre)
+            self._buf_desplazamientos.append(self._bytes_nombres)
+        self._buf_ids.extend([id_carpeta] * len(codificados))
+        self._total += len(codificados)
+        if (self._salidas is None and self._derramar_desde is not None
+                and self._total > self._derramar_desde):
+            self._empezar_derrame()
+        if self._salidas is not None and len(self._buf_ids) >= BLOQUE_TABLA:
+            self._volcar()
+
+    def _empezar_derrame(self):
+        self._dir_temporal = tempfile.mkdtemp(prefix="tabla_archivos_")
+        self._salidas = {nombre: open(os.path.join(self._dir_temporal, nombre), 'wb')
+                         for nombre in ('nombres', 'desplazamientos', 'ids')}
+
+    def _volcar(self):
+        self._salidas['nombres'].write(self._buf_nombres)
+        self._buf_desplazamientos.tofile(self._salidas['desplazamientos'])
+        self._buf_ids.tofile(self._salidas['ids'])
+        self._buf_nombres = bytearray()
+        self._buf_desplazamientos = array('q')
+        self._buf_ids = array('I')
+
+    def _mapear(self, nombre):
+        with open(os.path.join(self._dir_temporal, nombre), 'rb') as f:
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapas.append(mapa)
+        return mapa
+
+    def _columna(self, nombre, dtype, valor=0):
+        if self.derramada:
+            columna = np.memmap(os.path.join(self._dir_temporal, nombre), dtype=dtype,
+                                mode='w+', shape=(self._total,))
+        else:
+            columna = np.empty(self._total, dtype=dtype)
+        columna[:] = valor
+        return columna
+
+    def cerrar_recorrido(self):
+        """Termina el recorrido y crea las columnas por archivo"""
+        if self._salidas is not None:
+            self._volcar()
+            for salida in self._salidas.values():
+                salida.close()
+            self._salidas = None
+            self._nombres = self._mapear('nombres') if self._bytes_nombres else b""
+            self._desplazamientos = memoryview(self._mapear('desplazamientos')).cast('q')
+            self._ids_archivo = memoryview(self._mapear('ids')).cast('I')
+        else:
+            self._nombres, self._buf_nombres = bytes(self._buf_nombres), bytearray()
+            self._desplazamientos = self._buf_desplazamientos
+            self._ids_archivo = self._buf_ids
+        self.ids = np.frombuffer(self._ids_archivo, dtype=np.uint32)
+        self.tamano = self._columna('tamano', np.int64, -1)  # -1: no se pudo hacer stat
+        self.mtime = self._columna('mtime', np.int64)
+        self.duracion = self._columna('duracion', np.float64)
+        self.peso = self._columna('peso', np.float64)
+        self.alto = self._columna('alto', np.int32)
+        self.estado = self._columna('estado', np.int8, PENDIENTE)
+
+    def cerrar(self):
+        """Libera las columnas y borra los archivos temporales si se derramó"""
+        self.ids = None
+        self.tamano = self.mtime = self.duracion = self.peso = self.alto = self.estado = None
+        if isinstance(self._desplazamientos, memoryview):
+            self._desplazamientos.release()
+            self._ids_archivo.release()
+        self._nombres = self._desplazamientos = self._ids_archivo = None
+        self._conjuntos = {}
+        for mapa in self._mapas:
+            mapa.close()
+        self._mapas = []
+        if self._salidas is not None:
+            for salida in self._salidas.values():
+                salida.close()
+            self._salidas = None
+        if self._dir_temporal is not None:
+            shutil.rmtree(self._dir_temporal, ignore_errors=True)
+            self._dir_temporal = None
+
+    # Consultas
+    def _nombre_codificado(self, i):
+        return self._nombres[self._desplazamientos[i]:self._desplazamientos[i + 1]]
+
+    def nombre(self, i):
+        return self._nombre_codificado(i).decode('utf-8', 'surrogateescape')
+
+    def carpeta(self, i):
+        return self.carpetas[self._ids_archivo[i]]
+
+    def ruta(self, i):
+        return self._prefijos[self._ids_archivo[i]] + self.nombre(i)
+
+    def __contains__(self, ruta):
+        corte = ruta.rfind(os.sep)
+        if os.altsep:
+            corte = max(corte, ruta.rfind(os.altsep))
+        nombre = ruta[corte + 1:]
+        id_carpeta = self._ids.get(ruta[:corte + 1])
+        if id_carpeta is None:
+            return False
+        conjunto = self._conjuntos.pop(id_carpeta, None)
+        if conjunto is None:
+            inicio, fin = self._rangos[id_carpeta]
+            conjunto = {self._nombre_codificado(i) for i in range(inicio, fin)}
+            if len(self._conjuntos) >= CONJUNTOS_CARPETA:
+                del self._conjuntos[next(iter(self._conjuntos))]
+        self._conjuntos[id_carpeta] = conjunto  # Queda como la más reciente
+        return nombre.encode('utf-8', 'surrogateescape') in conjunto
+
+    def indices(self, estado):
+        """Itera los índices de los archivos en `estado`, por bloques para no crear un
+        array del tamaño de la tabla"""
+        for inicio in range(0, self._total, BLOQUE_TABLA):
+            bloque = np.flatnonzero(self.estado[inicio:inicio + BLOQUE_TABLA] == estado)
+            yield from (bloque + inicio).tolist()
+
+    def filas(self, estado):
+        """Itera (ruta, tamano, mtime_ns, duracion, peso, alto) de los archivos en `estado`
+        con stat conocido, convirtiendo las columnas por bloques"""
+        for inicio in range(0, self._total, BLOQUE_TABLA):
+            fin = min(self._total, inicio + BLOQUE_TABLA)
+            bloque = np.flatnonzero((self.estado[inicio:fin] == estado) &
+                                    (self.tamano[inicio:fin] >= 0)) + inicio
+            yield from zip(map(self.ruta, bloque.tolist()), self.tamano[bloque].tolist(),
+                           self.mtime[bloque].tolist(), self.duracion[bloque].tolist(),
+                           self.peso[bloque].tolist(), self.alto[bloque].tolist())
+
+    def contar_extensiones(self):
+        """{extensión: archivos} de toda la tabla"""
+        por_bytes = {}  # Se cuenta sobre los nombres codificados, sin decodificarlos
+        for i in range(self._total):
+            ext = os.path.splitext(self._nombre_codificado(i))[1]
+            por_bytes[ext] = por_bytes.get(ext, 0) + 1
+        conteo = {}
+        for ext, n in por_bytes.items():
+            ext = ext.decode('utf-8', 'surrogateescape').lower() or 'sin_ext'
+            conteo[ext] = conteo.get(ext, 0) + n
+        return conteo
+
+    def tuplas_validas(self):
+        """Itera (nombre, dur, peso, ruta, carpeta, alto) de los vídeos con duración"""
+        for i in np.flatnonzero(self.duracion > 0).tolist():
+            id_carpeta, nombre = self._ids_archivo[i], self.nombre(i)
+            yield (nombre, float(self.duracion[i]), float(self.peso[i]),
+                   self._prefijos[id_carpeta] + nombre, self.carpetas[id_carpeta],
+                   int(self.alto[i]))
+
+    def columnas(self):
+        """ResultadosColumnares (en memoria) de los vídeos con duración"""
+        validos = np.flatnonzero(self.duracion > 0)
+        return ResultadosColumnares([self.nombre(i) for i in validos.tolist()],
+                                    self.duracion[validos], self.peso[validos],
+                                    self.alto[validos],
+                                    [self.carpetas[j] for j in self.ids[validos].tolist()])
+
+
+# --- Motor de análisis ---
+class DatosAnalizador:
+    """Archivos persistentes que comparten la interfaz y la línea de órdenes.
+
+    Historiales, caché y cuarentena de sondeos, puntos de control y lotes de
+    movimientos cuelgan de `directorio` (por defecto el de trabajo, como ha hecho
+    siempre la interfaz).
+    `cerrojo` serializa el registro en los historiales cuando se analizan varias
+    carpetas a la vez en el mismo proceso.
+    """
+    def __init__(self, directorio="", callback_historial=None):
+        self.gestor_historial = GestorHistorialAnalisis(
+            os.path.join(directorio, "analisis_historial.json"), callback_historial)
+        self.gestor_analisis_historico = GestorAnalisisHistorico(
+            os.path.join(directorio, "analisis_carpetas.json"))
+        # La caché, las sesiones y los lotes se guardan junto a analisis_carpetas.json
+        base = os.path.dirname(os.path.abspath(self.gestor_analisis_historico.archivo_datos))
+        self.cache_sondeos = CacheSondeos(os.path.join(base, "cache_sondeos.db"))
+        self.cuarentena = CuarentenaSondeos(self.cache_sondeos.archivo_db)
+        self.dir_sesiones = os.path.join(base, "sesiones_analisis")
+        self.gestor_movimientos = GestorLotesMovimientos(
+            os.path.join(base, "movimientos_lotes.json"), self.cache_sondeos, self.cuarentena)
+        self.cerrojo = threading.Lock()
+
+
+def ejecutar_plan_movimientos(datos, plan, descripcion, al_mover=None):
+    """Ejecuta un PlanMovimientos, lo registra como un lote deshacible y mantiene
+    al día la caché de sondeos. `al_mover` recibe [(origen, destino)] de lo movido."""
+    if not len(plan):
+        return [], []
+    hechos, fallidos = plan.ejecutar()
+    movimientos = [(origen, destino) for origen, destino, _etiqueta in hechos]
+    if al_mover:
+        al_mover(movimientos)
+    datos.cache_sondeos.renombrar(movimientos)
+    datos.cuarentena.renombrar(movimientos)
+    with datos.cerrojo:
+        datos.gestor_movimientos.registrar_lote(descripcion, movimientos,
+                                                plan.carpetas_creadas)
+    return hechos, fallidos
+
+
+def _sin_efecto(*_args):
+    pass
+
+
+def planificar_ordenacion(resultados):
+    """Reglas de ordenación: devuelve el PlanMovimientos (sin ejecutar) que lleva a
+    'optimizar' o 'review' los vídeos (nombre, dur, peso, ruta, carpeta, alto) que lo necesitan"""
+    plan = PlanMovimientos()
+    for nombre, duracion, peso, ruta, carpeta_actual, *_extra in resultados:
+        # Evita crear subcarpetas dentro de sí mismas (review/xcut/optimizar)
+        basename_actual = os.path.basename(carpeta_actual).lower()
+        # calcular ratio MB/min de forma segura
+        ratio = (peso / duracion) if duracion else 0
+
+        # Prioridad: mover a 'optimizar' si la relación peso/duración es excesiva
+        if ratio > 100:
+            if basename_actual != "optimizar":
+                optim_dir = os.path.join(carpeta_actual, "optimizar")
+            else:
+                optim_dir = carpeta_actual
+            plan.anadir(ruta, os.path.join(optim_dir, nombre), 'optimizar')
+
+        elif duracion > 20 and ratio < 50:
+            # Verificar que el archivo sea .mkv antes de mover a review
+            ext_archivo = os.path.splitext(nombre)[1].lower()
+            if ext_archivo == ".mkv":
+                if basename_actual != "review":
+                    review_dir = os.path.join(carpeta_actual, "review")
+                else:
+                    review_dir = carpeta_actual
+                plan.anadir(ruta, os.path.join(review_dir, nombre), 'review')
+    return plan
+
+
+class MotorAnalisis:
+    """Análisis de una carpeta sin interfaz: recorre el árbol, sondea los vídeos,
+    ordena los que lo necesitan en 'optimizar'/'review' y lo registra en los historiales.
+
+    Lo que va ocurriendo se comunica con callbacks opcionales:
+    al_log(mensaje), al_empezar(total), al_progreso(procesados, total),
+    al_problema(ruta, archivo, motivo) y al_mover([(origen, destino)]).
+    parar() lo detiene desde otro hilo; lo ya sondeado se registra igualmente.
+    Los archivos en cuarentena (timeout o error en un análisis anterior y sin cambios
+    desde entonces) se dan por problemáticos sin sondearlos salvo con `reintentar_cuarentena`.
+    `sondeador(ruta)` -> (duración, peso, alto, segundos) sustituye al sondeo real (p. ej.
+    en benchmark_analisis.py); en modo procesos tiene que ser una función de módulo.
+    Los archivos del recorrido se guardan en una TablaArchivos, que pasa a disco a partir
+    de `derramar_desde` archivos (None: nunca).
+    """
+    def __init__(self, datos, workers=WORKERS_POR_DEFECTO, modo="hilos", ordenar=True,
+                 al_log=None, al_empezar=None, al_progreso=None, al_problema=None,
+                 al_mover=None, metricas=None, reintentar_cuarentena=False,
+                 sondeador=sondear_video_cronometrado, derramar_desde=ARCHIVOS_DERRAMAR):
+        self.datos = datos
+        self.workers = max(1, workers)
+        self.modo = modo if modo in MODOS_WORKERS else MODOS_WORKERS[0]
+        self.ordenar = ordenar
+        self.al_log = al_log or _sin_efecto
+        self.al_empezar = al_empezar or _sin_efecto
+        self.al_progreso = al_progreso or _sin_efecto
+        self.al_problema = al_problema or _sin_efecto
+        self.al_mover = al_mover
+        self.reintentar_cuarentena = reintentar_cuarentena
+        self.sondeador = sondeador
+        self.derramar_desde = derramar_desde
+        self.detenido = False
+        self.problemas = []
+        self.metricas = metricas if metricas is not None else MetricasAnalisis()
+        self._executor = None
+        self._futuros = set()
+
+    def parar(self, wait=False):
+        """Cancela las tareas pendientes y cierra el executor que sondea vídeos"""
+        self.detenido = True
+        self._cerrar_executor(wait)
+
+    def _crear_executor(self):
+        if self.modo == "procesos":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _cerrar_executor(self, wait):
+        for future in list(self._futuros):
+            if not future.done():
+                try:
+                    future.cancel()
+                except (RuntimeError, CancelledError):
+                    pass
+        if self._executor:
+            try:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+            except (RuntimeError, OSError):
+                pass
+            finally:
+                self._executor = None
+        self._futuros = set()
+
+    def _problema(self, ruta, archivo, motivo):
+        self.problemas.append({'ruta': ruta, 'archivo': archivo, 'motivo': motivo})
+        self.al_problema(ruta, archivo, motivo)
+
+    def recuperar_xcut(self, carpeta):
+        """Devuelve a la raíz los archivos de la carpeta 'xcut' y la borra si queda vacía"""
+        xcut_dir = os.path.join(carpeta, "xcut")
+        if not os.path.isdir(xcut_dir):
+            return 0
+        archivos_movidos = 0
+        try:
+            # Planificar todos los archivos de la carpeta xcut (no las subcarpetas)
+            plan = PlanMovimientos()
+            with os.scandir(xcut_dir) as entradas:
+                for entrada in entradas:
+                    if entrada.is_file():
+                        plan.anadir(entrada.path, os.path.join(carpeta, entrada.name))
+            hechos, fallidos = ejecutar_plan_movimientos(
+                self.datos, plan, f"xcut -> raíz de {carpeta}", self.al_mover)
+            archivos_movidos = len(hechos)
+            for origen, _destino, _etiqueta, e in fallidos:
+                print(f"No se pudo mover {os.path.basename(origen)} desde xcut: {e}")
+
+            # Intentar eliminar la carpeta xcut si está vacía
+            try:
+                if os.path.exists(xcut_dir) and not os.listdir(xcut_dir):
+                    os.rmdir(xcut_dir)
+            except (OSError, shutil.Error) as e:
+                print(f"No se pudo eliminar la carpeta xcut: {e}")
+
+            if archivos_movidos > 0:
+                print(f"Se movieron {archivos_movidos} archivos desde xcut a la raíz")
+        except (OSError, shutil.Error) as e:
+            print(f"Error procesando la carpeta xcut: {e}")
+        return archivos_movidos
+
+    def analizar(self, carpeta, reanudar=False):
+        """Analiza los vídeos de `carpeta` y sus subcarpetas y devuelve el informe.
+        Mantiene hasta `workers` sondeos en vuelo y procesa los resultados según terminan.
+        Con `reanudar` recupera lo ya sondeado en el punto de control de una sesión anterior."""
+        tiempo_inicio = time.time()
+        metricas = self.metricas
+        if self.ordenar:
+            with metricas.etapa('xcut'):
+                self.recuperar_xcut(carpeta)
+
+        # Recorrer carpeta y subcarpetas
+        tabla = TablaArchivos(self.derramar_desde)
+        with metricas.etapa('recorrido'):
+            for root_dir, _, files in os.walk(carpeta):
+                if os.path.basename(root_dir).lower() == "errores":
+                    continue
+                tabla.anadir_carpeta(root_dir, [f for f in files
+                                                if f.lower().endswith(EXTENSIONES_VIDEO)])
+            tabla.cerrar_recorrido()
+        try:
+            return self._analizar_tabla(carpeta, tabla, reanudar, tiempo_inicio)
+        finally:
+            tabla.cerrar()
+
+    def _analizar_tabla(self, carpeta, tabla, reanudar, tiempo_inicio):
+        cache_sondeos = self.datos.cache_sondeos
+        metricas = self.metricas
+        total = len(tabla)
+        if tabla.derramada:
+            self.al_log(f"{total} archivos: la tabla del recorrido se guarda en disco.\n")
+        self.al_empezar(total)
+        inicio_cache = time.perf_counter()
+
+        # Al reanudar, pasar a la caché lo que ya se sondeó en la sesión interrumpida
+        sesion = SesionAnalisis(self.datos.dir_sesiones, carpeta)
+        errores_sesion = {}
+        if reanudar:
+            sondeos_sesion, errores_sesion = sesion.cargar()
+            cache_sondeos.guardar(
+                [(ruta,) + datos for ruta, datos in sondeos_sesion.items()], [])
+        sesion.iniciar(reanudar)
+
+        # Recuperar de la caché los archivos que no han cambiado desde el último sondeo
+        # y saltar los que siguen en cuarentena; se consulta por bloques de rutas
+        aislados = set()  # Archivos en cuarentena que se van a volver a sondear
+        omitidos = 0
+        for inicio_bloque in range(0, total, BLOQUE_CONSULTA):
+            indices = range(inicio_bloque, min(total, inicio_bloque + BLOQUE_CONSULTA))
+            rutas = [tabla.ruta(i) for i in indices]
+            en_cache = cache_sondeos.buscar(rutas)
+            en_cuarentena = self.datos.cuarentena.buscar(rutas)
+            for i, ruta in zip(indices, rutas):
+                try:
+                    stat = os.stat(ruta)
+                except OSError:
+                    continue  # Queda pendiente con tamaño -1
+                firma = (stat.st_size, stat.st_mtime_ns)
+                tabla.tamano[i], tabla.mtime[i] = firma
+                error_previo = errores_sesion.get(ruta)
+                if error_previo is not None and tuple(error_previo[:2]) == firma:
+                    # Ya falló en la sesión interrumpida: no volver a sondearlo
+                    self._problema(ruta, os.path.basename(ruta), error_previo[2])
+                    tabla.estado[i] = PROBLEMA
+                    continue
+                guardado = en_cache.get(ruta)
+                if guardado is not None and tuple(guardado[:2]) == firma:
+                    tabla.duracion[i], tabla.peso[i], tabla.alto[i] = guardado[2:]
+                    tabla.estado[i] = EN_CACHE
+                    continue
+                aislado = en_cuarentena.get(ruta)
+                if aislado is not None and tuple(aislado[:2]) == firma:
+                    if not self.reintentar_cuarentena:
+                        self._problema(ruta, os.path.basename(ruta),
+                                       f"En cuarentena: {aislado[2]}")
+                        tabla.estado[i] = PROBLEMA
+                        omitidos += 1
+                        continue
+                if aislado is not None:
+                    aislados.add(i)
+        acertados = int(np.count_nonzero(tabla.estado == EN_CACHE))
+        procesados = total - int(np.count_nonzero(tabla.estado == PENDIENTE))
+        metricas.aciertos_cache = acertados
+        metricas.cuarentena = omitidos
+        metricas.sumar('cache', time.perf_counter() - inicio_cache)
+        inicio_sondeo = time.perf_counter()
+        if acertados:
+            self.al_log(f"{acertados} archivos sin cambios recuperados de la caché.\n")
+        if omitidos:
+            self.al_log(f"{omitidos} archivos en cuarentena omitidos"
+                        " (reintentar la cuarentena para volver a sondearlos).\n")
+        if procesados:
+            self.al_progreso(procesados, total)
+
+        executor = self._crear_executor()
+        limite_sondeo = TimeoutAdaptativo()
+        # Los pendientes se recorren sobre la columna de estado, sin copiar una lista
+        cola = zip(itertools.count(procesados + 1), tabla.indices(PENDIENTE))
+        reenviar = []     # (idx, i) en vuelo cuando hubo que matar el pool de procesos
+        pendientes = {}   # future -> (idx, i, ruta)
+        inicios = {}      # future -> instante en que empezó a ejecutarse
+        limites = {}      # future -> segundos que se le conceden
+        abandonados = 0   # hilos que superaron el timeout y siguen ocupando un worker
+        cola_agotada = False
+        fallidos = []     # (ruta, tamano, mtime_ns, motivo) que pasan a la cuarentena
+
+        def fallo(i, ruta, motivo, a_cuarentena=True):
+            tabla.estado[i] = PROBLEMA
+            tamano, mtime = int(tabla.tamano[i]), int(tabla.mtime[i])
+            self._problema(ruta, os.path.basename(ruta), motivo)
+            sesion.anotar_error(ruta, tamano, mtime, motivo)
+            if a_cuarentena and tamano >= 0:
+                fallidos.append((ruta, tamano, mtime, motivo))
+
+        while not self.detenido:
+            # Rellenar el pool hasta tener `workers` sondeos en vuelo
+            while not cola_agotada and len(pendientes) < self.workers:
+                siguiente = reenviar.pop() if reenviar else next(cola, None)
+                if siguiente is None:
+                    cola_agotada = True
+                    break
+                idx, i = siguiente
+                ruta = tabla.ruta(i)
+                carpetita = os.path.basename(tabla.carpeta(i))
+                self.al_log(f"Analizando archivo: {idx}\n{carpetita} - {tabla.nombre(i)}\n")
+                try:
+                    future = executor.submit(self.sondeador, ruta)
+                except RuntimeError:
+                    # El executor se cerró (Parar o cierre de la ventana)
+                    cola_agotada = True
+                    break
+                pendientes[future] = (idx, i, ruta)
+                limites[future] = limite_sondeo.para(max(0, int(tabla.tamano[i])))
+                self._futuros.add(future)
+
+            if not pendientes:
+                break
+
+            hechos, _ = wait(pendientes, timeout=0.5, return_when=FIRST_COMPLETED)
+            ahora = time.monotonic()
+            terminados = []
+            atascados = 0
+
+            # Aplicar el timeout por archivo desde que el sondeo empieza a ejecutarse
+            for future in list(pendientes):
+                if future in hechos:
+                    continue
+                if future.running():
+                    inicios.setdefault(future, ahora)
+                if future in inicios and ahora - inicios[future] > limites[future]:
+                    _idx, i, ruta = pendientes.pop(future)
+                    motivo = f"Timeout >{limites.pop(future):.0f}s"
+                    inicios.pop(future, None)
+                    future.cancel()
+                    atascados += 1
+                    metricas.timeouts += 1
+                    fallo(i, ruta, motivo)
+                    self.al_log(f"{motivo} en {os.path.basename(ruta)},"
+                                " registro problemático.\n")
+                    terminados.append(future)
+
+            for future in hechos:
+                _idx, i, ruta = pendientes.pop(future)
+                inicios.pop(future, None)
+                limites.pop(future, None)
+                terminados.append(future)
+                try:
+                    duracion, peso, alto, segundos = future.result()
+                    metricas.anotar_sondeo(ruta, segundos)
+                    limite_sondeo.anotar(segundos)
+                    tabla.duracion[i], tabla.peso[i], tabla.alto[i] = duracion, peso, alto
+                    tabla.estado[i] = SONDEADO
+                    if tabla.tamano[i] >= 0:
+                        sesion.anotar_sondeo(ruta, int(tabla.tamano[i]), int(tabla.mtime[i]),
+                                             duracion, peso, alto)
+                except CancelledError:
+                    # Cuando se cancela la tarea, continuar sin marcar como problema
+                    self.al_log(f"Análisis cancelado para {os.path.basename(ruta)}.\n")
+                except (OSError, ValueError, BrokenProcessPool) as e:
+                    parent_basename = os.path.basename(os.path.dirname(ruta)).lower()
+                    err_msg = str(e)
+                    metricas.errores += 1
+                    self.al_log(err_msg + "\n")
+                    # Un pool roto no dice nada del archivo: no se pone en cuarentena
+                    fallo(i, ruta, err_msg, not isinstance(e, BrokenProcessPool))
+                    if parent_basename == "errores":
+                        print(f"Archivo ya en 'errores', no se mueve: {ruta}")
+
+            for future in terminados:
+                self._futuros.discard(future)
+                procesados += 1
+                self.al_progreso(procesados, total)
+
+            if atascados and self.modo == "procesos":
+                # Un lector bloqueado seguiría gastando CPU: matar los procesos del pool y
+                # reenviar a uno nuevo lo que tenían en vuelo los demás
+                matar_procesos_executor(executor)
+                self._cerrar_executor(wait=False)
+                reenviar.extend((idx, i) for idx, i, _ruta in pendientes.values())
+                pendientes.clear()
+                inicios.clear()
+                limites.clear()
+                cola_agotada = False
+                if not self.detenido:
+                    executor = self._crear_executor()
+                    self.al_log(f"Reiniciado el pool de procesos; {len(reenviar)} sondeos"
+                                " en curso se reenvían.\n")
+            else:
+                abandonados += atascados
+
+        # No esperar a los sondeos abandonados por timeout: podrían no terminar nunca
+        self._cerrar_executor(wait=not abandonados)
+        metricas.sumar('sondeo', time.perf_counter() - inicio_sondeo)
+
+        # Persistir los sondeos nuevos y la cuarentena y olvidar los archivos que ya no existen
+        with metricas.etapa('guardado'):
+            cache_sondeos.guardar(tabla.filas(SONDEADO),
+                                  (fila[0] for fila in tabla.filas(EN_CACHE)))
+            self.datos.cuarentena.actualizar(
+                fallidos, [tabla.ruta(i) for i in aislados if tabla.estado[i] == SONDEADO])
+            if not self.detenido:
+                cache_sondeos.podar(carpeta, tabla)
+                self.datos.cuarentena.podar(carpeta, tabla)
+                sesion.descartar()
+            else:
+                sesion.cerrar()  # Queda en disco para ofrecer reanudarlo
+
+        moved_counts = {}
+        if self.ordenar:
+            with metricas.etapa('ordenacion'):
+                moved_counts = self._ordenar_resultados(carpeta, tabla.tuplas_validas())
+        inicio_estadisticas = time.perf_counter()
+
+        # Calcular estadísticas por extensión
+        # Conteo total de archivos por extensión (todos los vídeos del recorrido)
+        counts_by_ext = tabla.contar_extensiones()
+
+        # Columnas NumPy con los resultados válidos: se construyen una vez por análisis
+        columnas = tabla.columnas()
+
+        # Calcular peso medio por minuto por extensión usando los resultados válidos
+        ratio_por_ext = columnas.ratio_por_extension()
+        avg_by_ext = {ext: ratio_por_ext.get(ext, 0.0) for ext in counts_by_ext}
+
+        estrellas_rating, pct_bien, bien_opt, mal_opt, categoria_rating = (
+            calcular_rating_optimizacion(columnas))
+        rating_info = {
+            'estrellas': estrellas_rating,
+            'pct_bien': pct_bien,
+            'bien_optimizados': bien_opt,
+            'mal_optimizados': mal_opt,
+            'categoria': categoria_rating
+        }
+        resumen_por_alto = columnas.resumen_por_alto()
+        metricas.sumar('estadisticas', time.perf_counter() - inicio_estadisticas)
+
+        # Registrar el análisis en los dos historiales que lee la interfaz; las métricas
+        # que se exportan con la entrada llegan hasta aquí
+        with metricas.etapa('historial'), self.datos.cerrojo:
+            self.datos.gestor_historial.registrar_analisis(
+                carpeta=carpeta,
+                counts_by_ext=counts_by_ext,
+                avg_by_ext=avg_by_ext,
+                total_archivos=len(columnas),
+                rating=rating_info,
+                metricas=metricas.resumen()
+            )
+            self.datos.gestor_analisis_historico.registrar_analisis(carpeta, columnas)
+
+        return {
+            'carpeta': carpeta,
+            'columnas': columnas,
+            'total_archivos': total,
+            'counts_by_ext': counts_by_ext,
+            'avg_by_ext': avg_by_ext,
+            'resumen_por_alto': resumen_por_alto,
+            'rating': rating_info,
+            'movidos': moved_counts,
+            'problemas': list(self.problemas),
+            'detenido': self.detenido,
+            'tiempo': time.time() - tiempo_inicio,
+            'metricas': metricas.resumen(),
+        }
+
+    def _ordenar_resultados(self, carpeta, resultados):
+        """Mueve a 'optimizar' o 'review' (en un solo lote) los vídeos que cumplen la
+        condición y devuelve cuántos fueron a cada sitio"""
+        moved_counts = {'optimizar': 0, 'review': 0, 'errores': 0}
+        plan = planificar_ordenacion(resultados)
+        hechos, fallidos = ejecutar_plan_movimientos(
+            self.datos, plan, f"Ordenación tras analizar {carpeta}", self.al_mover)
+        for _origen, _destino, etiqueta in hechos:
+            moved_counts[etiqueta] += 1
+        for origen, _destino, etiqueta, e in fallidos:
+            print(f"No se pudo mover {os.path.basename(origen)} a '{etiqueta}': {e}")
+        return moved_counts
+
+
+def texto_resumen(informe):
+    """Resumen legible de un informe de MotorAnalisis.analizar"""
+    rating = informe['rating']
+    estrellas = rating['estrellas']
+    representacion_estrellas = "★" * estrellas + "☆" * (5 - estrellas)
+    resumen_lines = []
+    resumen_lines.append("\nResumen del análisis:\n")
+    resumen_lines.append("="*80 + "\n")
+    resumen_lines.append(f"\nRATING DE OPTIMIZACIÓN: {representacion_estrellas} - "
+                         f"{rating['categoria']}\n")
+    resumen_lines.append(f"Archivos bien optimizados (10-100 MB/min): "
+                         f"{rating['bien_optimizados']} ({rating['pct_bien']:.1f}%)\n")
+    resumen_lines.append(f"Archivos mal optimizados (>100 MB/min): "
+                         f"{rating['mal_optimizados']} ({100-rating['pct_bien']:.1f}%)\n")
+    resumen_lines.append("="*80 + "\n")
+
+    resumen_lines.append("\nNúmero de archivos por extensión:\n")
+    for ext, cnt in sorted(informe['counts_by_ext'].items(), key=lambda x: x[0]):
+        resumen_lines.append(f"- {cnt} archivos {ext}\n")
+    resumen_lines.append("\nPeso medio por minuto por extensión:\n")
+    for ext, avg in sorted(informe['avg_by_ext'].items(), key=lambda x: x[0]):
+        resumen_lines.append(f"- {ext}: {avg:.2f} MB/min\n")
+
+    resumen_lines.append("\nPeso medio por minuto por alto de fotograma:\n")
+    resumen_por_alto = informe['resumen_por_alto']
+    for alto in sorted(resumen_por_alto.keys()):
+        datos = resumen_por_alto[alto]
+        resumen_lines.append(
+            f"- {alto}p: {datos['promedio']:.2f} MB/min ({datos['conteo']} archivos)\n"
+        )
+
+    if informe['movidos']:
+        resumen_lines.append("\nArchivos movidos durante el análisis:\n")
+        for k, v in informe['movidos'].items():
+            resumen_lines.append(f"- {v} archivos -> {k}\n")
+    return "".join(resumen_lines)
+
+
+# --- Línea de órdenes ---
+def _informe_serializable(informe, detalle=False):
+    """Informe sin objetos NumPy, listo para json.dump"""
+    salida = {clave: valor for clave, valor in informe.items() if clave != 'columnas'}
+    salida['resumen_por_alto'] = {str(alto): datos
+                                  for alto, datos in informe['resumen_por_alto'].items()}
+    salida['tiempo'] = round(informe['tiempo'], 3)
+    if detalle:
+        salida['videos'] = [dict(zip(('archivo', 'duracion_min', 'peso_mb', 'alto', 'ruta'),
+                                     fila))
+                            for fila in _filas_videos(informe)]
+    return salida
+
+
+def _filas_videos(informe):
+    """(archivo, duración, peso, alto, ruta) de cada vídeo válido del informe"""
+    columnas = informe['columnas']
+    carpetas = (columnas.carpetas.tolist() if columnas.carpetas is not None
+                else [informe['carpeta']] * len(columnas))
+    for (nombre, duracion, peso, alto), carpeta in zip(columnas, carpetas):
+        yield nombre, duracion, peso, alto, os.path.join(carpeta, nombre)
+
+
+def escribir_informes(informes, formato, salida, detalle=False):
+    """Vuelca los informes en `salida` como texto, JSON o CSV (un vídeo por fila)"""
+    if formato == "json":
+        json.dump([_informe_serializable(informe, detalle) for informe in informes],
+                  salida, indent=2, ensure_ascii=False)
+        salida.write("\n")
+    elif formato == "csv":
+        writer = csv.writer(salida)
+        writer.writerow(['Carpeta analizada', 'Ruta', 'Archivo', 'Duración (min)',
+                         'Peso (MB)', 'Alto', 'Ratio (MB/min)'])
+        for informe in informes:
+            for nombre, duracion, peso, alto, ruta in _filas_videos(informe):
+                writer.writerow([informe['carpeta'], ruta, nombre, f"{duracion:.2f}",
+                                 f"{peso:.2f}", alto, f"{peso / duracion:.2f}"])
+    else:
+        for informe in informes:
+            salida.write(f"\n{informe['carpeta']}\n")
+            salida.write(texto_resumen(informe))
+            salida.write("\n" + texto_metricas(informe['metricas']))
+            if informe['problemas']:
+                salida.write(f"\n{len(informe['problemas'])} vídeos problemáticos:\n")
+                for problema in informe['problemas']:
+                    salida.write(f"- {problema['ruta']}: {problema['motivo']}\n")
+
+
+def main(argv=None):
+    """Analiza una o varias carpetas sin interfaz y guarda el resultado en los mismos
+    historiales que lee analizer.py"""
+    parser = argparse.ArgumentParser(
+        description="Analiza los vídeos de una o varias carpetas sin interfaz gráfica.")
+    parser.add_argument("carpetas", nargs="+", help="Carpetas raíz a analizar")
+    parser.add_argument("-w", "--workers", type=int, default=WORKERS_POR_DEFECTO,
+                        help="Sondeos simultáneos por carpeta (por defecto: %(default)s)")
+    parser.add_argument("--modo", choices=MODOS_WORKERS, default=MODOS_WORKERS[0],
+                        help="Sondear con hilos o con procesos")
+    parser.add_argument("-p", "--paralelo", type=int, default=1,
+                        help="Carpetas analizadas a la vez, p. ej. una por disco")
+    parser.add_argument("-f", "--formato", choices=("texto", "json", "csv"), default="texto")
+    parser.add_argument("-o", "--salida", help="Archivo de salida (por defecto, la consola)")
+    parser.add_argument("--detalle", action="store_true",
+                        help="Incluir cada vídeo en la salida JSON")
+    parser.add_argument("--datos", default="",
+                        help="Carpeta de historiales y caché (por defecto, la de trabajo,"
+                             " igual que la interfaz)")
+    parser.add_argument("--reanudar", action="store_true",
+                        help="Continuar los análisis que quedaron sin terminar")
+    parser.add_argument("--reintentar-cuarentena", action="store_true",
+                        help="Volver a sondear los archivos que dieron timeout o error"
+                             " en análisis anteriores")
+    parser.add_argument("--sin-mover", action="store_true",
+                        help="No ordenar los vídeos en optimizar/review ni vaciar xcut")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Mostrar el progreso de cada archivo")
+    args = parser.parse_args(argv)
+
+    carpetas = [os.path.abspath(carpeta) for carpeta in args.carpetas]
+    for carpeta in carpetas:
+        if not os.path.isdir(carpeta):
+            parser.error(f"no es una carpeta: {carpeta}")
+
+    if args.datos:
+        os.makedirs(args.datos, exist_ok=True)
+    datos = DatosAnalizador(args.datos)
+    motores = []
+
+    def analizar(carpeta):
+        nombre = os.path.basename(carpeta) or carpeta
+        motor = MotorAnalisis(
+            datos, args.workers, args.modo, ordenar=not args.sin_mover,
+            reintentar_cuarentena=args.reintentar_cuarentena,
+            al_log=((lambda mensaje: print(f"[{nombre}] {mensaje.strip()}", file=sys.stderr))
+                    if args.verbose else None),
+            al_empezar=lambda total: print(f"[{nombre}] {total} vídeos encontrados",
+                                           file=sys.stderr))
+        motores.append(motor)
+        informe = motor.analizar(carpeta, args.reanudar)
+        print(f"[{nombre}] {len(informe['columnas'])} vídeos válidos,"
+              f" {len(informe['problemas'])} problemáticos, {informe['tiempo']:.1f} s",
+              file=sys.stderr)
+        return informe
+
+    interrumpido = False
+    with ThreadPoolExecutor(max_workers=max(1, args.paralelo)) as executor:
+        futuros = [executor.submit(analizar, carpeta) for carpeta in carpetas]
+        try:
+            informes = [future.result() for future in futuros]
+        except KeyboardInterrupt:
+            # Detener todo: lo sondeado se guarda y las sesiones quedan para --reanudar
+            interrumpido = True
+            for future in futuros:
+                future.cancel()
+            for motor in motores:
+                motor.parar()
+            informes = [future.result() for future in futuros if not future.cancelled()]
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8", newline="") as salida:
+            escribir_informes(informes, args.formato, salida, args.detalle)
+    else:
+        escribir_informes(informes, args.formato, sys.stdout, args.detalle)
+    return 130 if interrumpido else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,13 @@ import os
 import sqlite3
 from pathlib import Path
 from datetime import datetime
+import hashlib
+import io
 import math
+import mmap
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image, ImageTk
 import threading
 from version import get_version
@@ -67,9 +73,60 @@ SIDEBAR_FG = '#ecf0f1'
 ACCENT_COLOR = '#3498db'
 HOVER_COLOR = '#2980b9'
 
+# Videos por transacción al guardar duraciones y miniaturas en lote
+DB_BATCH_SIZE = 200
+
+# Tamaño (3:2) y calidad JPEG de la miniatura principal de cada video
+THUMBNAIL_SIZE = (300, 200)
+THUMBNAIL_QUALITY = 85
+# Miniaturas ya convertidas a PhotoImage que se mantienen en memoria
+THUMBNAIL_CACHE_ITEMS = 200
+# Guardar las miniaturas nuevas en packs (True) o como un JPEG por miniatura (False)
+USE_THUMBNAIL_PACKS = False
+PACK_PREFIX = 'pack:'
+PACK_MAX_BYTES = 64 * 1024 * 1024  # Tamaño a partir del cual se empieza un pack nuevo
+PACK_COMPACT_RATIO = 0.5  # Fracción de espacio muerto que dispara la compactación
+
+# Lista virtual de videos: filas extra que se leen por encima y por debajo de la ventana
+# visible y filas que se muestran antes de conocer la altura real del widget
+LIST_MARGIN_ROWS = 100
+LIST_DEFAULT_ROWS = 25
+LIST_WHEEL_ROWS = 3
+# Pausa tras la última tecla antes de aplicar la búsqueda: un recuento por búsqueda, no por tecla
+LIST_SEARCH_DELAY_MS = 250
+
+# Importación en segundo plano: hilos que sondean videos y cada cuánto se refresca la UI
+IMPORT_WORKERS = max(2, min(8, os.cpu_count() or 2))
+IMPORT_POLL_MS = 200
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'}
+
 class VideoDatabase:
     """Gestiona la base de datos de videos"""
 
+    # Lista blanca de columnas permitidas para actualizar
+    ALLOWED_COLUMNS = {
+        'filepath', 'filename', 'category', 'tags', 'rating', 'duration', 'notes',
+        'thumbnail_path'}
+
+    # Expresión SQL de ordenación de cada columna de la lista (lista blanca)
+    SORT_COLUMNS = {
+        '#0': 'id',
+        'filename': 'filename COLLATE NOCASE',
+        'duration': 'COALESCE(duration, 0)',
+        'category': "COALESCE(category, 'public') COLLATE NOCASE",
+        'rating': 'COALESCE(rating, 0)',
+        'added_date': 'added_date',
+    }
+
+    # WAL permite leer mientras se escribe y, con synchronous=NORMAL, cada commit
+    # ya no fuerza un fsync del archivo principal
+    PRAGMAS = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA cache_size=-16000',  # ~16 MB de caché de páginas
+    )
+
     def __init__(self, db_path='videos.db'):
         self.db_path = db_path
         self.conn = None
@@ -79,6 +136,11 @@ class VideoDatabase:
         """Inicializa la base de datos y crea las tablas"""
         self.conn = sqlite3.connect(self.db_path)
         cursor = self.conn.cursor()
+        for pragma in self.PRAGMAS:
+            try:
+                cursor.execute(pragma)
+            except sqlite3.Error as e:
+                print(f"No se pudo aplicar {pragma}: {e}")
 
         # Tabla de videos
         cursor.execute('''
@@ -104,6 +166,17 @@ class VideoDatabase:
         if 'thumbnail_path' not in columns:
             cursor.execute('ALTER TABLE videos ADD COLUMN thumbnail_path TEXT')
 
+        # Índices para las ordenaciones de la lista (ver SORT_COLUMNS): las páginas se
+        # leen recorriendo el índice en lugar de ordenar toda la tabla en cada consulta
+        for index_name, expression in (
+                ('idx_videos_added', 'added_date'),
+                ('idx_videos_filename', 'filename COLLATE NOCASE'),
+                ('idx_videos_duration', 'COALESCE(duration, 0)'),
+                ('idx_videos_category', "COALESCE(category, 'public') COLLATE NOCASE"),
+                ('idx_videos_rating', 'COALESCE(rating, 0)')):
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {index_name} '
+                           f'ON videos ({expression}, id)')
+
         # Tabla de categorías
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS categories (
@@ -146,11 +219,37 @@ class VideoDatabase:
         except sqlite3.IntegrityError:
             return None  # Video ya existe
 
-    def get_all_videos(self, category=None, search_term=None):
-        """Obtiene todos los videos, opcionalmente filtrados"""
+    def add_videos(self, filepaths, category='public', tags=''):
+        """Añade muchos videos en una sola transacción (los existentes se ignoran).
+
+        Devuelve una lista de (id, filepath) con los videos nuevos.
+        """
+        added_date = datetime.now().isoformat()
+        rows = [(filepath, os.path.basename(filepath), category, tags, added_date)
+                for filepath in filepaths]
+        if not rows:
+            return []
         cursor = self.conn.cursor()
+        try:
+            with self.conn:
+                # Los ids AUTOINCREMENT crecen siempre: lo nuevo queda por encima del máximo
+                cursor.execute('SELECT COALESCE(MAX(id), 0) FROM videos')
+                last_id = cursor.fetchone()[0]
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO videos (filepath, filename, category, tags, added_date)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', rows)
+                cursor.execute('SELECT id, filepath FROM videos WHERE id > ? ORDER BY id',
+                               (last_id,))
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Database error in add_videos: {e}")
+            return []
 
-        query = 'SELECT * FROM videos WHERE 1=1'
+    @staticmethod
+    def _filter_clause(category, search_term):
+        """Devuelve (condición WHERE, parámetros) para la categoría y la búsqueda"""
+        query = 'WHERE 1=1'
         params = []
 
         if category and category != 'Todos':
@@ -161,12 +260,61 @@ class VideoDatabase:
             query += ' AND (filename LIKE ? OR tags LIKE ? OR notes LIKE ?)'
             search_pattern = f'%{search_term}%'
             params.extend([search_pattern, search_pattern, search_pattern])
+        return query, params
 
-        query += ' ORDER BY added_date DESC'
-
-        cursor.execute(query, params)
+    def get_all_videos(self, category=None, search_term=None):
+        """Obtiene todos los videos, opcionalmente filtrados"""
+        cursor = self.conn.cursor()
+        where, params = self._filter_clause(category, search_term)
+        cursor.execute(f'SELECT * FROM videos {where} ORDER BY added_date DESC', params)
         return cursor.fetchall()
 
+    def count_videos(self, category=None, search_term=None):
+        """Número de videos que cumplen el filtro"""
+        cursor = self.conn.cursor()
+        where, params = self._filter_clause(category, search_term)
+        cursor.execute(f'SELECT COUNT(*) FROM videos {where}', params)
+        return cursor.fetchone()[0]
+
+    def get_videos_page(self, category=None, search_term=None, order_by='added_date',
+                        ascending=False, limit=100, offset=0, after_id=None, before_id=None):
+        """Obtiene `limit` videos filtrados a partir de `offset`, ordenados en SQL por la
+        columna `order_by` de la lista (o added_date).
+
+        Con `after_id` (o `before_id`) la página empieza justo detrás (o acaba justo
+        delante) de ese video: se busca su clave (columna, id) en el índice en lugar de
+        recorrer y descartar `offset` filas. Devuelve None si el video ya no existe o
+        no tiene clave con la que buscar."""
+        cursor = self.conn.cursor()
+        where, params = self._filter_clause(category, search_term)
+        column = self.SORT_COLUMNS.get(order_by, 'added_date')
+        anchor = after_id if after_id is not None else before_id
+        # Hacia atrás se recorre el orden inverso y se da la vuelta al resultado
+        forward = before_id is None
+        direction_asc = ascending == forward
+        if anchor is not None:
+            cursor.execute(f'SELECT {column} FROM videos WHERE id = ?', (anchor,))
+            key = cursor.fetchone()
+            if key is None or key[0] is None:
+                return None
+            op = '>' if direction_asc else '<'
+            # Forma expandida de ({column}, id) {op} (?, ?) para que SQLite busque en el índice
+            where += f' AND {column} {op}= ? AND ({column} {op} ? OR id {op} ?)'
+            params += [key[0], key[0], anchor]
+            offset = 0
+        direction = 'ASC' if direction_asc else 'DESC'
+        cursor.execute(f'SELECT * FROM videos {where} '
+                       f'ORDER BY {column} {direction}, id {direction} LIMIT ? OFFSET ?',
+                       params + [limit, offset])
+        rows = cursor.fetchall()
+        return rows if forward else rows[::-1]
+
+    def get_video(self, video_id):
+        """Obtiene un video por id (o None)"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM videos WHERE id = ?', (video_id,))
+        return cursor.fetchone()
+
     def get_categories(self):
         """Obtiene todas las categorías predefinidas"""
         cursor = self.conn.cursor()
@@ -180,13 +328,8 @@ class VideoDatabase:
 
         cursor = self.conn.cursor()
 
-        # Lista blanca de columnas permitidas para actualizar
-        allowed_columns = {
-            'filepath', 'filename', 'category', 'tags', 'rating', 'duration', 'notes',
-            'thumbnail_path'}
-
         # Filtrar solo claves válidas
-        safe_kwargs = {k: v for k, v in kwargs.items() if k in allowed_columns}
+        safe_kwargs = {k: v for k, v in kwargs.items() if k in self.ALLOWED_COLUMNS}
         if not safe_kwargs:
             return  # No hay campos válidos para actualizar
         set_clause = ', '.join([f'{key} = ?' for key in safe_kwargs.keys()])
@@ -201,6 +344,50 @@ class VideoDatabase:
             # Log database-specific errors for debugging without crashing the UI
             print(f"Database commit error in update_video: {e}")
 
+    def update_videos(self, updates):
+        """Actualiza muchos videos en una sola transacción.
+
+        `updates` es un iterable de (video_id, {columna: valor}); las filas con las mismas
+        columnas se envían juntas con executemany.
+        """
+        groups = {}
+        for video_id, values in updates:
+            safe_values = {k: v for k, v in values.items() if k in self.ALLOWED_COLUMNS}
+            if safe_values:
+                columns = tuple(sorted(safe_values))
+                groups.setdefault(columns, []).append(
+                    [safe_values[c] for c in columns] + [video_id])
+        if not groups:
+            return
+        try:
+            with self.conn:
+                for columns, rows in groups.items():
+                    set_clause = ', '.join([f'{key} = ?' for key in columns])
+                    self.conn.executemany(f'UPDATE videos SET {set_clause} WHERE id = ?', rows)
+        except sqlite3.Error as e:
+            print(f"Database error in update_videos: {e}")
+
+
+    def get_packed_thumbnails(self, conn=None):
+        """Devuelve [(id, referencia)] de los videos con la miniatura en un pack.
+        Desde otro hilo hay que pasar una conexión propia en `conn`."""
+        cursor = (conn or self.conn).cursor()
+        cursor.execute('SELECT id, thumbnail_path FROM videos WHERE thumbnail_path LIKE ?',
+                       (PACK_PREFIX + '%',))
+        return cursor.fetchall()
+
+    def replace_thumbnail_paths(self, replacements):
+        """Cambia thumbnail_path de cada (id, valor viejo, valor nuevo) solo si no ha cambiado
+        entretanto"""
+        if not replacements:
+            return
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    'UPDATE videos SET thumbnail_path = ? WHERE id = ? AND thumbnail_path = ?',
+                    [(new, video_id, old) for video_id, old, new in replacements])
+        except sqlite3.Error as e:
+            print(f"Database error in replace_thumbnail_paths: {e}")
 
     def delete_video(self, video_id):
         """Elimina un video de la base de datos"""
@@ -225,6 +412,354 @@ class VideoDatabase:
             self.conn.close()
 
 
+def crop_to_thumbnail(img, size=THUMBNAIL_SIZE):
+    """Recorta la imagen PIL al centro con la relación de aspecto de `size` y la
+    redimensiona a ese tamaño"""
+    target_aspect = size[0] / size[1]
+    width, height = img.size
+    current_aspect = width / height if height else 1
+
+    if current_aspect > target_aspect:
+        # imagen demasiado ancha -> recortar ancho
+        new_width = int(target_aspect * height)
+        left = (width - new_width) // 2
+        img = img.crop((left, 0, left + new_width, height))
+    else:
+        # imagen demasiado alta -> recortar alto
+        new_height = int(width / target_aspect)
+        top = (height - new_height) // 2
+        img = img.crop((0, top, width, top + new_height))
+    return img.resize(size, Image.Resampling.LANCZOS)
+
+
+class ThumbnailPackStore:
+    """Miniaturas añadidas a archivos grandes (packs) en lugar de un JPEG por video.
+
+    Cada miniatura se referencia como 'pack:<n>:<offset>:<longitud>' en la columna
+    thumbnail_path, que hace de índice, y leerla es un único slice de un mmap del pack.
+    Los packs rotan al superar PACK_MAX_BYTES; el espacio de las miniaturas de videos
+    borrados o regenerados se recupera con compact().
+    """
+
+    def __init__(self, pack_dir, max_bytes=PACK_MAX_BYTES):
+        self.pack_dir = Path(pack_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()  # Serializa escrituras y compactación
+        self._maps = {}  # número de pack -> mmap (solo desde el hilo de Tk)
+        numbers = self.pack_numbers()
+        self._current = numbers[-1] if numbers else 1
+
+    @staticmethod
+    def is_ref(path):
+        """True si `path` es una referencia a un pack y no una ruta de archivo"""
+        return isinstance(path, str) and path.startswith(PACK_PREFIX)
+
+    @staticmethod
+    def parse_ref(ref):
+        """Devuelve (número de pack, offset, longitud) de una referencia"""
+        _prefix, number, offset, length = ref.split(':')
+        return int(number), int(offset), int(length)
+
+    def pack_path(self, number):
+        return self.pack_dir / f"pack_{number:05d}.bin"
+
+    def pack_numbers(self):
+        """Números de los packs existentes, en orden"""
+        if not self.pack_dir.is_dir():
+            return []
+        return sorted(int(path.stem[5:]) for path in self.pack_dir.glob('pack_*.bin'))
+
+    def append(self, data):
+        """Añade los bytes al pack actual y devuelve su referencia"""
+        with self._lock:
+            return self._append_locked(data)
+
+    def _append_locked(self, data):
+        self.pack_dir.mkdir(parents=True, exist_ok=True)
+        path = self.pack_path(self._current)
+        if path.exists() and path.stat().st_size + len(data) > self.max_bytes:
+            self._current += 1
+            path = self.pack_path(self._current)
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+        return f"{PACK_PREFIX}{self._current}:{offset}:{len(data)}"
+
+    def read(self, ref):
+        """Bytes de la miniatura o None si no existe (solo desde el hilo de Tk)"""
+        try:
+            number, offset, length = self.parse_ref(ref)
+        except ValueError:
+            return None
+        pack = self._maps.get(number)
+        if pack is None or offset + length > len(pack):
+            # Primer acceso o el pack ha crecido desde que se mapeó
+            if pack is not None:
+                pack.close()
+            self._maps.pop(number, None)
+            try:
+                with open(self.pack_path(number), 'rb') as f:
+                    pack = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return None  # ValueError: pack vacío
+            self._maps[number] = pack
+        if offset + length > len(pack):
+            return None
+        return pack[offset:offset + length]
+
+    def exists(self, ref):
+        """True si la referencia apunta a datos presentes en su pack"""
+        try:
+            number, offset, length = self.parse_ref(ref)
+            return self.pack_path(number).stat().st_size >= offset + length
+        except (OSError, ValueError):
+            return False
+
+    def garbage_ratio(self, live_refs):
+        """Fracción de los bytes de los packs que no usa ninguna de `live_refs`"""
+        total = 0
+        for number in self.pack_numbers():
+            try:
+                total += self.pack_path(number).stat().st_size
+            except OSError:
+                pass
+        if not total:
+            return 0.0
+        live = 0
+        for ref in set(live_refs):
+            try:
+                live += self.parse_ref(ref)[2]
+            except ValueError:
+                pass
+        return max(0.0, 1.0 - live / total)
+
+    def compact(self, load_live_refs):
+        """Copia las miniaturas vivas a packs nuevos.
+
+        `load_live_refs()` se llama con el lock tomado, así que ninguna miniatura nueva
+        puede acabar en un pack viejo sin estar entre las referencias copiadas. Devuelve
+        ({referencia vieja: nueva}, packs viejos): solo los que había hasta el pack en uso
+        al empezar, que se borran con remove_packs() cuando la base de datos ya apunta a
+        las referencias nuevas.
+        """
+        moved = {}
+        with self._lock:
+            numbers = self.pack_numbers()
+            old_numbers = [n for n in numbers if n <= self._current]
+            self._current = max([self._current] + numbers) + 1
+            files = {}
+            try:
+                # Leer en orden de pack y offset para que la lectura sea secuencial
+                parsed = []
+                for ref in set(load_live_refs()):
+                    try:
+                        parsed.append((self.parse_ref(ref), ref))
+                    except ValueError:
+                        pass
+                for (number, offset, length), ref in sorted(parsed):
+                    f = files.get(number)
+                    if f is None:
+                        try:
+                            f = files[number] = open(self.pack_path(number), 'rb')
+                        except OSError:
+                            continue
+                    f.seek(offset)
+                    data = f.read(length)
+                    if len(data) == length:
+                        moved[ref] = self._append_locked(data)
+            finally:
+                for f in files.values():
+                    f.close()
+        return moved, old_numbers
+
+    def remove_packs(self, numbers):
+        """Borra los packs indicados (solo desde el hilo de Tk)"""
+        for number in numbers:
+            pack = self._maps.pop(number, None)
+            if pack is not None:
+                pack.close()
+            try:
+                self.pack_path(number).unlink()
+            except OSError as e:
+                print(f"No se pudo borrar el pack de miniaturas {number}: {e}")
+
+
+class ThumbnailCache:
+    """Miniaturas en disco direccionadas por contenido y LRU en memoria de PhotoImage.
+
+    En disco cada JPEG se guarda ya al tamaño de visualización como
+    <dir>/<2 primeros hex>/<sha1 del JPEG>.jpg, así que cargarlo no necesita recortar ni
+    redimensionar; con use_packs se añade en cambio a un ThumbnailPackStore. En memoria
+    se guardan las últimas `max_items` PhotoImage por (id del video, mtime del archivo
+    de video, ruta de la miniatura).
+    """
+
+    def __init__(self, base_dir, max_items=THUMBNAIL_CACHE_ITEMS, use_packs=False):
+        self.base_dir = Path(base_dir)
+        self.max_items = max_items
+        self.use_packs = use_packs
+        # Siempre disponible para leer referencias guardadas con packs activados
+        self.packs = ThumbnailPackStore(self.base_dir / 'packs')
+        self._photos = OrderedDict()
+
+    def exists(self, thumbnail_path):
+        """True si la miniatura (archivo o referencia a un pack) sigue disponible"""
+        if ThumbnailPackStore.is_ref(thumbnail_path):
+            return self.packs.exists(thumbnail_path)
+        return bool(thumbnail_path) and os.path.exists(thumbnail_path)
+
+    def store(self, data, allow_packs=True):
+        """Guarda los bytes JPEG y devuelve su ruta absoluta o su referencia en un pack.
+        Con allow_packs=False (p. ej. durante una compactación) se guarda como archivo."""
+        if self.use_packs and allow_packs:
+            return self.packs.append(data)
+        digest = hashlib.sha1(data).hexdigest()
+        path = self.base_dir / digest[:2] / f"{digest}.jpg"
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Escribir aparte y renombrar: un lector nunca ve un JPEG a medias
+            tmp_path = path.with_name(f"{digest}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        return str(path.resolve())
+
+    def get_photo(self, video_id, video_path, thumbnail_path):
+        """Devuelve la PhotoImage de la miniatura (solo desde el hilo de Tk) o None"""
+        try:
+            mtime = os.stat(video_path).st_mtime_ns
+        except (OSError, TypeError, ValueError):
+            mtime = 0
+        key = (video_id, mtime, thumbnail_path)
+        photo = self._photos.get(key)
+        if photo is not None:
+            self._photos.move_to_end(key)
+            return photo
+
+        try:
+            source = thumbnail_path
+            if ThumbnailPackStore.is_ref(thumbnail_path):
+                data = self.packs.read(thumbnail_path)
+                if data is None:
+                    return None
+                source = io.BytesIO(data)
+            with Image.open(source) as img:
+                img.load()
+                if img.size != THUMBNAIL_SIZE:
+                    # Miniaturas antiguas (thumb_<id>.jpg) sin el tamaño final
+                    img = crop_to_thumbnail(img)
+                photo = ImageTk.PhotoImage(img)
+        except (OSError, ValueError, tk.TclError) as e:
+            print(f"Error cargando miniatura: {e}")
+            return None
+
+        self._photos[key] = photo
+        if len(self._photos) > self.max_items:
+            self._photos.popitem(last=False)
+        return photo
+
+    def clear(self):
+        """Vacía la caché en memoria"""
+        self._photos.clear()
+
+
+class VideoListModel:
+    """Lista virtual de videos para la Treeview.
+
+    Solo se leen de la base de datos las filas de la ventana visible más LIST_MARGIN_ROWS
+    por cada lado, con consultas paginadas; el filtro y el orden se resuelven en SQL, de
+    modo que desplazarse, ordenar o filtrar cuesta en proporción a la ventana y no a la
+    biblioteca. Al desplazarse junto al bloque cargado se sigue desde su primera o última
+    fila por el índice (keyset); OFFSET solo se usa para los saltos lejanos.
+    """
+
+    def __init__(self, db, margin=LIST_MARGIN_ROWS):
+        self.db = db
+        self.margin = margin
+        self.category = None
+        self.search_term = None
+        self.order_by = 'added_date'
+        self.ascending = False
+        self.offset = 0  # Índice de la primera fila visible
+        self.total = 0
+        self.selected_id = None
+        self._block_start = 0
+        self._block = []
+        self._total_stale = True
+
+    def set_filter(self, category, search_term):
+        """Aplica el filtro; recuenta solo si el filtro cambió o se invalidaron los datos
+        y vuelve al principio solo si el filtro cambió"""
+        if (category, search_term) != (self.category, self.search_term):
+            self.category, self.search_term = category, search_term
+            self.offset = 0
+            self._total_stale = True
+            self._drop_block()
+        if self._total_stale:
+            self.total = self.db.count_videos(self.category, self.search_term)
+            self._total_stale = False
+
+    def set_order(self, order_by, ascending):
+        """Cambia el orden y vuelve al principio de la lista"""
+        self.order_by, self.ascending = order_by, ascending
+        self.offset = 0
+        self._drop_block()
+
+    def invalidate(self):
+        """Descarta las filas leídas y el recuento (p. ej. tras cambiar datos en la base
+        de datos); el recuento se rehace en el siguiente set_filter"""
+        self._drop_block()
+        self._total_stale = True
+
+    def _drop_block(self):
+        self._block_start = 0
+        self._block = []
+
+    def clamp(self, offset, visible):
+        """Limita `offset` para que la ventana de `visible` filas no pase del final"""
+        return max(0, min(offset, self.total - visible))
+
+    def rows(self, offset, count):
+        """Filas [offset, offset + count) del resultado, leyendo un bloque con margen si
+        no están ya en memoria"""
+        end = min(self.total, offset + count)
+        block_end = self._block_start + len(self._block)
+        if offset < self._block_start or end > block_end:
+            if not (self._block and self._extend_block(offset, end, block_end)):
+                start = max(0, offset - self.margin)
+                self._block = self._page(limit=end - start + self.margin, offset=start)
+                self._block_start = start
+        return self._block[offset - self._block_start:end - self._block_start]
+
+    def _page(self, **kwargs):
+        return self.db.get_videos_page(self.category, self.search_term, self.order_by,
+                                       self.ascending, **kwargs)
+
+    def _extend_block(self, offset, end, block_end):
+        """Amplía el bloque por el lado que toca la ventana buscando desde su primera o
+        última fila, y recorta el otro lado al margen. Devuelve False si la ventana no
+        toca el bloque o la búsqueda no trae las filas esperadas (p. ej. claves NULL):
+        entonces se relee con OFFSET"""
+        if self._block_start <= offset <= block_end < end:
+            wanted = min(self.total, end + self.margin) - block_end
+            rows = self._page(limit=wanted, after_id=self._block[-1][0])
+            if rows is None or len(rows) < wanted:
+                return False
+            keep_from = max(self._block_start, offset - self.margin)
+            self._block = self._block[keep_from - self._block_start:] + rows
+            self._block_start = keep_from
+            return True
+        if offset < self._block_start <= end <= block_end:
+            start = max(0, offset - self.margin)
+            wanted = self._block_start - start
+            rows = self._page(limit=wanted, before_id=self._block[0][0])
+            if rows is None or len(rows) < wanted:
+                return False
+            self._block = (rows + self._block)[:end + self.margin - start]
+            self._block_start = start
+            return True
+        return False
+
+
 class VideoManagerApp:
     """Aplicación principal de gestión de videos"""
 
@@ -237,6 +772,11 @@ class VideoManagerApp:
 
         # Base de datos
         self.db = VideoDatabase()
+        self.video_list = VideoListModel(self.db)
+        self.video_scrollbar = None
+        self._list_row_height = 20
+        self._list_visible_rows = 0
+        self._search_after_id = None
         self.search_var = None
         self.category_var = None
         self.category_combo = None
@@ -275,11 +815,26 @@ class VideoManagerApp:
         self._on_timeline_generation_complete_called = False
         self.timeline_pages = 0
         self.timeline_current_page = 0
+        # Importación de carpetas en segundo plano
+        self.library_toolbar = None
+        self.import_frame = None
+        self.import_label = None
+        self.import_progress = None
+        self._import_queue = None
+        self._import_cancel = threading.Event()
+        self._import_executor = None
+        self._import_running = False
+        self._import_total = 0
+        self._import_done = 0
+        self._import_found = 0
 
 
         # Directorio para miniaturas
         self.thumbnail_dir = Path('thumbnails')
         self.thumbnail_dir.mkdir(exist_ok=True)
+        self.thumbnail_cache = ThumbnailCache(self.thumbnail_dir,
+                                              use_packs=USE_THUMBNAIL_PACKS)
+        self._compacting = False
 
         # Reproductor VLC (con logging silenciado para evitar spam de errores)
         if VLC_AVAILABLE:
@@ -306,6 +861,9 @@ class VideoManagerApp:
         # Cargar videos
         self.refresh_video_list()
 
+        # Recuperar el espacio de miniaturas borradas en los packs (en segundo plano)
+        self.root.after(1000, self.compact_thumbnail_packs)
+
     def get_video_duration(self, filepath):
         """Obtiene la duración del video en segundos usando OpenCV"""
         try:
@@ -324,6 +882,52 @@ class VideoManagerApp:
             # ValueError, AttributeError, etc.)
             return 0
 
+    @staticmethod
+    def probe_video(filepath):
+        """Abre el video una sola vez y devuelve (duración, (ancho, alto), miniatura JPEG).
+
+        Lee fps y número de frames y hace un único salto al frame del medio; solo si ese
+        frame no se puede leer vuelve al principio. Cualquier dato que no se pueda obtener
+        queda como 0, (0, 0) o None.
+        """
+        duration, resolution, thumbnail = 0, (0, 0), None
+        try:
+            cap = cv2.VideoCapture(filepath)  # type: ignore
+            if not cap.isOpened():
+                return duration, resolution, thumbnail
+            try:
+                fps = cap.get(cv2.CAP_PROP_FPS)  # type: ignore
+                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))  # type: ignore
+                resolution = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),  # type: ignore
+                              int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))  # type: ignore
+                if fps and math.isfinite(fps) and fps > 0 and total_frames > 0:
+                    duration = int(total_frames / fps)
+
+                frame = None
+                if total_frames > 1:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, total_frames // 2)  # type: ignore
+                    ret, frame = cap.read()
+                    if not ret:
+                        frame = None
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)  # type: ignore
+                if frame is None:
+                    ret, frame = cap.read()
+                    if not ret:
+                        frame = None
+            finally:
+                cap.release()
+
+            if frame is not None:
+                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)  # type: ignore
+                img = crop_to_thumbnail(Image.fromarray(frame_rgb))
+                buffer = io.BytesIO()
+                img.save(buffer, "JPEG", quality=THUMBNAIL_QUALITY)
+                thumbnail = buffer.getvalue()
+        except Exception as e:
+            # Incluye errores de OpenCV y de PIL con archivos dañados
+            print(f"Error sondeando video: {e}")
+        return duration, resolution, thumbnail
+
     @staticmethod
     def format_duration(seconds):
         """Formatea la duración en segundos a formato HH:MM:SS o MM:SS"""
@@ -387,6 +991,7 @@ class VideoManagerApp:
         # Barra de herramientas
         toolbar = ttk.Frame(library_frame)
         toolbar.pack(side='top', fill='x', padx=5, pady=5)
+        self.library_toolbar = toolbar
 
         ttk.Button(toolbar, text="➕ Añadir Video",
                   command=self.add_video).pack(side='left', padx=2)
@@ -399,13 +1004,20 @@ class VideoManagerApp:
         ttk.Button(toolbar, text="⏱️ Duraciones",
                   command=self.calculate_all_durations).pack(side='left', padx=2)
 
+        # Progreso de la importación en segundo plano (se muestra solo mientras dura)
+        self.import_frame = ttk.Frame(library_frame)
+        self.import_label = ttk.Label(self.import_frame, text="", font=('Arial', 9))
+        self.import_label.pack(side='left', padx=5)
+        self.import_progress = ttk.Progressbar(self.import_frame, mode='determinate')
+        self.import_progress.pack(side='left', fill='x', expand=True, padx=5)
+
         # Búsqueda
         search_frame = ttk.Frame(library_frame)
         search_frame.pack(side='top', fill='x', padx=5, pady=5)
 
         ttk.Label(search_frame, text="Buscar:").pack(side='left')
         self.search_var = tk.StringVar()
-        self.search_var.trace('w', lambda *args: self.refresh_video_list())
+        self.search_var.trace('w', lambda *args: self._schedule_search())
         ttk.Entry(search_frame, textvariable=self.search_var).pack(side='left', fill='x',
                                                                    expand=True, padx=5)
 
@@ -424,16 +1036,19 @@ class VideoManagerApp:
         list_frame = ttk.Frame(library_frame)
         list_frame.pack(side='top', fill='both', expand=True, padx=5, pady=5)
 
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(list_frame)
-        scrollbar.pack(side='right', fill='y')
+        # Scrollbar (desplaza la ventana de la lista virtual, no la Treeview)
+        self.video_scrollbar = ttk.Scrollbar(list_frame, command=self._on_list_scrollbar)
+        self.video_scrollbar.pack(side='right', fill='y')
 
-        # Treeview
+        # Treeview: solo contiene las filas visibles (ver VideoListModel)
         self.video_tree = ttk.Treeview(list_frame, columns=('filename', 'duration',
                                                             'category', 'rating'),
-                                       show='tree headings', yscrollcommand=scrollbar.set)
+                                       show='tree headings')
         self.video_tree.pack(side='left', fill='both', expand=True)
-        scrollbar.config(command=self.video_tree.yview)
+        try:
+            self._list_row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        except (ValueError, tk.TclError):
+            self._list_row_height = 20
 
         # Columnas
         # Make headings clickable to sort columns
@@ -456,6 +1071,21 @@ class VideoManagerApp:
         # Eventos
         self.video_tree.bind('<Double-Button-1>', self.on_video_double_click)
         self.video_tree.bind('<<TreeviewSelect>>', self.on_video_select)
+        # Desplazamiento y navegación con teclado sobre la lista virtual
+        self.video_tree.bind('<Configure>', self._on_list_configure)
+        self.video_tree.bind('<MouseWheel>', self._on_list_mousewheel)
+        self.video_tree.bind('<Button-4>', self._on_list_mousewheel)
+        self.video_tree.bind('<Button-5>', self._on_list_mousewheel)
+        self.video_tree.bind('<Up>', lambda e: self._move_list_selection(-1))
+        self.video_tree.bind('<Down>', lambda e: self._move_list_selection(1))
+        self.video_tree.bind('<Prior>', lambda e: self._move_list_selection(
+            -self._visible_list_rows()))
+        self.video_tree.bind('<Next>', lambda e: self._move_list_selection(
+            self._visible_list_rows()))
+        self.video_tree.bind('<Home>', lambda e: self._move_list_selection(
+            -self.video_list.total))
+        self.video_tree.bind('<End>', lambda e: self._move_list_selection(
+            self.video_list.total))
 
         # Menú contextual
         self.context_menu = tk.Menu(self.video_tree, tearoff=0)
@@ -688,99 +1318,341 @@ class VideoManagerApp:
         if filepath:
             video_id = self.db.add_video(filepath)
             if video_id:
-                # Obtener y actualizar duración
-                duration = self.get_video_duration(filepath)
-                if duration > 0:
-                    self.db.update_video(video_id, duration=duration)
-
-                # Generar miniatura
-                self.generate_thumbnail(filepath, video_id)
+                # Duración y miniatura con una sola apertura del archivo
+                _video_id, values = self._probe_new_video(video_id, filepath)
+                self.db.update_video(video_id, **values)
                 messagebox.askokcancel("Éxito", f"Video añadido: {os.path.basename(filepath)}")
                 self.refresh_video_list()
             else:
                 messagebox.showwarning("Advertencia", "Este video ya está en la biblioteca")
 
     def add_folder(self):
-        """Añade todos los videos de una carpeta"""
+        """Añade todos los videos de una carpeta sin bloquear la interfaz.
+
+        La carpeta se recorre en un hilo, las rutas se insertan de golpe (los videos
+        aparecen en la lista enseguida) y un pool de hilos calcula duraciones y
+        miniaturas, que se guardan en lote a medida que terminan.
+        """
+        if self._import_running:
+            messagebox.showinfo("Info", "Ya hay una importación en curso")
+            return
+        if self._compacting:
+            messagebox.showinfo("Info", "Se están compactando las miniaturas, espera un momento")
+            return
+
         folder = filedialog.askdirectory(title="Seleccionar carpeta de videos")
 
         if folder:
-            video_extensions = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'}
+            self._import_running = True
+            self._show_import_status("Buscando videos...")
+            threading.Thread(target=self._scan_folder_worker, args=(folder,),
+                             daemon=True).start()
+
+    def _scan_folder_worker(self, folder):
+        """Recorre la carpeta en segundo plano y entrega las rutas al hilo principal"""
+        video_files = []
+        for root, _dirs, files in os.walk(folder):
+            for file in files:
+                if Path(file).suffix.lower() in VIDEO_EXTENSIONS:
+                    video_files.append(os.path.join(root, file))
+        try:
+            self.root.after(0, lambda: self._on_folder_scanned(video_files))
+        except (RuntimeError, tk.TclError):
+            pass  # La ventana ya se cerró
 
-            # Primero contar todos los videos
-            video_files = []
-            for root, _dirs, files in os.walk(folder):
-                for file in files:
-                    if Path(file).suffix.lower() in video_extensions:
-                        filepath = os.path.join(root, file)
-                        video_files.append(filepath)
+    def _on_folder_scanned(self, video_files):
+        """Inserta las rutas encontradas y arranca el sondeo en paralelo"""
+        total = len(video_files)
+        if total == 0:
+            self._finish_import()
+            messagebox.askokcancel("Info", "No se encontraron videos en la carpeta")
+            return
 
-            total = len(video_files)
+        # Primera etapa: todas las rutas en una transacción; los que ya existían se omiten
+        new_videos = self.db.add_videos(video_files)
+        self.refresh_video_list()
+        if not new_videos:
+            self._finish_import()
+            messagebox.askokcancel("Info", f"Los {total} videos ya estaban en la biblioteca")
+            return
 
-            if total == 0:
-                messagebox.askokcancel("Info", "No se encontraron videos en la carpeta")
-                return
+        # Segunda etapa: duración y miniatura de los nuevos en el pool de hilos
+        self._import_found = total
+        self._import_total = len(new_videos)
+        self._import_done = 0
+        self._import_queue = queue.Queue()
+        self._import_cancel.clear()
+        self.import_progress.config(maximum=self._import_total, value=0)
+        self._show_import_status(f"Procesando 0 / {self._import_total}")
+        threading.Thread(target=self._probe_videos_worker, args=(new_videos,),
+                         daemon=True).start()
+        self.root.after(IMPORT_POLL_MS, self._poll_import)
+
+    def _probe_new_video(self, video_id, filepath):
+        """Calcula duración y miniatura de un video abriéndolo una vez (en el pool)"""
+        values = {}
+        duration, _resolution, thumbnail = self.probe_video(filepath)
+        if duration > 0:
+            values['duration'] = duration
+        if thumbnail is not None:
+            thumbnail_path = self.save_thumbnail(video_id, thumbnail, update_db=False)
+            if thumbnail_path:
+                values['thumbnail_path'] = thumbnail_path
+        return video_id, values
+
+    def _probe_videos_worker(self, new_videos):
+        """Reparte los videos entre IMPORT_WORKERS hilos y encola cada resultado"""
+        executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS)
+        self._import_executor = executor
+        try:
+            futures = [executor.submit(self._probe_new_video, video_id, filepath)
+                       for video_id, filepath in new_videos]
+            for future in as_completed(futures):
+                if self._import_cancel.is_set():
+                    break
+                try:
+                    self._import_queue.put(future.result())
+                except Exception as e:
+                    print(f"Error procesando video: {e}")
+                    self._import_queue.put((None, {}))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._import_executor = None
+            self._import_queue.put(None)  # Marca de fin
+
+    def _poll_import(self):
+        """Guarda en lote los resultados listos y actualiza la lista y el progreso"""
+        updates = []
+        finished = False
+        try:
+            while True:
+                item = self._import_queue.get_nowait()
+                if item is None:
+                    finished = True
+                    break
+                updates.append(item)
+        except queue.Empty:
+            pass
 
-            # Crear ventana de progreso
-            progress_dialog = ProgressDialog(self.root, "Añadiendo Videos",
-                                            "Procesando videos de la carpeta...", total)
-            added_count = 0
-
-            for idx, filepath in enumerate(video_files, 1):
-                filename = os.path.basename(filepath)
-                video_id = self.db.add_video(filepath)
-                if video_id:
-                    # Obtener y actualizar duración
-                    duration = self.get_video_duration(filepath)
-                    if duration > 0:
-                        self.db.update_video(video_id, duration=duration)
-
-                    # Generar miniatura
-                    self.generate_thumbnail(filepath, video_id)
-                    added_count += 1
-                    progress_dialog.update(idx, f"Añadido: {filename[:30]}...")
-                else:
-                    progress_dialog.update(idx, f"Ya existe: {filename[:30]}...")
+        if updates:
+            valid = [(video_id, values) for video_id, values in updates
+                     if video_id is not None and values]
+            for i in range(0, len(valid), DB_BATCH_SIZE):
+                self.db.update_videos(valid[i:i + DB_BATCH_SIZE])
+            # Rellenar las filas ya visibles sin reconstruir la lista; las demás se
+            # leerán ya actualizadas cuando entren en la ventana
+            self.video_list.invalidate()
+            for video_id, values in valid:
+                iid = str(video_id)
+                if 'duration' in values and self.video_tree.exists(iid):
+                    self.video_tree.set(iid, 'duration',
+                                        self.format_duration(values['duration']))
+            self._import_done += len(updates)
+            self.import_progress.config(value=self._import_done)
+            self.import_label.config(text=f"Procesando {self._import_done}"
+                                          f" / {self._import_total}")
+
+        if finished:
+            added_count = self._import_total
+            found = self._import_found
+            self._finish_import()
+            if not self._import_cancel.is_set():
+                messagebox.askokcancel("Éxito", f"Se añadieron {added_count} videos de {found}")
+        else:
+            self.root.after(IMPORT_POLL_MS, self._poll_import)
+
+    def _show_import_status(self, text):
+        """Muestra la barra de progreso de la importación bajo la barra de herramientas"""
+        self.import_label.config(text=text)
+        if not self.import_frame.winfo_ismapped():
+            self.import_frame.pack(side='top', fill='x', padx=5, after=self.library_toolbar)
+
+    def _finish_import(self):
+        """Oculta el progreso y permite una nueva importación"""
+        self._import_running = False
+        self._import_queue = None
+        self.import_frame.pack_forget()
+
+    def compact_thumbnail_packs(self):
+        """Compacta los packs de miniaturas si más de PACK_COMPACT_RATIO es espacio muerto.
+
+        La copia se hace en un hilo que lee las referencias vivas con su propia conexión;
+        al terminar se actualizan las referencias en la base de datos y se borran los packs
+        viejos desde el hilo de Tk. Mientras tanto las miniaturas nuevas se guardan como
+        archivos (ver save_thumbnail) para no esperar al lock de los packs.
+        """
+        if self._import_running or self._compacting:
+            return
+        packs = self.thumbnail_cache.packs
+        if packs.garbage_ratio([ref for _id, ref in self.db.get_packed_thumbnails()]) \
+                < PACK_COMPACT_RATIO:
+            return
 
-            # Cerrar ventana de progreso
-            progress_dialog.close()
+        self._compacting = True
+        db_path = self.db.db_path
+        refs = []
 
-            messagebox.askokcancel("Éxito", f"Se añadieron {added_count} videos de {total}")
-            self.refresh_video_list()
+        def load_live_refs():
+            conn = sqlite3.connect(db_path)
+            try:
+                refs.extend(self.db.get_packed_thumbnails(conn))
+            finally:
+                conn.close()
+            return [ref for _id, ref in refs]
 
-    def refresh_video_list(self):
-        """Actualiza la lista de videos"""
-        # Limpiar tree
-        for item in self.video_tree.get_children():
-            self.video_tree.delete(item)
+        def worker():
+            try:
+                moved, old_numbers = packs.compact(load_live_refs)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Error compactando miniaturas: {e}")
+                moved, old_numbers = {}, []
+            try:
+                self.root.after(0, lambda: self._on_thumbnails_compacted(refs, moved,
+                                                                          old_numbers))
+            except (RuntimeError, tk.TclError):
+                pass  # La ventana ya se cerró
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_thumbnails_compacted(self, refs, moved, old_numbers):
+        """Apunta la base de datos a las referencias nuevas y borra los packs viejos"""
+        self.db.replace_thumbnail_paths([(video_id, ref, moved[ref])
+                                         for video_id, ref in refs if ref in moved])
+        self.thumbnail_cache.clear()
+        self.thumbnail_cache.packs.remove_packs(old_numbers)
+        self._compacting = False
 
+    def refresh_video_list(self):
+        """Actualiza la lista de videos (solo se crean las filas visibles)"""
         # Actualizar categorías
         categories = ['Todos'] + self.db.get_categories()
         self.category_combo['values'] = categories
         self.detail_category_combo['values'] = self.db.get_categories()
 
-        # Obtener videos filtrados
+        # Los datos pueden haber cambiado: releer filas y recuento
+        self.video_list.invalidate()
+        self._apply_list_filter()
+
+    def _schedule_search(self):
+        """Aplica la búsqueda cuando se deja de escribir durante LIST_SEARCH_DELAY_MS"""
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(LIST_SEARCH_DELAY_MS, self._apply_list_filter)
+
+    def _apply_list_filter(self):
+        """Filtra la lista con la búsqueda y la categoría actuales y la vuelve a dibujar"""
+        self._search_after_id = None
         search_term = self.search_var.get()
         category = self.category_var.get()
 
-        videos = self.db.get_all_videos(
-            category=category if category != 'Todos' else None,
-            search_term=search_term if search_term else None
-        )
+        self.video_list.set_filter(category if category != 'Todos' else None,
+                                   search_term if search_term else None)
+        self._render_video_window()
+
+    def _visible_list_rows(self):
+        """Filas que caben en la altura actual de la lista"""
+        height = self.video_tree.winfo_height()
+        if height <= 1:
+            return LIST_DEFAULT_ROWS  # Todavía no se ha dibujado
+        # Se descuenta una fila para la cabecera
+        return max(1, height // self._list_row_height - 1)
+
+    def _render_video_window(self):
+        """Vuelve a poblar la Treeview con la ventana de filas visible"""
+        model = self.video_list
+        visible = self._visible_list_rows()
+        self._list_visible_rows = visible
+        model.offset = model.clamp(model.offset, visible)
+        rows = model.rows(model.offset, visible)
+
+        # Limpiar tree
+        children = self.video_tree.get_children()
+        if children:
+            self.video_tree.delete(*children)
 
         # Poblar tree
-        for video in videos:
+        for video in rows:
             video_id, _filepath, filename, category, _tags, rating, duration, *_ = video
             duration_str = self.format_duration(duration)
             self.video_tree.insert('', 'end', iid=str(video_id),
                                   text=str(video_id),
                                   values=(filename, duration_str, category or 'public',
-                                          '⭐' * rating))
+                                          '⭐' * (rating or 0)))
+
+        # Mantener seleccionado el video actual si está dentro de la ventana
+        selected = str(model.selected_id) if model.selected_id is not None else None
+        if selected and self.video_tree.exists(selected):
+            self.video_tree.selection_set(selected)
+            self.video_tree.focus(selected)
+
+        if model.total:
+            self.video_scrollbar.set(model.offset / model.total,
+                                     (model.offset + len(rows)) / model.total)
+        else:
+            self.video_scrollbar.set(0, 1)
+
+    def _scroll_list_to(self, offset):
+        """Mueve la ventana visible para que empiece en la fila `offset`"""
+        offset = self.video_list.clamp(offset, self._visible_list_rows())
+        if offset != self.video_list.offset:
+            self.video_list.offset = offset
+            self._render_video_window()
+
+    def _on_list_scrollbar(self, *args):
+        """Comando de la scrollbar: 'moveto' fracción o 'scroll' n units/pages"""
+        try:
+            if args[0] == 'moveto':
+                self._scroll_list_to(int(float(args[1]) * self.video_list.total))
+            elif args[0] == 'scroll':
+                step = self._visible_list_rows() if args[2] == 'pages' else 1
+                self._scroll_list_to(self.video_list.offset + int(args[1]) * step)
+        except (IndexError, ValueError) as e:
+            print(f"Error desplazando la lista: {e}")
+
+    def _on_list_mousewheel(self, event):
+        """Rueda del ratón sobre la lista (Windows/macOS: delta; Linux: Button-4/5)"""
+        if getattr(event, 'delta', 0):
+            step = -LIST_WHEEL_ROWS if event.delta > 0 else LIST_WHEEL_ROWS
+        else:
+            step = -LIST_WHEEL_ROWS if event.num == 4 else LIST_WHEEL_ROWS
+        self._scroll_list_to(self.video_list.offset + step)
+        return 'break'
+
+    def _on_list_configure(self, _event):
+        """Al cambiar la altura de la lista, rellenar las filas que ahora caben"""
+        if self._visible_list_rows() != self._list_visible_rows:
+            self._render_video_window()
+
+    def _move_list_selection(self, step):
+        """Mueve la selección `step` filas desplazando la ventana si hace falta"""
+        model = self.video_list
+        if not model.total:
+            return 'break'
+        visible = self._visible_list_rows()
+        children = self.video_tree.get_children()
+        selected = str(model.selected_id)
+        if selected in children:
+            index = model.offset + children.index(selected)
+        else:
+            index = model.offset - 1 if step > 0 else model.offset + visible
+        index = max(0, min(model.total - 1, index + step))
+
+        if index < model.offset:
+            model.offset = index
+        elif index >= model.offset + visible:
+            model.offset = index - visible + 1
+        rows = model.rows(index, 1)
+        if rows:
+            model.selected_id = rows[0][0]
+        self._render_video_window()
+        return 'break'
 
     def on_video_select(self, _event):
         """Maneja la selección de un video"""
         selection = self.video_tree.selection()
         if not selection:
+            if self.video_list.selected_id is not None:
+                return  # El video seleccionado solo ha salido de la ventana visible
             self.generate_timeline_btn.config(state='disabled')
             try:
                 self.add_four_btn.config(state='disabled')
@@ -789,43 +1661,45 @@ class VideoManagerApp:
             return
 
         video_id = int(selection[0])
-        videos = self.db.get_all_videos()
+        self.video_list.selected_id = video_id
+        if self.current_video and self.current_video[0] == video_id:
+            return  # Reselección al redibujar la ventana: ya está cargado
+        video = self.db.get_video(video_id)
+        if not video:
+            return
 
-        for video in videos:
-            if video[0] == video_id:
-                self.current_video = video
-                self.load_video_details(video)
-                # Habilitar botón de timeline
-                self.generate_timeline_btn.config(state='normal')
-                # Enable add_four_btn only for sufficiently long videos (>15 minutes)
+        self.current_video = video
+        self.load_video_details(video)
+        # Habilitar botón de timeline
+        self.generate_timeline_btn.config(state='normal')
+        # Enable add_four_btn only for sufficiently long videos (>15 minutes)
+        try:
+            duration = 0
+            # duration is typically at index 6 (as used elsewhere)
+            if len(video) > 6 and video[6] is not None:
                 try:
-                    duration = 0
-                    # duration is typically at index 6 (as used elsewhere)
-                    if len(video) > 6 and video[6] is not None:
-                        try:
-                            duration = float(video[6])
-                        except Exception:
-                            try:
-                                duration = int(video[6])
-                            except Exception:
-                                duration = 0
-                    # If DB has no duration, try to compute from file
-                    if (not duration or duration <= 0) and self.current_video and len(
-                        self.current_video) > 1:
-                        try:
-                            duration = float(self.get_video_duration(self.current_video[1]) or 0)
-                        except Exception:
-                            duration = duration or 0
-                    if duration > (10 * 60):
-                        self.add_four_btn.config(state='normal')
-                    else:
-                        self.add_four_btn.config(state='disabled')
+                    duration = float(video[6])
                 except Exception:
                     try:
-                        self.add_four_btn.config(state='disabled')
+                        duration = int(video[6])
                     except Exception:
-                        pass
-                break
+                        duration = 0
+            # If DB has no duration, try to compute from file
+            if (not duration or duration <= 0) and self.current_video and len(
+                self.current_video) > 1:
+                try:
+                    duration = float(self.get_video_duration(self.current_video[1]) or 0)
+                except Exception:
+                    duration = duration or 0
+            if duration > (10 * 60):
+                self.add_four_btn.config(state='normal')
+            else:
+                self.add_four_btn.config(state='disabled')
+        except Exception:
+            try:
+                self.add_four_btn.config(state='disabled')
+            except Exception:
+                pass
 
     def load_video_details(self, video):
         """Carga los detalles de un video en el panel de detalles"""
@@ -1254,6 +2128,7 @@ class VideoManagerApp:
                                "(El archivo no se borrará del disco)"):
             self.db.delete_video(video_id)
             self.current_video = None
+            self.video_list.selected_id = None
             self.refresh_video_list()
             messagebox.askokcancel("Éxito", "Video eliminado de la biblioteca")
 
@@ -1265,58 +2140,12 @@ class VideoManagerApp:
             self.context_menu.post(event.x_root, event.y_root)
 
     def sort_treeview(self, col):
-        """Ordena la Treeview por la columna `col`, alternando asc/desc."""
+        """Ordena la lista por la columna `col`, alternando asc/desc (en SQL)."""
         try:
-            # Obtener items actuales
-            items = [(self.video_tree.set(k, col) if col != '#0' else k, k
-                      ) for k in self.video_tree.get_children('')]
-
-            # Detectar si la columna es numérica (duration o rating or id)
-            def try_float(v):
-                try:
-                    return float(v)
-                except Exception:
-                    return None
-
-            parsed = []
-            for val, k in items:
-                if col == '#0':
-                    # id is from item id (string), try int
-                    try:
-                        parsed.append((int(val), k))
-                    except Exception:
-                        parsed.append((val, k))
-                else:
-                    # remove non-digit chars for duration like 00:03:12 -> compute seconds
-                    if col == 'duration':
-                        # Try to parse duration format HH:MM:SS or MM:SS
-                        try:
-                            parts = val.split(':')
-                            parts = [int(p) for p in parts]
-                            seconds = 0
-                            if len(parts) == 3:
-                                seconds = parts[0]*3600 + parts[1]*60 + parts[2]
-                            elif len(parts) == 2:
-                                seconds = parts[0]*60 + parts[1]
-                            else:
-                                seconds = int(val)
-                            parsed.append((seconds, k))
-                        except Exception:
-                            parsed.append((val, k))
-                    else:
-                        f = try_float(val)
-                        if f is not None:
-                            parsed.append((f, k))
-                        else:
-                            parsed.append((val.lower() if isinstance(val, str) else val, k))
-
             # Determine current sort order and toggle
             asc = self._treeview_sort_state.get(col, True)
-            parsed.sort(key=lambda x: x[0], reverse=not asc)
-
-            # Reorder items
-            for index, (_v, k) in enumerate(parsed):
-                self.video_tree.move(k, '', index)
+            self.video_list.set_order(col, asc)
+            self._render_video_window()
 
             # Update header indicators (▲ for asc, ▼ for desc)
             try:
@@ -1326,9 +2155,9 @@ class VideoManagerApp:
 
             # Toggle for next click
             self._treeview_sort_state[col] = not asc
-        except Exception:
-            # If any problem, quietly ignore (do not crash UI)
-            pass
+        except (sqlite3.Error, tk.TclError) as e:
+            # If any problem, do not crash UI
+            print(f"Error ordenando la lista: {e}")
 
     def _update_treeview_header_indicators(self, active_col, asc):
         """Update the column headers to show ▲/▼ for the active sorted column."""
@@ -1344,135 +2173,43 @@ class VideoManagerApp:
         except Exception:
             pass
 
-    def generate_thumbnail(self, video_path, video_id):
-        """Genera una miniatura del video usando OpenCV (más confiable que VLC)"""
-        try:
-            # Abrir video con OpenCV
-            cap = cv2.VideoCapture(video_path)  # type: ignore
-
-            if not cap.isOpened():
-                # Silencioso: algunos videos pueden no ser compatibles
-                return None
-
-            # Obtener el frame del medio del video
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))  # type: ignore
-
-            # Intentar múltiples frames si el primero falla
-            frames_to_try = []
-            if total_frames > 0:
-                frames_to_try = [
-                    total_frames // 2,      # Frame del medio
-                    total_frames // 4,      # Frame al 25%
-                    total_frames // 10,     # Frame al 10%
-                    min(100, total_frames)  # Frame 100 o el último
-                ]
-            else:
-                frames_to_try = [0]  # Intentar el primer frame
-
-            frame_rgb = None
-            for frame_pos in frames_to_try:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_pos)  # type: ignore
-                ret, frame = cap.read()
-
-                if ret and frame is not None:
-                    try:
-                        # Convertir de BGR (OpenCV) a RGB (PIL)
-                        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)  # type: ignore
-                        break  # Éxito, salir del bucle
-                    except (ValueError, TypeError, AttributeError):
-                        # Ignorar frames problemáticos y probar el siguiente
-                        continue  # Intentar siguiente frame
-
-            cap.release()
-
-            if frame_rgb is not None:
-                # Crear imagen PIL
-                img = Image.fromarray(frame_rgb)
-
-                # Asegurar relación de aspecto 3:2 mediante crop centrado y redimensionado
-                try:
-                    target_aspect = 3.0 / 2.0
-                    width, height = img.size
-                    current_aspect = width / height if height else 1
-
-                    if current_aspect > target_aspect:
-                        # imagen demasiado ancha -> recortar ancho
-                        new_width = int(target_aspect * height)
-                        left = (width - new_width) // 2
-                        img = img.crop((left, 0, left + new_width, height))
-                    else:
-                        # imagen demasiado alta -> recortar alto
-                        new_height = int(width / target_aspect)
-                        top = (height - new_height) // 2
-                        img = img.crop((0, top, width, top + new_height))
-
-                    # Redimensionar a 300x200 (3:2)
-                    img = img.resize((300, 200), Image.Resampling.LANCZOS)
-
-                    # Guardar miniatura
-                    thumbnail_path = self.thumbnail_dir / f"thumb_{video_id}.jpg"
-                    img.save(thumbnail_path, "JPEG", quality=85)
-                except (OSError, ValueError, AttributeError):
-                    # Fallback: intentar guardar la imagen tal cual en caso de errores esperados
-                    thumbnail_path = self.thumbnail_dir / f"thumb_{video_id}.jpg"
-                    img.save(thumbnail_path, "JPEG", quality=85)
-
-                # Actualizar base de datos
-                abs_thumbnail_path = str(thumbnail_path.resolve())
-                self.db.update_video(video_id, thumbnail_path=abs_thumbnail_path)
-                # Debugging removed: generation saved to DB as absolute path
-
-                return abs_thumbnail_path
-            else:
-                # Silencioso: el video puede estar corrupto
-                return None
+    def generate_thumbnail(self, video_path, video_id, update_db=True):
+        """Genera una miniatura del video usando OpenCV (más confiable que VLC).
 
-        except (OSError, ValueError) as e:
-            # Manejo robusto de errores específicos (archivos, valores)
-            print(f"Error generando miniatura: {e}")
+        Con update_db=False solo devuelve la ruta y el llamador la guarda en lote.
+        """
+        _duration, _resolution, thumbnail = self.probe_video(video_path)
+        if thumbnail is None:
+            # Silencioso: el video puede estar corrupto o no ser compatible
             return None
-        except Exception as e:
-            # Captura cualquier otra excepción (incluyendo errores de OpenCV)
-            # Usamos Exception aquí para asegurar que solo
-            # se capturen excepciones que hereden de Exception
-            print(f"Error generando miniatura: {e}")
+        return self.save_thumbnail(video_id, thumbnail, update_db)
+
+    def save_thumbnail(self, video_id, thumbnail, update_db=True):
+        """Guarda los bytes JPEG de la miniatura y devuelve su ruta absoluta"""
+        try:
+            # Durante una compactación no se espera al lock de los packs
+            abs_thumbnail_path = self.thumbnail_cache.store(thumbnail,
+                                                            allow_packs=not self._compacting)
+        except OSError as e:
+            print(f"Error guardando miniatura: {e}")
             return None
 
+        if update_db:
+            self.db.update_video(video_id, thumbnail_path=abs_thumbnail_path)
+        return abs_thumbnail_path
+
     def load_thumbnail(self, video_id, thumbnail_path, video_path):
-        """Carga y muestra la miniatura del video en formato cuadrado"""
+        """Carga y muestra la miniatura del video (desde la caché si ya se mostró)"""
         try:
             # Si no hay miniatura, intentar generarla
-            if not thumbnail_path or not os.path.exists(thumbnail_path):
+            if not self.thumbnail_cache.exists(thumbnail_path):
                 thumbnail_path = self.generate_thumbnail(video_path, video_id)
 
-            if thumbnail_path and os.path.exists(thumbnail_path):
-                # Cargar imagen
-                img = Image.open(thumbnail_path)
-
-                # Crear imagen con relación 3:2 (300x200) con crop centrado
-                try:
-                    target_aspect = 3.0 / 2.0
-                    width, height = img.size
-                    current_aspect = width / height if height else 1
-
-                    if current_aspect > target_aspect:
-                        # demasiado ancha -> recortar ancho
-                        new_width = int(target_aspect * height)
-                        left = (width - new_width) // 2
-                        img_cropped = img.crop((left, 0, left + new_width, height))
-                    else:
-                        # demasiado alta -> recortar alto
-                        new_height = int(width / target_aspect)
-                        top = (height - new_height) // 2
-                        img_cropped = img.crop((0, top, width, top + new_height))
-
-                    img_resized = img_cropped.resize((300, 200), Image.Resampling.LANCZOS)
-                    photo = ImageTk.PhotoImage(img_resized)
-                except (OSError, ValueError, AttributeError):
-                    # Fallback to original resize centered
-                    img.thumbnail((300, 200), Image.Resampling.LANCZOS)
-                    photo = ImageTk.PhotoImage(img)
+            photo = None
+            if thumbnail_path:
+                photo = self.thumbnail_cache.get_photo(video_id, video_path, thumbnail_path)
 
+            if photo is not None:
                 # Mostrar en label
                 self.preview_label.config(image=photo, text="")
                 self.preview_label.image = photo  # Mantener referencia
@@ -1507,6 +2244,7 @@ class VideoManagerApp:
         progress_dialog = ProgressDialog(self.root, "Generando Miniaturas",
                                         "Procesando videos...", total)
         generated = 0
+        pending_updates = []
 
         for idx, video in enumerate(videos, 1):
             video_id = video[0]
@@ -1514,11 +2252,25 @@ class VideoManagerApp:
             filename = video[2]
 
             if os.path.exists(filepath):
-                if self.generate_thumbnail(filepath, video_id):
-                    generated += 1
+                # Una sola apertura da la miniatura y, si faltaba, también la duración
+                duration, _resolution, thumbnail = self.probe_video(filepath)
+                values = {}
+                if thumbnail is not None:
+                    thumbnail_path = self.save_thumbnail(video_id, thumbnail, update_db=False)
+                    if thumbnail_path:
+                        values['thumbnail_path'] = thumbnail_path
+                        generated += 1
+                if duration > 0 and not video[6]:
+                    values['duration'] = duration
+                if values:
+                    pending_updates.append((video_id, values))
+                if len(pending_updates) >= DB_BATCH_SIZE:
+                    self.db.update_videos(pending_updates)
+                    pending_updates = []
                 progress_dialog.update(idx, f"Procesado: {filename[:30]}...")
             else:
                 progress_dialog.update(idx, f"No encontrado: {filename[:30]}...")
+        self.db.update_videos(pending_updates)
 
         # Cerrar ventana de progreso
         progress_dialog.close()
@@ -2181,6 +2933,13 @@ class VideoManagerApp:
 
     def on_closing(self):
         """Maneja el cierre de la aplicación"""
+        # Parar la importación en curso. Los hilos del pool no son daemon: se
+        # cancelan los videos pendientes y el intérprete solo espera a los que
+        # ya se están sondeando
+        self._import_cancel.set()
+        executor = self._import_executor
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
         if VLC_AVAILABLE and self.player:
             self.player.stop()
         self.db.close()
@@ -0,0 +1,312 @@
+""" Lectura rápida de metadatos de vídeo a partir de las cabeceras del contenedor.
+
+Analiza directamente las estructuras de MP4/MOV (moov/mvhd/tkhd), Matroska/WebM
+(Segment/Info/Tracks) y AVI (avih/strh) leyendo solo unos pocos KB por archivo,
+sin lanzar ningún proceso de ffmpeg. Si el contenedor no se reconoce o la
+cabecera está incompleta se lanza ValueError para que el llamador use otro método.
+"""
+
+import os
+import struct
+
+# Límites para no recorrer archivos corruptos o enormes indefinidamente
+MAX_CAJAS = 4096
+MAX_CAJA_HOJA = 1024 * 1024
+
+
+def leer_cabecera_video(ruta):
+    """Devuelve (duración en segundos, ancho, alto) leyendo solo la cabecera.
+
+    Lanza ValueError si el formato no está soportado o la cabecera no es válida.
+    """
+    with open(ruta, 'rb') as f:
+        inicio = f.read(12)
+        tamano = os.fstat(f.fileno()).st_size
+        if len(inicio) < 12:
+            raise ValueError(f"Archivo demasiado pequeño: {ruta}")
+        try:
+            if inicio[:4] == b'RIFF' and inicio[8:12] == b'AVI ':
+                return _leer_avi(f, tamano)
+            if inicio[:4] == b'\x1a\x45\xdf\xa3':
+                return _leer_matroska(f, tamano)
+            if inicio[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+                return _leer_mp4(f, tamano)
+        except struct.error as exc:
+            raise ValueError(f"Cabecera inválida: {exc}") from exc
+    raise ValueError(f"Contenedor no reconocido: {os.path.splitext(ruta)[1] or ruta}")
+
+
+def _leer_exacto(f, n):
+    """Lee exactamente n bytes o lanza ValueError"""
+    datos = f.read(n)
+    if len(datos) != n:
+        raise ValueError("Cabecera truncada")
+    return datos
+
+
+# --- MP4 / MOV (ISO BMFF) ---
+
+def _cajas_mp4(f, inicio, fin):
+    """Itera (tipo, inicio_datos, fin_caja) de las cajas entre inicio y fin"""
+    pos = inicio
+    contador = 0
+    while pos + 8 <= fin:
+        contador += 1
+        if contador > MAX_CAJAS:
+            raise ValueError("Demasiadas cajas MP4")
+        f.seek(pos)
+        tamano, tipo = struct.unpack('>I4s', _leer_exacto(f, 8))
+        cabecera = 8
+        if tamano == 1:
+            tamano = struct.unpack('>Q', _leer_exacto(f, 8))[0]
+            cabecera = 16
+        elif tamano == 0:
+            tamano = fin - pos
+        if tamano < cabecera:
+            raise ValueError("Caja MP4 con tamaño inválido")
+        yield tipo, pos + cabecera, min(pos + tamano, fin)
+        pos += tamano
+
+
+def _leer_hoja_mp4(f, inicio, fin):
+    """Lee el contenido de una caja hoja pequeña (mvhd, tkhd, hdlr)"""
+    if fin - inicio > MAX_CAJA_HOJA:
+        raise ValueError("Caja MP4 demasiado grande")
+    f.seek(inicio)
+    return _leer_exacto(f, fin - inicio)
+
+
+def _leer_mp4(f, tamano):
+    moov = None
+    for tipo, inicio, fin in _cajas_mp4(f, 0, tamano):
+        if tipo == b'moov':
+            moov = (inicio, fin)
+            break
+    if moov is None:
+        raise ValueError("Sin caja moov")
+
+    duracion = None
+    ancho = alto = 0
+    for tipo, inicio, fin in _cajas_mp4(f, *moov):
+        if tipo == b'mvhd':
+            datos = _leer_hoja_mp4(f, inicio, fin)
+            if len(datos) < 20 or (datos[0] == 1 and len(datos) < 32):
+                raise ValueError("mvhd truncada")
+            if datos[0] == 1:
+                escala, dur = struct.unpack('>IQ', datos[20:32])
+            else:
+                escala, dur = struct.unpack('>II', datos[12:20])
+            if escala and dur not in (0, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+                duracion = dur / escala
+        elif tipo == b'trak':
+            dimensiones = _leer_trak_mp4(f, inicio, fin)
+            if dimensiones and dimensiones[1] > alto:
+                ancho, alto = dimensiones
+
+    if duracion is None or alto <= 0:
+        raise ValueError("moov sin duración o sin pista de vídeo")
+    return duracion, ancho, alto
+
+
+def _leer_trak_mp4(f, inicio, fin):
+    """Devuelve (ancho, alto) si la pista es de vídeo, None en caso contrario"""
+    dimensiones = None
+    es_video = False
+    for tipo, ini, fi in _cajas_mp4(f, inicio, fin):
+        if tipo == b'tkhd':
+            datos = _leer_hoja_mp4(f, ini, fi)
+            base = 88 if datos and datos[0] == 1 else 76
+            if len(datos) < base + 8:
+                raise ValueError("tkhd truncada")
+            matriz_a, matriz_b = struct.unpack('>ii', datos[base - 36:base - 28])
+            ancho, alto = struct.unpack('>II', datos[base:base + 8])
+            ancho, alto = ancho >> 16, alto >> 16
+            # Rotación de 90/270 grados: el fotograma se muestra con los ejes intercambiados
+            if matriz_a == 0 and matriz_b != 0:
+                ancho, alto = alto, ancho
+            dimensiones = (ancho, alto)
+        elif tipo == b'mdia':
+            for sub, ini2, fi2 in _cajas_mp4(f, ini, fi):
+                if sub == b'hdlr':
+                    datos = _leer_hoja_mp4(f, ini2, fi2)
+                    es_video = datos[8:12] == b'vide'
+                    break
+    if es_video and dimensiones and dimensiones[1] > 0:
+        return dimensiones
+    return None
+
+
+# --- Matroska / WebM (EBML) ---
+
+ID_SEGMENT = 0x18538067
+ID_INFO = 0x1549A966
+ID_TRACKS = 0x1654AE6B
+ID_TIMECODE_SCALE = 0x2AD7B1
+ID_DURATION = 0x4489
+ID_TRACK_ENTRY = 0xAE
+ID_TRACK_TYPE = 0x83
+ID_VIDEO = 0xE0
+ID_PIXEL_WIDTH = 0xB0
+ID_PIXEL_HEIGHT = 0xBA
+
+
+def _leer_vint(f, conservar_marca):
+    """Lee un entero de longitud variable EBML y devuelve (valor, longitud)"""
+    primero = _leer_exacto(f, 1)[0]
+    if primero == 0:
+        raise ValueError("VINT EBML inválido")
+    longitud = 1
+    mascara = 0x80
+    while not primero & mascara:
+        mascara >>= 1
+        longitud += 1
+    valor = primero if conservar_marca else primero & (mascara - 1)
+    desconocido = (primero & (mascara - 1)) == mascara - 1
+    for byte in _leer_exacto(f, longitud - 1):
+        valor = (valor << 8) | byte
+        desconocido = desconocido and byte == 0xFF
+    if desconocido and not conservar_marca:
+        return None, longitud
+    return valor, longitud
+
+
+def _elementos_ebml(f, inicio, fin):
+    """Itera (id, inicio_datos, tamaño) de los elementos entre inicio y fin"""
+    pos = inicio
+    contador = 0
+    while pos < fin:
+        contador += 1
+        if contador > MAX_CAJAS:
+            raise ValueError("Demasiados elementos EBML")
+        f.seek(pos)
+        id_elem, lon_id = _leer_vint(f, True)
+        tam, lon_tam = _leer_vint(f, False)
+        inicio_datos = pos + lon_id + lon_tam
+        if tam is None:
+            # Tamaño desconocido (p.ej. grabaciones en directo): solo válido para el Segment
+            if id_elem != ID_SEGMENT:
+                raise ValueError("Elemento EBML de tamaño desconocido")
+            tam = fin - inicio_datos
+        yield id_elem, inicio_datos, tam
+        pos = inicio_datos + tam
+
+
+def _leer_uint(f, inicio, tam):
+    f.seek(inicio)
+    return int.from_bytes(_leer_exacto(f, tam), 'big') if tam else 0
+
+
+def _leer_matroska(f, tamano):
+    segmento = None
+    for id_elem, inicio, tam in _elementos_ebml(f, 0, tamano):
+        if id_elem == ID_SEGMENT:
+            segmento = (inicio, min(inicio + tam, tamano))
+            break
+    if segmento is None:
+        raise ValueError("Sin elemento Segment")
+
+    escala = 1000000
+    duracion = None
+    ancho = alto = 0
+    for id_elem, inicio, tam in _elementos_ebml(f, *segmento):
+        if id_elem == ID_INFO:
+            for sub, ini, t in _elementos_ebml(f, inicio, inicio + tam):
+                if sub == ID_TIMECODE_SCALE:
+                    escala = _leer_uint(f, ini, t)
+                elif sub == ID_DURATION and t in (4, 8):
+                    f.seek(ini)
+                    duracion = struct.unpack('>f' if t == 4 else '>d', _leer_exacto(f, t))[0]
+        elif id_elem == ID_TRACKS:
+            for sub, ini, t in _elementos_ebml(f, inicio, inicio + tam):
+                if sub == ID_TRACK_ENTRY:
+                    dimensiones = _leer_pista_matroska(f, ini, ini + t)
+                    if dimensiones and dimensiones[1] > alto:
+                        ancho, alto = dimensiones
+        if duracion is not None and alto:
+            break
+
+    if not duracion or alto <= 0:
+        raise ValueError("Matroska sin duración o sin pista de vídeo")
+    return duracion * escala / 1e9, ancho, alto
+
+
+def _leer_pista_matroska(f, inicio, fin):
+    """Devuelve (ancho, alto) si la TrackEntry es de vídeo"""
+    tipo_pista = None
+    ancho = alto = 0
+    for id_elem, ini, t in _elementos_ebml(f, inicio, fin):
+        if id_elem == ID_TRACK_TYPE:
+            tipo_pista = _leer_uint(f, ini, t)
+        elif id_elem == ID_VIDEO:
+            for sub, ini2, t2 in _elementos_ebml(f, ini, ini + t):
+                if sub == ID_PIXEL_WIDTH:
+                    ancho = _leer_uint(f, ini2, t2)
+                elif sub == ID_PIXEL_HEIGHT:
+                    alto = _leer_uint(f, ini2, t2)
+    if tipo_pista == 1 and alto > 0:
+        return ancho, alto
+    return None
+
+
+# --- AVI (RIFF) ---
+
+def _chunks_riff(f, inicio, fin):
+    """Itera (fourcc, tipo_lista, inicio_datos, fin_chunk) de los chunks RIFF"""
+    pos = inicio
+    contador = 0
+    while pos + 8 <= fin:
+        contador += 1
+        if contador > MAX_CAJAS:
+            raise ValueError("Demasiados chunks RIFF")
+        f.seek(pos)
+        fourcc, tam = struct.unpack('<4sI', _leer_exacto(f, 8))
+        tipo_lista = None
+        inicio_datos = pos + 8
+        if fourcc in (b'LIST', b'RIFF'):
+            tipo_lista = _leer_exacto(f, 4)
+            inicio_datos += 4
+        yield fourcc, tipo_lista, inicio_datos, min(pos + 8 + tam, fin)
+        pos += 8 + tam + (tam & 1)
+
+
+def _leer_avi(f, tamano):
+    hdrl = None
+    for fourcc, tipo_lista, inicio, fin in _chunks_riff(f, 12, tamano):
+        if fourcc == b'LIST' and tipo_lista == b'hdrl':
+            hdrl = (inicio, fin)
+            break
+    if hdrl is None:
+        raise ValueError("AVI sin lista hdrl")
+
+    duracion = None
+    ancho = alto = 0
+    frames_totales = 0
+    for fourcc, tipo_lista, inicio, fin in _chunks_riff(f, *hdrl):
+        if fourcc == b'avih' and fin - inicio >= 40:
+            f.seek(inicio)
+            datos = _leer_exacto(f, 40)
+            us_por_frame, = struct.unpack('<I', datos[0:4])
+            frames_totales, = struct.unpack('<I', datos[16:20])
+            ancho, alto = struct.unpack('<II', datos[32:40])
+            if us_por_frame and frames_totales:
+                duracion = frames_totales * us_por_frame / 1e6
+        elif fourcc == b'LIST' and tipo_lista == b'strl':
+            for sub, _tipo, ini, fi in _chunks_riff(f, inicio, fin):
+                if sub == b'strh' and fi - ini >= 36:
+                    f.seek(ini)
+                    datos = _leer_exacto(f, 36)
+                    if datos[0:4] != b'vids':
+                        break
+                    escala, tasa = struct.unpack('<II', datos[20:28])
+                    longitud, = struct.unpack('<I', datos[32:36])
+                    # strh cubre el archivo completo en AVI OpenDML (>1 GB); avih no
+                    if escala and tasa and longitud >= frames_totales:
+                        duracion = longitud * escala / tasa
+                elif sub == b'strf' and not alto and fi - ini >= 12:
+                    f.seek(ini)
+                    ancho, alto = struct.unpack('<ii', _leer_exacto(f, 12)[4:12])
+                    ancho, alto = abs(ancho), abs(alto)
+
+    if not duracion or alto <= 0:
+        raise ValueError("AVI sin duración o sin dimensiones")
+    return duracion, ancho, alto